@@ -36,27 +36,36 @@ OR navigate to /frontend directory the run the command cat mcad_nasa_colored.txt
 ###### Run With cat In The Terminal ######
 ##########################################
 import os
-import ascii_magic
 
 # Define the absolute path to the image
 image_path = os.path.expanduser("~/PycharmProjects/mcad_beta/app/frontend/mcad_nasa.png") # Input File
 output_file_path = os.path.expanduser("~/PycharmProjects/mcad_beta/app/frontend/mcad_nasa_colored.txt") # Output File
 
-# Make sure the file exists before proceeding
-if not os.path.exists(image_path):
-    print(f"Error: Image not found at {image_path}")
-    exit(1)
 
-# First create the ASCII art object
-output = ascii_magic.from_image(image_path)
+def render_ascii(image_path, columns=240, width_ratio=2.3):
+    """Colored (ANSI) ASCII art of an image, `columns` characters wide (used by banner.py)."""
+    import ascii_magic
+    return ascii_magic.from_image(image_path).to_ascii(columns=columns, width_ratio=width_ratio)
 
-# Save to file with ANSI color codes - pass the path directly, not a file object
-output.to_file(output_file_path, columns=240, width_ratio=2.3)
 
-# Also display in terminal (optional)
-output.to_terminal(
-    columns=200,         # Width in characters (Note: default is 120)
-    width_ratio=2.0,     # Adjusts the character aspect ratio (Note: default is 2.2)
-)
+if __name__ == "__main__":
+    import ascii_magic
 
-print(f"\nColored ASCII art saved location: {output_file_path}")
+    # Make sure the file exists before proceeding
+    if not os.path.exists(image_path):
+        print(f"Error: Image not found at {image_path}")
+        exit(1)
+
+    # First create the ASCII art object
+    output = ascii_magic.from_image(image_path)
+
+    # Save to file with ANSI color codes - pass the path directly, not a file object
+    output.to_file(output_file_path, columns=240, width_ratio=2.3)
+
+    # Also display in terminal (optional)
+    output.to_terminal(
+        columns=200,         # Width in characters (Note: default is 120)
+        width_ratio=2.0,     # Adjusts the character aspect ratio (Note: default is 2.2)
+    )
+
+    print(f"\nColored ASCII art saved location: {output_file_path}")
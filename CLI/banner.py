@@ -0,0 +1,68 @@
+"""
+MCAD CLI startup banner
+The NASA ASCII art is rendered (ascii_image.render_ascii) once per terminal width and cached under
+~/.cache/mcad/banner (override with MCAD_BANNER_CACHE). Cache files are named after the source PNG's
+size and mtime, so a changed mcad_nasa.png is rendered again; later startups only read one small file.
+Without ascii_magic the pre-rendered app/frontend/mcad_nasa_colored.txt is used as is.
+
+The banner is shown only when stdin and stdout are terminals, and never with MCAD_NO_BANNER=1.
+"""
+import os
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+BANNER_PNG = REPO_ROOT / "app" / "frontend" / "mcad_nasa.png"
+PRERENDERED = REPO_ROOT / "app" / "frontend" / "mcad_nasa_colored.txt"
+CACHE_DIR = Path(os.getenv("MCAD_BANNER_CACHE", Path.home() / ".cache" / "mcad" / "banner"))
+MAX_COLUMNS = 240  # Width of the pre-rendered art
+
+
+def is_interactive():
+    return sys.stdin.isatty() and sys.stdout.isatty() and not os.getenv("MCAD_NO_BANNER")
+
+
+def banner_path(columns, png=BANNER_PNG, cache_dir=CACHE_DIR):
+    stat = png.stat()
+    return Path(cache_dir) / f"{png.stem}_{stat.st_size:x}_{stat.st_mtime_ns:x}_{columns}.txt"
+
+
+def render_banner(columns, png=BANNER_PNG, cache_dir=CACHE_DIR):
+    """The banner for a terminal `columns` wide, rendering and caching it on first use."""
+    path = banner_path(columns, png, cache_dir)
+    try:
+        return path.read_text(encoding="utf-8")
+    except OSError:
+        pass
+
+    from ascii_image import render_ascii
+    art = render_ascii(str(png), columns=columns)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Renders for older versions of the PNG are no longer needed
+        for stale in path.parent.glob(f"{png.stem}_*.txt"):
+            if not stale.name.startswith(path.name.rsplit("_", 1)[0] + "_"):
+                stale.unlink(missing_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp_path.write_text(art, encoding="utf-8")
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Error caching banner at {path}: {e}", file=sys.stderr)
+    return art
+
+
+def show_banner():
+    """Print the banner sized to the terminal, if this is an interactive session."""
+    if not is_interactive():
+        return
+    columns = min(os.get_terminal_size().columns, MAX_COLUMNS)
+    try:
+        art = render_banner(columns)
+    except ImportError:  # ascii_magic is not installed
+        if columns < MAX_COLUMNS:
+            return  # The pre-rendered art would wrap
+        art = PRERENDERED.read_text(encoding="utf-8")
+    except OSError as e:
+        print(f"Error loading ASCII art: {e}", file=sys.stderr)
+        return
+    sys.stdout.write(art if art.endswith("\n") else art + "\n")
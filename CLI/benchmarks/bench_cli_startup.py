@@ -0,0 +1,68 @@
+"""
+Benchmark: CLI startup cost.
+Runs `python CLI/cli.py --help` (what the `mcad --help` alias executes) in fresh interpreters and reports the
+wall time, the slowest imports from `python -X importtime`, and any heavy module that is imported before
+a command runs (those belong inside the commands that need them).
+Stdout is a pipe here, so the banner is skipped as in any non-interactive session.
+Run from the repository root: python CLI/benchmarks/bench_cli_startup.py [--runs N] [--max-seconds S]
+Exits with code 1 if the median exceeds --max-seconds or a heavy module is imported at startup.
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+CLI_PATH = Path(__file__).resolve().parents[1] / "cli.py"
+
+# Modules that must not be imported just to parse arguments
+HEAVY_MODULES = ("snowflake", "pyarrow", "numpy", "PIL", "ascii_magic", "dotenv", "fastapi")
+
+
+def time_help(args):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, str(CLI_PATH), *args], check=True, stdout=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def import_profile(args):
+    """[(cumulative microseconds, module)] for every import made while running the CLI."""
+    result = subprocess.run([sys.executable, "-X", "importtime", str(CLI_PATH), *args],
+                            capture_output=True, text=True, check=True)
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        entries.append((int(cumulative_us), name.strip()))
+    return entries
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--max-seconds", type=float, default=0.25)
+    parser.add_argument("cli_args", nargs="*", default=["--help"], help="arguments passed to cli.py")
+    args = parser.parse_args()
+
+    times = [time_help(args.cli_args) for _ in range(args.runs)]
+    median = statistics.median(times)
+    print(f"cli.py {' '.join(args.cli_args)}: median {median:.3f} s, min {min(times):.3f} s, "
+          f"max {max(times):.3f} s ({args.runs} runs, includes interpreter startup)")
+
+    profile = import_profile(args.cli_args)
+    print("\nSlowest imports (cumulative):")
+    for cumulative_us, name in sorted(profile, reverse=True)[:args.top]:
+        print(f"{cumulative_us / 1000:10.1f} ms  {name}")
+
+    heavy = sorted({name for _, name in profile if name.split(".")[0] in HEAVY_MODULES})
+    failed = False
+    if heavy:
+        print(f"\nFAIL: heavy modules imported at startup: {', '.join(heavy)}")
+        failed = True
+    if median > args.max_seconds:
+        print(f"\nFAIL: median startup time {median:.3f} s exceeds {args.max_seconds:.3f} s")
+        failed = True
+    sys.exit(1 if failed else 0)
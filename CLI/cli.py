@@ -7,25 +7,27 @@ Command Line Interface script
 #################################
 ### Load ASCII Art On Startup ###
 #################################
+# Only click is imported up front; the Snowflake connector, dotenv, pyarrow and the backend modules
+# are imported inside the commands that use them, so `--help` and argument errors return immediately.
 import os
+import sys
 import click
-import snowflake.connector
-from dotenv import load_dotenv
 
 # Define the absolute path to the .env file
 env_path = os.path.expanduser("~/PycharmProjects/mcad_beta/app/backend/.env")
 
-# Debugging
-if not os.path.exists(env_path):
-    print(f"Error: .env file not found at {env_path}")
-else:
-    print(f"Loading .env from {env_path}")
-
-# Load environment variables from the specified .env file
-load_dotenv(dotenv_path=env_path)
+def load_environment():
+    """Load the Snowflake settings from the .env file (once, on first use)."""
+    from dotenv import load_dotenv
+    if not os.path.exists(env_path):
+        print(f"Error: .env file not found at {env_path}", file=sys.stderr)
+    # Load environment variables from the specified .env file
+    load_dotenv(dotenv_path=env_path)
 
 # Function to connect to Snowflake
 def get_snowflake_connection():
+    import snowflake.connector
+    load_environment()
     return snowflake.connector.connect(
         user=os.getenv("SNOWFLAKE_USER"),
         password=os.getenv("SNOWFLAKE_PASSWORD"),
@@ -36,14 +38,9 @@ def get_snowflake_connection():
     )
 
 def display_ascii_art():
-    file_path = os.path.expanduser("~/PycharmProjects/mcad_beta/app/frontend/mcad_nasa_colored.txt")
-
-    try:
-        with open(file_path, "r", encoding="utf-8") as file:
-            ascii_art = file.read()
-            print(ascii_art)  # Ensure the terminal supports ANSI escape codes for colors
-    except Exception as e:
-        print(f"Error loading ASCII art: {e}")
+    """NASA banner for interactive sessions, pre-rendered for the terminal width (see banner.py)."""
+    from banner import show_banner
+    show_banner()  # Ensure the terminal supports ANSI escape codes for colors
 
 @click.group()
 def cli():
@@ -52,16 +49,62 @@ def cli():
 
 @click.command()
 @click.argument("query")
-def run_query(query):
-    """Run a custom SQL query on Snowflake."""
-    conn = get_snowflake_connection()
-    cursor = conn.cursor()
-    cursor.execute(query)
-    results = cursor.fetchall()
-    for row in results:
-        print(row)
-    cursor.close()
-    conn.close()
+@click.option("--format", "fmt", type=click.Choice(["table", "csv", "ndjson", "parquet"]), default="table",
+              show_default=True)
+@click.option("--output", "-o", default=None, help="Write to this file instead of stdout.")
+@click.option("--limit", type=int, default=None, help="Stop after this many rows.")
+@click.option("--timeout", type=float, default=None, help="Abort the query after this many seconds.")
+@click.option("--batch-size", type=int, default=10000, show_default=True, help="Rows fetched per round-trip.")
+@click.option("--source", type=click.Choice(["snowflake", "sqlite"]), default="snowflake", show_default=True,
+              help="Run on Snowflake or on the local mcad.db.")
+@click.option("--db", "db_path", default=None, help="Path to mcad.db (defaults to MCAD_DB_PATH).")
+def run_query(query, fmt, output, limit, timeout, batch_size, source, db_path):
+    """Run a custom SQL query on Snowflake, streaming the rows as they are fetched."""
+    import sqlite3
+    from query_output import WRITERS, open_output, stream_query
+
+    if source == "sqlite":
+        import time
+        repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        sys.path.insert(0, os.path.join(repo_root, "app", "backend"))
+        from config import MCAD_DB_PATH
+        conn = sqlite3.connect(db_path or MCAD_DB_PATH)
+        if timeout:
+            # Abort long-running statements (raises sqlite3.OperationalError: interrupted)
+            deadline = time.monotonic() + timeout
+            conn.set_progress_handler(lambda: time.monotonic() > deadline, 10000)
+        cursor = conn.cursor()
+        try:
+            cursor.execute(query)
+        except sqlite3.OperationalError as e:
+            conn.close()
+            raise click.ClickException(f"Query timed out after {timeout} s" if str(e) == "interrupted" else str(e))
+    else:
+        conn = get_snowflake_connection()
+        cursor = conn.cursor()
+        cursor.execute(query, timeout=int(timeout) if timeout else None)
+
+    def progress(rows, seconds):
+        if output:  # Progress goes to stderr and only when stdout is not the data stream
+            click.echo(f"\r{rows} rows ({rows / seconds if seconds else 0:,.0f} rows/s)", nl=False, err=True)
+
+    stream, needs_close = open_output(fmt, output)
+    completed = False
+    try:
+        rows, seconds = stream_query(cursor, WRITERS[fmt], stream, batch_size, limit, progress)
+        completed = True
+    except sqlite3.OperationalError as e:  # SQLite runs the query while rows are fetched
+        raise click.ClickException(f"Query timed out after {timeout} s" if str(e) == "interrupted" else str(e))
+    finally:
+        if needs_close:
+            stream.close()
+            if not completed:
+                os.remove(output)  # Do not leave a truncated file behind
+        cursor.close()
+        conn.close()
+    if output:
+        click.echo(err=True)  # End the progress line
+    click.echo(f"{rows} rows in {seconds:.2f} s ({rows / seconds if seconds else 0:,.0f} rows/s)", err=True)
 
 @click.command()
 def list_craters():
@@ -75,11 +118,112 @@ def list_craters():
     cursor.close()
     conn.close()
 
+@click.command()
+@click.argument("directory", type=click.Path(exists=True, file_okay=False))
+@click.option("--target", type=click.Choice(["sqlite", "snowflake"]), default="sqlite", show_default=True,
+              help="Write into the local mcad.db detected_craters table or Snowflake crater_detection_results.")
+@click.option("--db", "db_path", default=None, help="Path to mcad.db (defaults to MCAD_DB_PATH).")
+def ingest_detections(directory, target, db_path):
+    """Bulk-ingest a directory of detection-output JSON files."""
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sys.path[:0] = [os.path.join(repo_root, "app", "backend"), os.path.join(repo_root, "app", "system")]
+    from insert_detection_results import iter_detection_results, bulk_insert_crater_results
+
+    results = list(iter_detection_results(directory))
+    print(f"Loaded {len(results)} detection results from {directory}")
+
+    if target == "snowflake":
+        conn = get_snowflake_connection()
+        loaded = bulk_insert_crater_results(conn, results)
+        conn.close()
+        print(f"Loaded {loaded} rows into crater_detection_results")
+    else:
+        from config import MCAD_DB_PATH
+        from mcad_database_setup import MCADDatabase
+        db = MCADDatabase(db_path or MCAD_DB_PATH)
+        added = db.ingest_detection_results(results)
+        db.close()
+        print(f"Added {added} craters to detected_craters")
+
+@click.command()
+@click.option("--format", "fmt", type=click.Choice(["arrow", "parquet", "ndjson"]), default="parquet",
+              show_default=True)
+@click.option("--source", type=click.Choice(["sqlite", "snowflake"]), default="sqlite", show_default=True,
+              help="Export lunar_images from the local mcad.db or MOON_CRATER_DATA from Snowflake.")
+@click.option("--output", "-o", default=None, help="Output file (defaults to mcad_metadata.<format>).")
+@click.option("--folder", type=int, multiple=True, help="Only export this folder (repeatable).")
+@click.option("--min-fov", type=float, default=None)
+@click.option("--max-fov", type=float, default=None)
+@click.option("--min-altitude-m", type=float, default=None)
+@click.option("--max-altitude-m", type=float, default=None)
+@click.option("--db", "db_path", default=None, help="Path to mcad.db (defaults to MCAD_DB_PATH).")
+def export_metadata(fmt, source, output, folder, min_fov, max_fov, min_altitude_m, max_altitude_m, db_path):
+    """Export per-image metadata as Arrow IPC, Parquet or NDJSON."""
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, os.path.join(repo_root, "app", "backend"))
+    from metadata_export import export_schema, sqlite_record_batches, snowflake_record_batches, write_export
+
+    output = output or f"mcad_metadata.{fmt}"
+    if source == "snowflake":
+        conn = get_snowflake_connection()
+        written = write_export(snowflake_record_batches(conn, folders=folder), fmt, output)
+        conn.close()
+    else:
+        from config import MCAD_DB_PATH
+        from mcad_database_setup import MCADDatabase
+        db = MCADDatabase(db_path or MCAD_DB_PATH)
+        batches = sqlite_record_batches(db.connection, folders=folder, min_fov=min_fov, max_fov=max_fov,
+                                        min_altitude_m=min_altitude_m, max_altitude_m=max_altitude_m)
+        written = write_export(batches, fmt, output, export_schema())
+        db.close()
+    print(f"Wrote {written} bytes to {output}")
+
+@click.command()
+@click.option("--source", type=click.Choice(["snowflake", "sqlite"]), default="snowflake", show_default=True,
+              help="Keep a connection to Snowflake or to the local mcad.db.")
+@click.option("--db", "db_path", default=None, help="Path to mcad.db (defaults to MCAD_DB_PATH).")
+@click.option("--format", "fmt", type=click.Choice(["table", "csv", "ndjson"]), default="table", show_default=True)
+@click.option("--cache-ttl", type=float, default=300, show_default=True, help="Seconds a cached result stays valid.")
+@click.option("--cache-size", type=int, default=128, show_default=True, help="Cached results (0 disables the cache).")
+@click.option("--cache-max-rows", type=int, default=10000, show_default=True,
+              help="Results with more rows are not cached.")
+@click.option("--script", type=click.Path(exists=True, dir_okay=False), default=None,
+              help="Run the queries in this file and exit.")
+@click.option("--workers", type=int, default=4, show_default=True,
+              help="Connections used to run a read-only script concurrently.")
+@click.option("--timing", is_flag=True, help="Start with \\timing on.")
+def shell(source, db_path, fmt, cache_ttl, cache_size, cache_max_rows, script, workers, timing):
+    """Interactive SQL shell with one warm connection and a query result cache."""
+    from query_shell import QueryCache, QueryShell
+
+    if source == "sqlite":
+        import sqlite3
+        repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        sys.path.insert(0, os.path.join(repo_root, "app", "backend"))
+        from config import MCAD_DB_PATH
+        path = db_path or MCAD_DB_PATH
+        connect = lambda: sqlite3.connect(path, check_same_thread=False)
+    else:
+        connect = get_snowflake_connection
+
+    session = QueryShell(connect, QueryCache(cache_size, cache_max_rows, cache_ttl), fmt)
+    session.timing = timing
+    try:
+        if script:
+            with open(script, encoding="utf-8") as f:
+                session.run_script(f.read(), workers)
+        else:
+            click.echo(f"Connected to {source}. Type \\help for commands, \\q to quit.")
+            session.repl()
+    finally:
+        session.close()
+
 # Register commands
 cli.add_command(run_query)
 cli.add_command(list_craters)
-
-print(f"SNOWFLAKE_USER={os.getenv('SNOWFLAKE_USER')}")
+cli.add_command(ingest_detections)
+cli.add_command(export_metadata)
+cli.add_command(shell)
 
 if __name__ == "__main__":
     display_ascii_art()
@@ -0,0 +1,218 @@
+"""
+Streaming query output for the CLI run_query command.
+Rows are fetched in fetchmany() batches (or, for Parquet from Snowflake, as Arrow batches) and written as
+they arrive, so memory stays bounded by one batch regardless of the result size. (Parquet from plain rows is
+spooled to a temporary file first, see ParquetWriter.)
+
+Formats: table (column-aligned text), csv, ndjson, parquet (needs pyarrow).
+"""
+import csv
+import io
+import json
+import sys
+import time
+
+FORMATS = ("table", "csv", "ndjson", "parquet")
+
+TABLE_MAX_WIDTH = 40  # Widest column in table output; longer values are cut off
+
+
+def _text(value):
+    return "NULL" if value is None else str(value)
+
+
+class TableWriter:
+    """Column-aligned text. Widths come from the header and the first batch, so output starts immediately."""
+
+    def __init__(self, stream, columns):
+        self.stream = stream
+        self.columns = columns
+        self.widths = None
+
+    def _line(self, values):
+        cells = []
+        for value, width in zip(values, self.widths):
+            if len(value) > width:
+                value = value[:width - 1] + "~"
+            cells.append(value.ljust(width))
+        return " | ".join(cells).rstrip() + "\n"
+
+    def write_batch(self, rows):
+        texts = [[_text(value) for value in row] for row in rows]
+        if self.widths is None:
+            self.widths = [min(TABLE_MAX_WIDTH, max([len(name)] + [len(row[i]) for row in texts]))
+                           for i, name in enumerate(self.columns)]
+            self.stream.write(self._line(self.columns))
+            self.stream.write("-+-".join("-" * width for width in self.widths) + "\n")
+        self.stream.write("".join(self._line(row) for row in texts))
+
+    def close(self):
+        if self.widths is None:  # Empty result: still show the header
+            self.write_batch([])
+
+
+class CsvWriter:
+    def __init__(self, stream, columns):
+        self.stream = stream
+        self.writer = csv.writer(stream)
+        self.writer.writerow(columns)
+
+    def write_batch(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        pass
+
+
+class NdjsonWriter:
+    def __init__(self, stream, columns):
+        self.stream = stream
+        self.keys = [json.dumps(name) + ":" for name in columns]
+
+    def write_batch(self, rows):
+        self.stream.write("".join(
+            "{" + ",".join(key + json.dumps(value, default=str) for key, value in zip(self.keys, row)) + "}\n"
+            for row in rows))
+
+    def close(self):
+        pass
+
+
+class ParquetWriter:
+    """
+    Parquet via pyarrow. Arrow batches that carry their own schema (Snowflake) are written straight through.
+    Rows from fetchmany() have no declared types, and a batch can be all NULL in a column or hold ints where
+    later batches hold floats, so the file schema cannot be fixed from the first batch. Row batches are typed
+    one by one and spooled to temporary Arrow IPC files; on close their schemas are unified (NULL takes the
+    type of the values, int64 widens to double, other conflicts become string) and the spool is written to
+    Parquet with that schema. Memory stays bounded by one batch.
+    """
+
+    def __init__(self, stream, columns):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self.pa, self.pq = pa, pq
+        self.stream = stream
+        self.columns = columns
+        self.schema = None
+        self.writer = None
+        self._spool = None  # TemporaryDirectory holding the IPC segments
+        self._segments = []  # (path, schema), a new segment whenever the batch schema changes
+        self._ipc = None
+
+    def _open(self, schema):
+        self.schema = schema
+        self.writer = self.pq.ParquetWriter(self.stream, schema, compression="zstd")
+
+    def _array(self, values):
+        pa = self.pa
+        try:
+            return pa.array(values)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):  # Mixed value types within the batch
+            return pa.array([None if value is None else str(value) for value in values], type=pa.string())
+
+    def write_batch(self, rows):
+        pa = self.pa
+        values = list(zip(*rows)) if rows else [()] * len(self.columns)
+        table = pa.Table.from_arrays([self._array(list(column)) for column in values], names=self.columns)
+        if self._ipc is None or not table.schema.equals(self._segments[-1][1]):
+            self._new_segment(table.schema)
+        self._ipc.write_table(table)
+
+    def _new_segment(self, schema):
+        import tempfile
+        if self._ipc is not None:
+            self._ipc.close()
+        if self._spool is None:
+            self._spool = tempfile.TemporaryDirectory(prefix="mcad-parquet-")
+        path = f"{self._spool.name}/segment_{len(self._segments)}.arrow"
+        self._ipc = self.pa.ipc.new_file(path, schema)
+        self._segments.append((path, schema))
+
+    def _column_type(self, types):
+        pa = self.pa
+        types = [t for t in types if not pa.types.is_null(t)]
+        if not types:
+            return pa.string()
+        try:
+            return pa.unify_schemas([pa.schema([("c", t)]) for t in types], promote_options="permissive").field(0).type
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            return pa.string()
+
+    def write_arrow(self, table):
+        if self.writer is None:
+            self._open(table.schema)
+        self.writer.write_table(table.cast(self.schema))
+
+    def close(self):
+        pa = self.pa
+        try:
+            if self.writer is None:
+                if not self._segments:
+                    self.write_batch([])
+                self._ipc.close()
+                self._open(pa.schema([
+                    (name, self._column_type([schema.field(i).type for _, schema in self._segments]))
+                    for i, name in enumerate(self.columns)
+                ]))
+                for path, _ in self._segments:
+                    with pa.memory_map(path) as source:
+                        reader = pa.ipc.open_file(source)
+                        for i in range(reader.num_record_batches):
+                            batch = reader.get_batch(i)
+                            arrays = [column.cast(field.type) for column, field in zip(batch.columns, self.schema)]
+                            self.writer.write_table(pa.Table.from_arrays(arrays, schema=self.schema))
+            self.writer.close()
+        finally:
+            if self._spool is not None:
+                self._spool.cleanup()
+
+
+WRITERS = {"table": TableWriter, "csv": CsvWriter, "ndjson": NdjsonWriter, "parquet": ParquetWriter}
+
+
+def open_output(fmt, output=None):
+    """(stream, needs_close) for the output file or stdout (binary for parquet)."""
+    binary = fmt == "parquet"
+    if output:
+        return (open(output, "wb") if binary else open(output, "w", newline="", encoding="utf-8")), True
+    return (sys.stdout.buffer if binary else sys.stdout), False
+
+
+def stream_query(cursor, writer_cls, stream, batch_size=10000, limit=None, progress=None):
+    """
+    Write the result of an executed cursor with writer_cls, batch by batch.
+    Stops after `limit` rows. progress(rows, seconds) is called after every batch.
+    Returns (rows written, seconds).
+    """
+    start = time.perf_counter()
+    columns = [d[0] for d in cursor.description or []]
+    writer = writer_cls(stream, columns)
+    written = 0
+
+    arrow_batches = getattr(cursor, "fetch_arrow_batches", None)
+    if writer_cls is ParquetWriter and arrow_batches is not None:
+        # Snowflake hands out typed Arrow batches directly (no per-row Python tuples)
+        for table in arrow_batches():
+            if limit is not None and written + table.num_rows > limit:
+                table = table.slice(0, limit - written)
+            writer.write_arrow(table)
+            written += table.num_rows
+            if progress:
+                progress(written, time.perf_counter() - start)
+            if limit is not None and written >= limit:
+                break
+    else:
+        while limit is None or written < limit:
+            size = batch_size if limit is None else min(batch_size, limit - written)
+            rows = cursor.fetchmany(size)
+            if not rows:
+                break
+            writer.write_batch(rows)
+            written += len(rows)
+            if progress:
+                progress(written, time.perf_counter() - start)
+    writer.close()
+    if isinstance(stream, io.TextIOBase):
+        stream.flush()
+    return written, time.perf_counter() - start
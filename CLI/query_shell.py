@@ -0,0 +1,292 @@
+"""
+Interactive MCAD shell (cli.py shell).
+Keeps one connection open for the whole session (Snowflake or the local mcad.db) instead of logging in
+for every command, and caches the results of read-only queries:
+
+    key      the normalized SQL (comments dropped, whitespace collapsed, lower case outside quotes),
+             so re-typing a query with different spacing or keyword case is still a hit
+    limits   entries expire after `ttl` seconds; at most `max_entries` results of at most `max_rows`
+             rows each are kept (larger results are streamed and not cached)
+    writes   any statement that is not read-only clears the cache
+
+Meta commands: \\timing, \\cache, \\clear, \\format <fmt>, \\run <file> [workers], \\help, \\q.
+A script (\\run or --script) is split into statements which, if they are all read-only, run concurrently
+on separate connections; results are printed in script order.
+"""
+import io
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from query_output import WRITERS
+
+_TOKENS = re.compile(r"""'(?:[^']|'')*'|"(?:[^"]|"")*"|--[^\n]*|/\*.*?\*/|\s+|;|[^'"\s;/-]+|.""", re.DOTALL)
+_READ_ONLY_START = {"select", "with", "show", "describe", "desc", "explain", "values", "list"}
+_WRITE_WORDS = {"insert", "update", "delete", "merge", "create", "drop", "alter", "truncate", "copy",
+                "put", "remove", "grant", "revoke", "attach", "detach", "vacuum", "pragma", "call", "use", "begin",
+                "commit", "rollback"}
+
+HELP = """\
+  \\timing            toggle server/client timing
+  \\cache             show query cache statistics
+  \\clear             empty the query cache
+  \\format <fmt>      output format: table, csv, ndjson
+  \\run <file> [N]    run a script of queries (read-only scripts run on N connections)
+  \\q                 quit
+End SQL statements with ';'."""
+
+
+def _tokens(sql):
+    return _TOKENS.findall(sql)
+
+
+def normalize_sql(sql):
+    """Cache key for a statement: no comments, single spaces, lower case outside quoted literals/identifiers."""
+    parts = []
+    for token in _tokens(sql):
+        if token.startswith(("--", "/*")) or token.isspace():
+            if parts and parts[-1] != " ":
+                parts.append(" ")
+        elif token.startswith(("'", '"')):
+            parts.append(token)
+        else:
+            parts.append(token.lower())
+    return "".join(parts).strip(" ;")
+
+
+def split_statements(script):
+    """Split a script on ';' outside quotes and comments, dropping empty statements."""
+    statements, current = [], []
+    for token in _tokens(script):
+        if token == ";":
+            statements.append("".join(current))
+            current = []
+        else:
+            current.append(token)
+    statements.append("".join(current))
+    return [s.strip() for s in statements if normalize_sql(s)]
+
+
+def is_read_only(sql):
+    words = re.findall(r"[a-z_]+", " ".join(t for t in normalize_sql(sql).split("'")[::2]))
+    return bool(words) and words[0] in _READ_ONLY_START and not _WRITE_WORDS.intersection(words)
+
+
+class QueryCache:
+    """TTL + LRU cache of (columns, rows) results keyed by normalized SQL."""
+
+    def __init__(self, max_entries=128, max_rows=10000, ttl=300.0):
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, columns, rows)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1], entry[2]
+
+    def put(self, key, columns, rows):
+        if self.max_entries <= 0 or len(rows) > self.max_rows:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, columns, rows)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        rows = sum(len(entry[2]) for entry in self._entries.values())
+        return (f"{len(self._entries)}/{self.max_entries} entries, {rows} rows, ttl {self.ttl:g} s, "
+                f"{self.hits} hits / {self.misses} misses ({self.hits / lookups if lookups else 0:.0%} hit rate)")
+
+
+class QueryShell:
+    """REPL state: the warm connection, the result cache and the display settings."""
+
+    def __init__(self, connect, cache=None, fmt="table", batch_size=1000, out=None):
+        self.connect = connect
+        self.conn = connect()
+        self.cache = cache if cache is not None else QueryCache()
+        self.fmt = fmt
+        self.batch_size = batch_size
+        self.out = out or sys.stdout
+        self.timing = False
+        self._local = threading.local()  # Extra connections for concurrent scripts
+        self._extra = []
+        self._extra_lock = threading.Lock()
+
+    def _worker_connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self.connect()
+            with self._extra_lock:
+                self._extra.append(conn)
+        return conn
+
+    def run_statement(self, sql, out, conn=None):
+        """Execute one statement and write its result to `out`."""
+        key = normalize_sql(sql)
+        read_only = is_read_only(sql)
+        start = time.perf_counter()
+        cached = self.cache.get(key) if read_only else None
+        if cached is not None:
+            columns, rows = cached
+            writer = WRITERS[self.fmt](out, columns)
+            writer.write_batch(rows)
+            writer.close()
+            if self.timing:
+                out.write(f"Time: cached, client {(time.perf_counter() - start) * 1000:.1f} ms ({len(rows)} rows)\n")
+            return
+
+        cursor = (conn or self.conn).cursor()
+        try:
+            cursor.execute(sql)
+            executed = time.perf_counter()
+            if not read_only:
+                self.cache.clear()
+            if cursor.description is None:  # DDL/DML
+                commit = getattr(conn or self.conn, "commit", None)
+                if commit:
+                    commit()
+                affected = cursor.rowcount if cursor.rowcount is not None and cursor.rowcount >= 0 else None
+                out.write("OK\n" if affected is None else f"OK ({affected} rows affected)\n")
+                fetch_s = render_s = 0.0
+                total = 0
+            else:
+                columns = [d[0] for d in cursor.description]
+                writer = WRITERS[self.fmt](out, columns)
+                keep = [] if read_only else None  # Rows for the cache, dropped once past max_rows
+                fetch_s = render_s = 0.0
+                total = 0
+                while True:
+                    t0 = time.perf_counter()
+                    rows = cursor.fetchmany(self.batch_size)
+                    t1 = time.perf_counter()
+                    fetch_s += t1 - t0
+                    if not rows:
+                        break
+                    writer.write_batch(rows)
+                    render_s += time.perf_counter() - t1
+                    total += len(rows)
+                    if keep is not None:
+                        keep.extend(rows)
+                        if len(keep) > self.cache.max_rows:
+                            keep = None
+                writer.close()
+                if keep is not None:
+                    self.cache.put(key, columns, keep)
+        finally:
+            cursor.close()
+        if self.timing:
+            # execute() returns once the server has run the query; fetching may still pull result batches
+            out.write(f"Time: server {(executed - start) * 1000:.1f} ms, client {(fetch_s + render_s) * 1000:.1f} ms "
+                      f"(fetch {fetch_s * 1000:.1f} ms, format {render_s * 1000:.1f} ms, {total} rows)\n")
+
+    def run_script(self, script, workers=4):
+        """Run every statement of a script, concurrently when they are all read-only; output in script order."""
+        statements = split_statements(script)
+        if not statements:
+            return
+        start = time.perf_counter()
+        if workers <= 1 or len(statements) == 1 or not all(is_read_only(s) for s in statements):
+            for sql in statements:
+                self._run_guarded(sql, self.out)
+        else:
+            def run(sql):
+                buffer = io.StringIO()
+                self._run_guarded(sql, buffer, self._worker_connection())
+                return buffer.getvalue()
+
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="mcad-shell") as pool:
+                for sql, output in zip(statements, pool.map(run, statements)):
+                    self.out.write(f"-- {normalize_sql(sql)[:80]}\n{output}")
+        if self.timing:
+            self.out.write(f"Script: {len(statements)} statements in {(time.perf_counter() - start) * 1000:.1f} ms\n")
+
+    def _run_guarded(self, sql, out, conn=None):
+        try:
+            self.run_statement(sql, out, conn)
+        except Exception as e:
+            out.write(f"Error: {e}\n")
+
+    def meta_command(self, line):
+        """Handle a backslash command; returns False to quit."""
+        command, *args = line.split()
+        if command in ("\\q", "\\quit"):
+            return False
+        if command == "\\timing":
+            self.timing = not self.timing
+            self.out.write(f"Timing is {'on' if self.timing else 'off'}.\n")
+        elif command == "\\cache":
+            self.out.write(self.cache.stats() + "\n")
+        elif command == "\\clear":
+            self.cache.clear()
+            self.out.write("Query cache cleared.\n")
+        elif command == "\\format" and args and args[0] in WRITERS and args[0] != "parquet":
+            self.fmt = args[0]
+        elif command == "\\run" and args:
+            try:
+                with open(args[0], encoding="utf-8") as f:
+                    script = f.read()
+            except OSError as e:
+                self.out.write(f"Error: {e}\n")
+            else:
+                self.run_script(script, int(args[1]) if len(args) > 1 else 4)
+        else:
+            self.out.write(HELP + "\n")
+        return True
+
+    def repl(self, prompt="mcad> "):
+        try:
+            import readline  # noqa: F401  (line editing and history for input())
+        except ImportError:
+            pass
+        buffer = []
+        while True:
+            try:
+                line = input(prompt if not buffer else "  ... ")
+            except EOFError:
+                self.out.write("\n")
+                break
+            except KeyboardInterrupt:
+                self.out.write("\n")
+                buffer = []
+                continue
+            if not buffer and line.strip().startswith("\\"):
+                if not self.meta_command(line.strip()):
+                    break
+                continue
+            buffer.append(line)
+            text = "\n".join(buffer)
+            if normalize_sql(text) and text.rstrip().endswith(";"):
+                buffer = []
+                for sql in split_statements(text):
+                    self._run_guarded(sql, self.out)
+            elif not normalize_sql(text):
+                buffer = []
+
+    def close(self):
+        for conn in [self.conn, *self._extra]:
+            try:
+                conn.close()
+            except Exception as e:
+                print(f"Error closing connection: {e}", file=sys.stderr)
@@ -2,16 +2,28 @@
 ### Implement Authentication ###
 ################################
 
-from datetime import datetime, timedelta
+import asyncio
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, UTC
 from typing import Optional
 
 import bcrypt
 import jwt
 from fastapi import Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
 from dotenv import load_dotenv
 import os
 
+from config import (
+    AUTH_WORKERS, AUTH_MAX_QUEUE, AUTH_RETRY_AFTER, TOKEN_CACHE_SIZE, USER_CACHE_SIZE, USER_CACHE_TTL
+)
+from connection_pool import PoolTimeoutError
+
 # Load environment variables
 load_dotenv()
 SECRET_KEY = os.getenv("SECRET_KEY")
@@ -33,8 +45,9 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Generate a JWT token for authentication."""
     to_encode = data.copy()
-    expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
-    to_encode.update({"exp": expire})
+    expire = datetime.now(UTC) + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
+    # jti makes every token unique, so revoking one token never affects a later login
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
@@ -47,3 +60,278 @@ def decode_access_token(token: str):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token has expired")
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+
+##########################################
+### Password Hashing Executor ############
+##########################################
+# bcrypt is deliberately slow (~100-300 ms per call). Running it inline in the request threadpool lets a
+# login burst occupy every worker thread and starve image requests, so hashing runs on a small dedicated
+# pool instead. bcrypt releases the GIL while hashing, so threads use multiple cores.
+# When AUTH_WORKERS + AUTH_MAX_QUEUE calls are already in flight, new ones are rejected with 429.
+
+class AuthExecutor:
+    """Size-limited thread pool for password hashing with a bounded queue and back-pressure."""
+
+    def __init__(self, workers=AUTH_WORKERS, max_queue=AUTH_MAX_QUEUE, retry_after=AUTH_RETRY_AFTER):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self._executor = None
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._completed = 0
+        self._rejected = 0
+        self._total_wait = 0.0
+        self._total_run = 0.0
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="auth")
+            return self._executor
+
+    def _run(self, fn, args, submitted):
+        started = time.monotonic()
+        try:
+            return fn(*args)
+        finally:
+            finished = time.monotonic()
+            with self._lock:
+                self._in_flight -= 1
+                self._completed += 1
+                self._total_wait += started - submitted
+                self._total_run += finished - started
+            self._slots.release()
+
+    def submit(self, fn, *args):
+        """Queue fn(*args); raises HTTP 429 instead of queueing more than the limit."""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many authentication requests, try again shortly",
+                headers={"Retry-After": str(self.retry_after)},
+            )
+        with self._lock:
+            self._in_flight += 1
+        try:
+            return self._get_executor().submit(self._run, fn, args, time.monotonic())
+        except Exception:
+            with self._lock:
+                self._in_flight -= 1
+            self._slots.release()
+            raise
+
+    async def run(self, fn, *args):
+        """Run fn(*args) on the pool and await the result without blocking the event loop."""
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def call(self, fn, *args):
+        """Blocking variant of run() for synchronous callers."""
+        return self.submit(fn, *args).result()
+
+    def metrics(self):
+        with self._lock:
+            completed = self._completed
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "in_flight": self._in_flight,
+                "queued": max(0, self._in_flight - self.workers),
+                "completed": completed,
+                "rejected": self._rejected,
+                "avg_wait_ms": 1000 * self._total_wait / completed if completed else 0.0,
+                "avg_run_ms": 1000 * self._total_run / completed if completed else 0.0,
+            }
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+auth_executor = AuthExecutor()
+
+async def hash_password_async(password: str) -> str:
+    """hash_password() on the auth executor."""
+    return await auth_executor.run(hash_password, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password() on the auth executor."""
+    return await auth_executor.run(verify_password, plain_password, hashed_password)
+
+
+##########################################
+### Current User Dependency + Caches #####
+##########################################
+# Verified tokens are cached until they expire, so repeat requests skip JWT decoding and HMAC
+# verification; user records are cached for USER_CACHE_TTL seconds, so protected endpoints add no
+# users-table round-trip. Revoked tokens are evicted and denied until their own expiry; the denylist
+# has no size cap (only expired entries are pruned) and is checked before the token cache.
+# All three caches are per process: with several uvicorn workers a revocation only takes effect in
+# the worker that handled it (within USER_CACHE_TTL for invalidate_user) until the token expires.
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire at a per-entry absolute time.time() deadline."""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > time.time():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value, expires_at):
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            return entry[0] if entry else None
+
+    def remove_where(self, predicate):
+        """Drop every entry whose value matches predicate(value)."""
+        with self._lock:
+            for key in [k for k, (v, _) in self._entries.items() if predicate(v)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def metrics(self):
+        with self._lock:
+            return {"size": len(self._entries), "max_size": self.max_size, "hits": self.hits, "misses": self.misses}
+
+
+class RevokedTokens:
+    """
+    Thread-safe logout denylist: token -> its exp. Unlike TTLCache nothing is evicted to make room, or a
+    revoked token would be accepted again; an entry is pruned only once its token has expired anyway.
+    """
+
+    PRUNE_INTERVAL = 60  # Seconds between sweeps for expired entries
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._pruned_at = time.time()
+
+    def add(self, token, expires_at):
+        with self._lock:
+            self._entries[token] = expires_at
+            now = time.time()
+            if now - self._pruned_at >= self.PRUNE_INTERVAL:
+                self._entries = {t: exp for t, exp in self._entries.items() if exp > now}
+                self._pruned_at = now
+
+    def __contains__(self, token):
+        with self._lock:
+            return token in self._entries
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def metrics(self):
+        with self._lock:
+            return {"size": len(self._entries)}
+
+
+token_cache = TTLCache(TOKEN_CACHE_SIZE)  # token -> verified payload, until the token's exp
+revoked_tokens = RevokedTokens()  # token -> its exp, until then
+user_cache = TTLCache(USER_CACHE_SIZE)  # username -> user record
+
+def _unauthorized(detail):
+    return HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=detail,
+                         headers={"WWW-Authenticate": "Bearer"})
+
+def verify_token(token: str) -> dict:
+    """Payload of a valid, unrevoked token, decoding it only on the first request that presents it."""
+    # The denylist comes first: a verification racing revoke_token may put a revoked token back in the cache
+    if token in revoked_tokens:
+        raise _unauthorized("Token has been revoked")
+    payload = token_cache.get(token)
+    if payload is not None:
+        return payload
+    try:
+        payload = decode_access_token(token)
+    except HTTPException as e:
+        raise _unauthorized(e.detail)
+    if "sub" not in payload or "exp" not in payload:
+        raise _unauthorized("Invalid token")
+    token_cache.put(token, payload, expires_at=payload["exp"])
+    return payload
+
+def revoke_token(token: str):
+    """Log a token out: deny it until it would have expired anyway, then evict it from the cache."""
+    payload = token_cache.get(token)
+    if payload is None:
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except jwt.InvalidTokenError:
+            return  # Expired or invalid tokens are rejected already
+    revoked_tokens.add(token, payload["exp"])
+    token_cache.pop(token)
+
+def invalidate_user(username: str):
+    """Drop a cached user record and its cached tokens (e.g. after deactivating the account)."""
+    user_cache.pop(username)
+    token_cache.remove_where(lambda payload: payload.get("sub") == username)
+
+def load_user(username: str):
+    """Fetch a user record from the users table (None if there is no such user)."""
+    from database import get_snowflake_pool
+
+    try:
+        with get_snowflake_pool().connection(owner="get_current_user") as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT id, username, email, is_active FROM users WHERE username_lower=%s",
+                        (username.lower(),))
+            row = cur.fetchone()
+            cur.close()
+    except PoolTimeoutError as e:
+        raise HTTPException(status_code=503, detail=f"Database busy: {e}")
+    except Exception as e:
+        print(f"Error loading user {username}: {e}")
+        raise HTTPException(status_code=500, detail="Database connection failed")
+    if row is None:
+        return None
+    return {"id": row[0], "username": row[1], "email": row[2], "is_active": bool(row[3])}
+
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> dict:
+    """FastAPI dependency: the active user the bearer token belongs to (401/403 otherwise)."""
+    payload = verify_token(token)
+    username = payload["sub"]
+    user = user_cache.get(username)
+    if user is None:
+        user = await run_in_threadpool(load_user, username)
+        if user is None:
+            raise _unauthorized("User no longer exists")
+        user_cache.put(username, user, expires_at=time.time() + USER_CACHE_TTL)
+    if not user["is_active"]:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Inactive user")
+    return user
+
+def auth_cache_metrics():
+    return {"tokens": token_cache.metrics(), "revoked": revoked_tokens.metrics(), "users": user_cache.metrics()}
@@ -0,0 +1,107 @@
+"""
+Load test: image request latency with and without a concurrent login burst.
+Phase 1 sends only image traffic; phase 2 adds login clients hammering /token at the same time.
+With bcrypt on the bounded auth executor, image p95/p99 should barely move in phase 2 and surplus
+logins should come back as 429 (Retry-After) instead of queueing.
+
+Needs a running server (uvicorn main:app) and an existing account.
+Run from anywhere: python benchmarks/bench_auth_load.py --username USER --password PASS
+    [--url http://127.0.0.1:8000] [--image-path /thumb/1/0?w=256] [--duration 10]
+    [--image-clients 8] [--login-clients 32]
+"""
+import argparse
+import os
+import statistics
+import threading
+import time
+from collections import Counter
+
+import requests
+
+
+def percentile(values, pct):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+def client_loop(stop, send, latencies, statuses, lock):
+    with requests.Session() as session:
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                status = send(session).status_code
+            except requests.RequestException:
+                status = "error"
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                statuses[status] += 1
+
+
+def run_phase(args, login_clients):
+    stop = threading.Event()
+    lock = threading.Lock()
+    image_latencies, image_statuses = [], Counter()
+    login_latencies, login_statuses = [], Counter()
+
+    image_url = args.url + args.image_path
+    token_url = args.url + "/token"
+    credentials = {"username": args.username, "password": args.password}
+    # Image endpoints need a bearer token; one login up front, outside the measured traffic
+    token = requests.post(token_url, data=credentials, timeout=60)
+    token.raise_for_status()
+    image_headers = {"Authorization": f"Bearer {token.json()['access_token']}"}
+
+    threads = [threading.Thread(target=client_loop, daemon=True,
+                                args=(stop, lambda s: s.get(image_url, headers=image_headers, timeout=60),
+                                      image_latencies, image_statuses, lock))
+               for _ in range(args.image_clients)]
+    threads += [threading.Thread(target=client_loop, daemon=True,
+                                 args=(stop, lambda s: s.post(token_url, data=credentials, timeout=60),
+                                       login_latencies, login_statuses, lock))
+                for _ in range(login_clients)]
+    for t in threads:
+        t.start()
+    time.sleep(args.duration)
+    stop.set()
+    for t in threads:
+        t.join()
+    return image_latencies, image_statuses, login_latencies, login_statuses
+
+
+def report(label, latencies, statuses, duration):
+    if not latencies:
+        print(f"{label:<8} no requests")
+        return
+    ms = [v * 1000 for v in latencies]
+    print(f"{label:<8} {len(ms) / duration:8.1f} req/s  p50 {statistics.median(ms):8.1f} ms  "
+          f"p95 {percentile(ms, 95):8.1f} ms  p99 {percentile(ms, 99):8.1f} ms  status {dict(statuses)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--username", default=os.getenv("MCAD_BENCH_USERNAME"))
+    parser.add_argument("--password", default=os.getenv("MCAD_BENCH_PASSWORD"))
+    parser.add_argument("--image-path", default="/thumb/1/0?w=256")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per phase")
+    parser.add_argument("--image-clients", type=int, default=8)
+    parser.add_argument("--login-clients", type=int, default=32)
+    args = parser.parse_args()
+    if not args.username or not args.password:
+        parser.error("--username and --password (or MCAD_BENCH_USERNAME/MCAD_BENCH_PASSWORD) are required")
+
+    print(f"Phase 1: {args.image_clients} image clients, no logins")
+    image_latencies, image_statuses, _, _ = run_phase(args, 0)
+    report("images", image_latencies, image_statuses, args.duration)
+
+    print(f"\nPhase 2: {args.image_clients} image clients + {args.login_clients} login clients")
+    image_latencies, image_statuses, login_latencies, login_statuses = run_phase(args, args.login_clients)
+    report("images", image_latencies, image_statuses, args.duration)
+    report("logins", login_latencies, login_statuses, args.duration)
+
+    metrics = requests.get(args.url + "/auth/metrics", timeout=10)
+    if metrics.ok:
+        print(f"\nAuth executor: {metrics.json()}")
@@ -0,0 +1,109 @@
+"""
+Benchmark: crater detection throughput (images/sec) of crater_detection.run_detection with one worker
+versus one worker per core, on synthetic 2592x2048 images with shaded craters of known size and position.
+Also reports detection recall/precision against the synthetic craters, so a faster detector that stops
+finding craters does not go unnoticed.
+Run from app/backend: python benchmarks/bench_crater_detection.py [--images N] [--workers N]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from crater_detection import run_detection
+from mcad_database_setup import MCADDatabase
+
+WIDTH, HEIGHT = 2592, 2048
+CAM_POS = (1.2e6, -1.0e6, 1.1e6)
+FOV_X, FOV_Y = 0.3490658503988659, 0.27580511636453603
+
+
+def synthetic_image(rng, n_craters):
+    """A gray lunar-like image with n_craters lit-from-one-side bowls; returns (uint8 image, [(x, y, r)])."""
+    yy, xx = np.mgrid[0:HEIGHT, 0:WIDTH].astype(np.float32)
+    image = 120 + 10 * np.sin(xx / 310 + rng.uniform(0, 6)) * np.cos(yy / 270) + rng.normal(0, 6, (HEIGHT, WIDTH))
+    sun = np.array([np.cos(a := rng.uniform(0, 2 * np.pi)), np.sin(a)])
+    craters = []
+    for _ in range(n_craters):
+        r = rng.uniform(15, 150)
+        x, y = rng.uniform(r, WIDTH - r), rng.uniform(r, HEIGHT - r)
+        x0, x1, y0, y1 = int(x - r - 2), int(x + r + 3), int(y - r - 2), int(y + r + 3)
+        dx, dy = xx[y0:y1, x0:x1] - x, yy[y0:y1, x0:x1] - y
+        d = np.hypot(dx, dy) / r
+        shade = (dx * sun[0] + dy * sun[1]) / r  # Far wall lit, near wall in shadow
+        bowl = d < 1
+        image[y0:y1, x0:x1][bowl] += 60 * shade[bowl]
+        craters.append((x, y, r))
+    return np.clip(image, 0, 255).astype(np.uint8), craters
+
+
+def make_dataset(root, n_images, craters_per_image):
+    """Write the PNGs under root and a matching lunar_images table; returns (db path, ground truth by image id)."""
+    rng = np.random.default_rng(0)
+    db = MCADDatabase(root / "bench.db")
+    truth = {}
+    for i in range(n_images):
+        folder_num, image_num = divmod(i, 10)
+        png_path = root / f"{folder_num:03d}" / f"image_{image_num}.png"
+        png_path.parent.mkdir(exist_ok=True)
+        image, craters = synthetic_image(rng, craters_per_image)
+        Image.fromarray(image).save(png_path, compress_level=1)
+        db.cursor.execute(
+            "INSERT INTO lunar_images (folder_num, image_num, png_path, json_path, cam_pos_x, cam_pos_y, cam_pos_z, "
+            "fov_x_rad, fov_y_rad, nrows, ncols) VALUES (?, ?, ?, '', ?, ?, ?, ?, ?, ?, ?)",
+            (folder_num, image_num, str(png_path), *CAM_POS, FOV_X, FOV_Y, HEIGHT, WIDTH))
+        truth[db.cursor.lastrowid] = craters
+    db.connection.commit()
+    db.connection.close()
+    return root / "bench.db", truth
+
+
+def score(db_path, truth):
+    """(recall, precision): a detection matches a crater if its center is within r/4 and radius within 25%."""
+    db = MCADDatabase(db_path)
+    found = matched = detected = 0
+    for image_id, craters in truth.items():
+        rows = np.array(db.cursor.execute(
+            "SELECT center_x, center_y, diameter_pixels / 2 FROM detected_craters WHERE image_id = ?",
+            (image_id,)).fetchall()).reshape(-1, 3)
+        detected += len(rows)
+        hits = np.zeros(len(rows), dtype=bool)
+        for x, y, r in craters:
+            ok = (np.hypot(rows[:, 0] - x, rows[:, 1] - y) < r / 4) & (np.abs(rows[:, 2] - r) < 0.25 * r)
+            found += bool(ok.any())
+            hits |= ok
+        matched += int(hits.sum())
+    db.connection.close()
+    total = sum(len(c) for c in truth.values())
+    return found / total if total else 0.0, matched / detected if detected else 0.0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--images", type=int, default=16)
+    parser.add_argument("--craters", type=int, default=25, help="Synthetic craters per image")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        start = time.perf_counter()
+        db_path, truth = make_dataset(Path(tmp_dir), args.images, args.craters)
+        print(f"Generated {args.images} synthetic images in {time.perf_counter() - start:.1f} s")
+
+        results = {}
+        for workers in sorted({1, args.workers}):
+            stats = run_detection(db_path, workers=workers, replace=True)
+            results[workers] = stats["images_per_sec"]
+        recall, precision = score(db_path, truth)
+
+    print()
+    for workers, rate in results.items():
+        print(f"{workers:>3} worker(s): {rate:8.2f} images/s  ({rate / results[1]:.2f}x)")
+    print(f"recall {recall:.0%}, precision {precision:.0%} on {args.images * args.craters} synthetic craters")
@@ -0,0 +1,80 @@
+"""
+Benchmark: hot detected_craters / lunar_images queries on a synthetic million-crater table,
+with and without the secondary indexes from MCADDatabase.initialize_database.
+Also fails (exit code 1) if EXPLAIN QUERY PLAN shows a hot query regressed to a full scan.
+Run from app/backend: python benchmarks/bench_crater_indexes.py [--craters N]
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from mcad_database_setup import MCADDatabase, HOT_QUERIES, INDEXES
+
+
+def populate(db, n_craters, n_images=2757):
+    """Fill lunar_images and detected_craters with synthetic rows."""
+    rng = np.random.default_rng(0)
+    with db.connection:
+        db.cursor.executemany(
+            "INSERT INTO lunar_images (folder_num, image_num, png_path, json_path, fov_x_rad, fov_y_rad) "
+            "VALUES (?, ?, '', '', ?, ?)",
+            ((i // 10, i % 10, float(f), 0.2758) for i, f in enumerate(rng.uniform(0.30, 0.40, n_images))),
+        )
+        diameter_px = rng.uniform(2, 300, n_craters)
+        dates = (np.datetime64("2025-01-01") + rng.integers(0, 365, n_craters)).astype(str)
+        db.cursor.executemany(
+            "INSERT INTO detected_craters (image_id, center_x, center_y, diameter_pixels, diameter_meters, "
+            "diameter_miles, confidence_score, detection_date) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            zip(rng.integers(1, n_images + 1, n_craters).tolist(), rng.uniform(0, 2592, n_craters).tolist(),
+                rng.uniform(0, 2048, n_craters).tolist(), diameter_px.tolist(), (diameter_px * 220).tolist(),
+                (diameter_px * 220 * 0.000621371).tolist(), rng.uniform(0, 1, n_craters).tolist(), dates.tolist()),
+        )
+    db.cursor.execute("ANALYZE")
+
+
+def time_queries(db, repeat):
+    timings = {}
+    for name, (query, params) in HOT_QUERIES.items():
+        start = time.perf_counter()
+        for _ in range(repeat):
+            db.cursor.execute(query, params).fetchall()
+        timings[name] = (time.perf_counter() - start) / repeat
+    return timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--craters", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db = MCADDatabase(Path(tmp_dir) / "bench.db")
+        start = time.perf_counter()
+        populate(db, args.craters)
+        print(f"Inserted {args.craters} craters in {time.perf_counter() - start:.1f} s")
+
+        problems = db.check_query_plans()
+        indexed = time_queries(db, args.repeat)
+
+        for name in INDEXES:
+            db.cursor.execute(f"DROP INDEX {name}")
+        unindexed = time_queries(db, args.repeat)
+
+        print(f"{'query':<24} {'no index':>12} {'indexed':>12} {'speedup':>9}")
+        for name in HOT_QUERIES:
+            print(f"{name:<24} {unindexed[name] * 1000:10.3f}ms {indexed[name] * 1000:10.3f}ms "
+                  f"{unindexed[name] / indexed[name]:8.1f}x")
+        db.close()
+
+    if problems:
+        for name, detail in problems:
+            print(f"FAIL: {name} -> {detail}")
+        sys.exit(1)
+    print("All hot query plans are index-driven")
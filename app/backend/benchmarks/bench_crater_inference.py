@@ -0,0 +1,97 @@
+"""
+Benchmark: batched ONNX crater inference (crater_inference.detect_tiled) on one 2592x2048 frame
+for several tile batch sizes, optionally also for the int8-quantized model and different intra-op thread counts.
+Without --model a small random-weight convolutional model with the crater model contract is generated
+(it reports no craters; only throughput is measured). Needs onnxruntime, and onnx for the generated model.
+Run from app/backend: python benchmarks/bench_crater_inference.py [--model crater.onnx] [--int8]
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from crater_inference import DEFAULT_SETTINGS, create_session, detect_tiled, make_tiles, quantize_model
+
+WIDTH, HEIGHT = 2592, 2048
+
+
+def synthetic_model(path, tile=512):
+    """Three stride-2 convolutions and a 1x1 head: (N, 1, tile, tile) -> (N, (tile / 8) ** 2, 4)."""
+    import onnx
+    from onnx import TensorProto, helper, numpy_helper
+
+    rng = np.random.default_rng(0)
+    cells = (tile // 8) ** 2
+    channels = [1, 16, 32, 32]
+    nodes, weights = [], []
+    x = "tiles"
+    for i, (c_in, c_out) in enumerate(zip(channels, channels[1:])):
+        weights += [numpy_helper.from_array((rng.normal(0, 0.1, (c_out, c_in, 3, 3))).astype(np.float32), f"w{i}"),
+                    numpy_helper.from_array(np.zeros(c_out, dtype=np.float32), f"b{i}")]
+        nodes += [helper.make_node("Conv", [x, f"w{i}", f"b{i}"], [f"conv{i}"], pads=[1, 1, 1, 1], strides=[2, 2]),
+                  helper.make_node("Relu", [f"conv{i}"], [f"relu{i}"])]
+        x = f"relu{i}"
+    weights += [
+        numpy_helper.from_array(rng.normal(0, 0.1, (4, channels[-1], 1, 1)).astype(np.float32), "w_head"),
+        numpy_helper.from_array(np.array([0, 4, cells], dtype=np.int64), "shape"),
+        # Sigmoid outputs scaled to tile pixels; confidence scaled to 0 so nothing is reported
+        numpy_helper.from_array(np.array([tile, tile, tile / 8, 0], dtype=np.float32), "scale"),
+    ]
+    nodes += [
+        helper.make_node("Conv", [x, "w_head"], ["head"]),
+        helper.make_node("Reshape", ["head", "shape"], ["flat"]),
+        helper.make_node("Transpose", ["flat"], ["cells"], perm=[0, 2, 1]),
+        helper.make_node("Sigmoid", ["cells"], ["unit"]),
+        helper.make_node("Mul", ["unit", "scale"], ["craters"]),
+    ]
+    graph = helper.make_graph(
+        nodes, "synthetic_crater_model",
+        [helper.make_tensor_value_info("tiles", TensorProto.FLOAT, ["batch", 1, tile, tile])],
+        [helper.make_tensor_value_info("craters", TensorProto.FLOAT, ["batch", cells, 4])],
+        initializer=weights,
+    )
+    onnx.save(helper.make_model(graph, opset_imports=[helper.make_opsetid("", 17)]), str(path))
+    return path
+
+
+def bench(label, model_path, batch_sizes, intra_op_threads, repeat):
+    session = create_session(model_path, intra_op_threads)
+    gray = np.random.default_rng(0).integers(0, 256, (HEIGHT, WIDTH)).astype(np.float32)
+    n_tiles = len(make_tiles(gray, DEFAULT_SETTINGS["tile_size"], DEFAULT_SETTINGS["overlap"])[0])
+    print(f"\n{label}, {intra_op_threads} intra-op thread(s), {n_tiles} tiles per frame")
+    baseline = None
+    for batch_size in batch_sizes:
+        settings = {**DEFAULT_SETTINGS, "tile_batch": batch_size}
+        detect_tiled(session, gray, settings)  # Warm-up (allocations, kernel selection)
+        start = time.perf_counter()
+        for _ in range(repeat):
+            detect_tiled(session, gray, settings)
+        seconds = (time.perf_counter() - start) / repeat
+        baseline = baseline or seconds
+        print(f"  batch {batch_size:>3}: {seconds * 1000:8.1f} ms/frame  {n_tiles / seconds:8.1f} tiles/s  "
+              f"{1 / seconds:6.2f} images/s  ({baseline / seconds:.2f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--model", help="ONNX crater model (default: generated synthetic model)")
+    parser.add_argument("--batch-sizes", default="1,2,4,8,16,32")
+    parser.add_argument("--threads", default="1", help="Comma-separated intra-op thread counts")
+    parser.add_argument("--int8", action="store_true", help="Also benchmark the int8-quantized model")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    batch_sizes = [int(b) for b in args.batch_sizes.split(",")]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        model_path = Path(args.model) if args.model else synthetic_model(Path(tmp_dir) / "synthetic.onnx")
+        models = [("float32", model_path)]
+        if args.int8:
+            models.append(("int8", quantize_model(model_path, Path(tmp_dir) / "model.int8.onnx")))
+        for threads in (int(t) for t in args.threads.split(",")):
+            for label, path in models:
+                bench(label, path, batch_sizes, threads, args.repeat)
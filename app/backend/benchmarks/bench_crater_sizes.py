@@ -0,0 +1,80 @@
+"""
+Benchmark: per-crater cost of the scalar /compute_crater_size/ endpoint (one HTTP round-trip per crater)
+versus the vectorized /compute_crater_sizes/batch endpoint, plus the raw scalar vs NumPy function cost.
+Run from app/backend: python benchmarks/bench_crater_sizes.py [--craters N]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from utils.crater_calculations import (compute_camera_altitude, compute_image_dimensions, crater_diameter_meters,
+                                       compute_crater_sizes)
+
+FOV_X, FOV_Y, WIDTH_PX = 0.3490658503988659, 0.27580511636453603, 2592
+
+
+def report(label, seconds, craters):
+    print(f"{label:<38} {seconds:8.3f} s  {seconds / craters * 1e6:10.2f} us/crater")
+
+
+def bench_functions(n_images, craters_per_image):
+    rng = np.random.default_rng(0)
+    cam_pos = rng.normal(size=(n_images, 3)) * 2.0e6
+    pixels = rng.uniform(5, 200, size=(n_images, craters_per_image))
+    n = n_images * craters_per_image
+
+    start = time.perf_counter()
+    for i in range(n_images):
+        altitude = compute_camera_altitude(cam_pos[i])
+        width_m, _ = compute_image_dimensions(altitude, FOV_X, FOV_Y)
+        for p in pixels[i]:
+            crater_diameter_meters(p, width_m, WIDTH_PX)
+    report("functions, scalar loop", time.perf_counter() - start, n)
+
+    start = time.perf_counter()
+    compute_crater_sizes(cam_pos, np.full(n_images, FOV_X), np.full(n_images, FOV_Y), np.full(n_images, WIDTH_PX),
+                         pixels.ravel(), np.repeat(np.arange(n_images), craters_per_image))
+    report("functions, vectorized", time.perf_counter() - start, n)
+
+
+def bench_endpoints(n_images, craters_per_image, scalar_sample):
+    from fastapi.testclient import TestClient
+    import main
+
+    client = TestClient(main.app)
+    rng = np.random.default_rng(0)
+    cam_pos = (rng.normal(size=(n_images, 3)) * 2.0e6).tolist()
+    pixels = rng.integers(5, 200, size=(n_images, craters_per_image)).tolist()
+    n = n_images * craters_per_image
+
+    # The scalar endpoint is slow enough that timing a sample is representative
+    start = time.perf_counter()
+    for i in range(scalar_sample):
+        client.post("/compute_crater_size/", json={"cam_pos": cam_pos[i % n_images],
+                                                    "pixel_diameter": pixels[i % n_images][0]})
+    report(f"HTTP /compute_crater_size/ (x{scalar_sample})", time.perf_counter() - start, scalar_sample)
+
+    body = {"images": [{"cam_pos": cam_pos[i], "pixel_diameters": pixels[i]} for i in range(n_images)]}
+    start = time.perf_counter()
+    response = client.post("/compute_crater_sizes/batch", json=body)
+    response.raise_for_status()
+    report("HTTP /compute_crater_sizes/batch", time.perf_counter() - start, n)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--images", type=int, default=100)
+    parser.add_argument("--craters", type=int, default=500, help="craters per image")
+    parser.add_argument("--scalar-sample", type=int, default=500)
+    parser.add_argument("--skip-http", action="store_true")
+    args = parser.parse_args()
+
+    print(f"{args.images} images x {args.craters} craters = {args.images * args.craters} craters")
+    bench_functions(args.images, args.craters)
+    if not args.skip_http:
+        bench_endpoints(args.images, args.craters, args.scalar_sample)
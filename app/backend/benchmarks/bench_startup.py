@@ -0,0 +1,56 @@
+"""
+Benchmark: backend import/startup cost.
+Imports main.py in a fresh interpreter several times (no network or database access should happen at
+import time) and reports the wall time plus the slowest modules from `python -X importtime`.
+Run from app/backend: python benchmarks/bench_startup.py [--runs N] [--max-seconds S]
+Exits with code 1 if the median import time exceeds --max-seconds.
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+
+def time_import(module):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", f"import {module}"], cwd=BACKEND_DIR, check=True)
+    return time.perf_counter() - start
+
+
+def slowest_imports(module, top):
+    """(cumulative microseconds, module) for the slowest imports according to -X importtime."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=BACKEND_DIR, capture_output=True, text=True, check=True)
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        entries.append((int(cumulative_us), name.strip()))
+    return sorted(entries, reverse=True)[:top]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--max-seconds", type=float, default=None)
+    args = parser.parse_args()
+
+    times = [time_import(args.module) for _ in range(args.runs)]
+    median = statistics.median(times)
+    print(f"import {args.module}: median {median:.3f} s, min {min(times):.3f} s, max {max(times):.3f} s "
+          f"({args.runs} runs, includes interpreter startup)")
+
+    print("\nSlowest imports (cumulative):")
+    for cumulative_us, name in slowest_imports(args.module, args.top):
+        print(f"{cumulative_us / 1000:10.1f} ms  {name}")
+
+    if args.max_seconds is not None and median > args.max_seconds:
+        print(f"\nFAIL: median import time {median:.3f} s exceeds {args.max_seconds:.3f} s")
+        sys.exit(1)
@@ -0,0 +1,70 @@
+"""
+Benchmark: case-insensitive username lookup on a large users table.
+Compares the old WHERE LOWER(username)=? query (evaluates LOWER() on every row) with the indexed
+username_lower column the endpoints now use, and with an SQLite functional index on LOWER(username).
+Snowflake is not needed: the table is built in an in-memory SQLite database, which shows the same
+full-scan vs point-lookup difference.
+Run from app/backend: python benchmarks/bench_user_lookup.py [--users 1000000] [--lookups 2000]
+"""
+import argparse
+import random
+import sqlite3
+import time
+
+QUERIES = {
+    "LOWER(username)=?, no index": "SELECT id, username, hashed_password FROM users WHERE LOWER(username)=?",
+    "username_lower=?, indexed": "SELECT id, username, hashed_password FROM users WHERE username_lower=?",
+    "LOWER(username)=?, functional index": "SELECT id, username, hashed_password FROM users WHERE LOWER(username)=?",
+}
+
+
+def build_users(conn, n_users):
+    conn.execute('''
+        CREATE TABLE users (
+            id INTEGER PRIMARY KEY,
+            username TEXT NOT NULL,
+            username_lower TEXT,
+            email TEXT NOT NULL,
+            hashed_password TEXT NOT NULL,
+            is_active INTEGER DEFAULT 1
+        )
+    ''')
+    rows = ((i, f"User{i:07d}", f"user{i:07d}", f"user{i}@example.com", "$2b$12$" + "x" * 53)
+            for i in range(n_users))
+    with conn:
+        conn.executemany("INSERT INTO users (id, username, username_lower, email, hashed_password) "
+                         "VALUES (?, ?, ?, ?, ?)", rows)
+
+
+def time_lookups(conn, query, names):
+    start = time.perf_counter()
+    for name in names:
+        row = conn.execute(query, (name,)).fetchone()
+        assert row is not None
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--scan-lookups", type=int, default=20, help="lookups for the (slow) unindexed query")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(":memory:")
+    start = time.perf_counter()
+    build_users(conn, args.users)
+    print(f"Built {args.users} users in {time.perf_counter() - start:.1f} s\n")
+
+    rng = random.Random(0)
+    names = [f"user{rng.randrange(args.users):07d}" for _ in range(args.lookups)]
+
+    for label, query in QUERIES.items():
+        if label.endswith("functional index"):
+            conn.execute("CREATE INDEX idx_users_lower_username ON users (LOWER(username))")
+        elif label.endswith("indexed"):
+            conn.execute("CREATE UNIQUE INDEX idx_users_username_lower ON users (username_lower)")
+        sample = names[:args.scan_lookups] if label.endswith("no index") else names
+        seconds = time_lookups(conn, query, sample)
+        plan = " / ".join(row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}", (names[0],)))
+        print(f"{label:<38} {seconds / len(sample) * 1e6:12.1f} us/lookup   plan: {plan}")
@@ -4,6 +4,7 @@
 #######################################
 
 import os
+from pathlib import Path
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -21,3 +22,39 @@ SNOWFLAKE_WAREHOUSE = os.getenv("SNOWFLAKE_WAREHOUSE")
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 60))
+
+# Seconds between checks of data_versions for a newer lunar_images import (in-memory metadata cache)
+METADATA_CACHE_CHECK_INTERVAL = float(os.getenv("METADATA_CACHE_CHECK_INTERVAL", 5))
+
+# Seconds between incremental rescans of MCAD_DATA_ROOT for new PNGs (file catalog behind /list_png_files)
+CATALOG_REFRESH_INTERVAL = float(os.getenv("CATALOG_REFRESH_INTERVAL", 30))
+
+# Password hashing executor (bcrypt runs on this many threads; requests beyond workers + queue get 429)
+AUTH_WORKERS = int(os.getenv("AUTH_WORKERS", max(1, min(4, (os.cpu_count() or 2) // 2))))
+AUTH_MAX_QUEUE = int(os.getenv("AUTH_MAX_QUEUE", 32))
+AUTH_RETRY_AFTER = int(os.getenv("AUTH_RETRY_AFTER", 1))  # seconds, sent in the Retry-After header
+
+# Caches behind get_current_user (verified tokens live until they expire; user records for USER_CACHE_TTL seconds)
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", 10000))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", 10000))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", 60))
+
+# Local SQLite Database (defaults to data/database/mcad.db in this repository)
+MCAD_DB_PATH = os.getenv("MCAD_DB_PATH", str(Path(__file__).resolve().parents[2] / "data" / "database" / "mcad.db"))
+
+# Root of the original MCAD data (000/image_0.png, ...), used when a stored png_path is not present on this machine
+MCAD_DATA_ROOT = os.getenv("MCAD_DATA_ROOT", str(Path(__file__).resolve().parents[2] / "data" / "original" / "mcad_moon_data"))
+
+# On-disk cache for the tile pyramids and thumbnails generated from the lunar PNGs
+MCAD_TILE_CACHE = os.getenv("MCAD_TILE_CACHE", str(Path(__file__).resolve().parents[2] / "data" / "processed" / "tiles"))
+
+# Precompiled English word index used by password validation (built by english_words.py)
+ENGLISH_WORDS_PATH = os.getenv("ENGLISH_WORDS_PATH", str(Path(__file__).resolve().parent / "data" / "english_words.idx"))
+
+# Connection Pool Configuration
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", 1))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", 10))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))  # seconds to wait for a free connection
+DB_POOL_IDLE_TIMEOUT = float(os.getenv("DB_POOL_IDLE_TIMEOUT", 300))  # seconds before idle connections are closed
+DB_POOL_LEAK_TIMEOUT = float(os.getenv("DB_POOL_LEAK_TIMEOUT", 60))  # seconds before a checkout is reported as leaked
+DB_POOL_HEALTH_CHECK_INTERVAL = float(os.getenv("DB_POOL_HEALTH_CHECK_INTERVAL", 30))
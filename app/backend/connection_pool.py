@@ -0,0 +1,327 @@
+"""
+MCAD Database Connection Pool
+Keeps a bounded set of warm database connections (Snowflake or the local SQLite mcad.db) so that
+the FastAPI endpoints check a connection out per request instead of connecting and authenticating
+on every call, and always hand it back when the request finishes.
+
+The pool handles:
+- min/max size (min_size connections are opened up front and never evicted)
+- health checks (a cheap query before reusing a connection that sat idle for a while)
+- idle eviction (connections idle longer than idle_timeout are closed)
+- leak detection (connections checked out longer than leak_timeout are reported)
+- metrics (wait time, utilization, timeouts, etc.)
+"""
+import threading
+import time
+from collections import deque
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no connection becomes available within the checkout timeout."""
+
+
+class _PooledConnection:
+    """Bookkeeping for a single connection owned by the pool."""
+    __slots__ = ("conn", "created_at", "last_used", "checked_out_at", "owner", "leak_reported")
+
+    def __init__(self, conn):
+        now = time.monotonic()
+        self.conn = conn
+        self.created_at = now
+        self.last_used = now
+        self.checked_out_at = None
+        self.owner = None
+        self.leak_reported = False
+
+
+class ConnectionPool:
+    def __init__(self, connect, name="pool", min_size=1, max_size=10, timeout=30.0, idle_timeout=300.0,
+                 leak_timeout=60.0, health_check_interval=30.0, health_check_query="SELECT 1"):
+        """
+        connect: zero-argument callable returning a new DB-API connection (or None on failure)
+        timeout: seconds to wait for a free connection before raising PoolTimeoutError
+        idle_timeout: seconds a connection may sit unused before it is closed (above min_size)
+        leak_timeout: seconds a connection may stay checked out before it is reported as leaked
+        health_check_interval: connections idle longer than this are pinged before reuse
+        """
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError(f"Invalid pool size: min_size={min_size}, max_size={max_size}")
+
+        self.connect = connect
+        self.name = name
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.leak_timeout = leak_timeout
+        self.health_check_interval = health_check_interval
+        self.health_check_query = health_check_query
+
+        self._lock = threading.Condition()
+        self._idle = deque()  # most recently used connections on the right
+        self._in_use = {}  # id(conn) -> _PooledConnection
+        self._size = 0  # idle + in use + being opened
+        self._closed = False
+        self._last_maintenance = time.monotonic()
+
+        # Metrics
+        self._checkouts = 0
+        self._waiting = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._timeouts = 0
+        self._created = 0
+        self._discarded = 0
+        self._health_check_failures = 0
+        self._leaks_detected = 0
+
+    #########################
+    ### Opening / closing ###
+    #########################
+
+    def open(self):
+        """Open min_size connections up front so the first requests do not pay connect latency."""
+        while True:
+            with self._lock:
+                if self._closed or self._size >= self.min_size:
+                    return
+                self._size += 1
+            record = self._new_connection()
+            with self._lock:
+                self._idle.append(record)
+                self._lock.notify()
+
+    def close(self):
+        """Close every idle connection; connections still checked out are closed when released."""
+        with self._lock:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+            self._lock.notify_all()
+        for record in idle:
+            self._close_quietly(record.conn)
+
+    def _new_connection(self):
+        """Open a new connection; the caller must already have reserved a slot in _size."""
+        try:
+            conn = self.connect()
+            if conn is None:
+                raise ConnectionError(f"{self.name}: could not open a database connection")
+        except Exception:
+            with self._lock:
+                self._size -= 1
+                self._lock.notify()
+            raise
+        with self._lock:
+            self._created += 1
+        return _PooledConnection(conn)
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception as e:
+            print(f"Error closing pooled connection: {e}")
+
+    ##########################
+    ### Checkout / release ###
+    ##########################
+
+    def acquire(self, owner=None):
+        """Check out a connection, waiting up to `timeout` seconds for one to become free."""
+        start = time.monotonic()
+        deadline = start + self.timeout
+
+        while True:
+            record = None
+            with self._lock:
+                evicted = self._maybe_maintain()
+                while True:
+                    if self._closed:
+                        raise RuntimeError(f"{self.name}: pool is closed")
+                    if self._idle:
+                        record = self._idle.pop()
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeoutError(
+                            f"{self.name}: no connection available after {self.timeout:.1f}s "
+                            f"({self._size}/{self.max_size} in use)"
+                        )
+                    self._waiting += 1
+                    try:
+                        self._lock.wait(remaining)
+                    finally:
+                        self._waiting -= 1
+
+            for stale in evicted:
+                self._close_quietly(stale.conn)
+
+            if record is None:
+                record = self._new_connection()
+            elif not self._check_health(record):
+                continue  # Broken connection was discarded; try again
+
+            now = time.monotonic()
+            wait = now - start
+            record.checked_out_at = now
+            record.owner = owner
+            record.leak_reported = False
+            with self._lock:
+                self._in_use[id(record.conn)] = record
+                self._checkouts += 1
+                self._total_wait += wait
+                self._max_wait = max(self._max_wait, wait)
+            return record.conn
+
+    def release(self, conn, discard=False):
+        """Return a connection to the pool (or close it if `discard` is set or it is unusable)."""
+        with self._lock:
+            record = self._in_use.pop(id(conn), None)
+        if record is None:
+            print(f"Warning: {self.name}: released a connection the pool does not own")
+            return
+
+        if not discard:
+            try:
+                conn.rollback()  # Never hand an open transaction to the next request
+            except Exception:
+                discard = True
+
+        with self._lock:
+            if discard or self._closed:
+                self._size -= 1
+                self._discarded += 1
+            else:
+                record.last_used = time.monotonic()
+                record.checked_out_at = None
+                record.owner = None
+                self._idle.append(record)
+            self._lock.notify()
+
+        if discard or self._closed:
+            self._close_quietly(conn)
+
+    def connection(self, owner=None):
+        """Context manager form of acquire/release."""
+        return _Checkout(self, owner)
+
+    #####################
+    ### Health checks ###
+    #####################
+
+    def _check_health(self, record):
+        """Ping a connection that has been idle for a while; discard it if the ping fails."""
+        if time.monotonic() - record.last_used < self.health_check_interval:
+            return True
+        try:
+            cur = record.conn.cursor()
+            cur.execute(self.health_check_query)
+            cur.fetchone()
+            cur.close()
+            return True
+        except Exception as e:
+            print(f"Warning: {self.name}: discarding unhealthy connection: {e}")
+            with self._lock:
+                self._size -= 1
+                self._discarded += 1
+                self._health_check_failures += 1
+                self._lock.notify()
+            self._close_quietly(record.conn)
+            return False
+
+    def _maybe_maintain(self):
+        """
+        Run idle eviction and leak detection at most once per health check interval (lock held).
+        Returns the evicted records so the caller can close them after releasing the lock.
+        """
+        now = time.monotonic()
+        if now - self._last_maintenance < min(self.health_check_interval, self.leak_timeout):
+            return []
+        self._last_maintenance = now
+        self._check_leaks_locked(now)
+        return self._evict_idle_locked(now)
+
+    def evict_idle(self):
+        """Close connections idle longer than idle_timeout, keeping at least min_size open."""
+        with self._lock:
+            evicted = self._evict_idle_locked(time.monotonic())
+        for record in evicted:
+            self._close_quietly(record.conn)
+        return len(evicted)
+
+    def _evict_idle_locked(self, now):
+        evicted = []
+        # Oldest idle connections are on the left
+        while self._idle and self._size > self.min_size and now - self._idle[0].last_used > self.idle_timeout:
+            evicted.append(self._idle.popleft())
+            self._size -= 1
+            self._discarded += 1
+        return evicted
+
+    def check_leaks(self):
+        """Return (owner, seconds held) for every connection checked out longer than leak_timeout."""
+        with self._lock:
+            return self._check_leaks_locked(time.monotonic())
+
+    def _check_leaks_locked(self, now):
+        leaks = []
+        for record in self._in_use.values():
+            held = now - record.checked_out_at
+            if held > self.leak_timeout:
+                leaks.append((record.owner, held))
+                if not record.leak_reported:
+                    record.leak_reported = True
+                    self._leaks_detected += 1
+                    print(f"Warning: {self.name}: possible connection leak, held {held:.1f}s by {record.owner}")
+        return leaks
+
+    ###############
+    ### Metrics ###
+    ###############
+
+    def metrics(self):
+        """Snapshot of pool usage, wait time and utilization."""
+        with self._lock:
+            in_use = len(self._in_use)
+            return {
+                "name": self.name,
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": in_use,
+                "waiting": self._waiting,
+                "utilization": in_use / self.max_size,
+                "checkouts": self._checkouts,
+                "avg_wait_ms": (self._total_wait / self._checkouts * 1000) if self._checkouts else 0.0,
+                "max_wait_ms": self._max_wait * 1000,
+                "total_wait_s": self._total_wait,
+                "timeouts": self._timeouts,
+                "created": self._created,
+                "discarded": self._discarded,
+                "health_check_failures": self._health_check_failures,
+                "leaks_detected": self._leaks_detected,
+            }
+
+
+class _Checkout:
+    """Context manager returned by ConnectionPool.connection()."""
+
+    def __init__(self, pool, owner):
+        self.pool = pool
+        self.owner = owner
+        self.conn = None
+
+    def __enter__(self):
+        self.conn = self.pool.acquire(owner=self.owner)
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.pool.release(self.conn)
+        return False
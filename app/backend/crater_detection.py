@@ -0,0 +1,384 @@
+"""
+MCAD Crater Detection
+CPU crater detector for the lunar PNGs in lunar_images, writing into detected_craters.
+
+Detection (NumPy + Pillow only, one image per worker process):
+    1. decode the PNG as 8-bit gray, reduce it DOWNSCALE times and blur it slightly
+    2. Sobel gradients; the strongest EDGE_FRACTION of the edge pixels are kept
+    3. gradient-directed circle Hough transform: every edge pixel votes for the centers at distance r
+       along (and against) its gradient direction, for geometrically spaced radii r, with one
+       np.bincount per radius instead of a per-pixel loop
+    4. per radius, local maxima of the vote map whose support (votes / circumference) reaches
+       MIN_CONFIDENCE become candidates; overlapping candidates across radii are merged, strongest first
+The support fraction is stored as confidence_score (0..1).
+
+Sizing goes through utils.crater_calculations.compute_crater_sizes for a whole batch of images at once
+(camera altitude, FOV and sensor width from lunar_images), and each batch is written in one transaction.
+Every processed image is recorded in detection_runs in the same transaction, also when no crater was found
+(or none could be sized). Recorded images, and images with detected_craters rows from an ingest, are skipped
+unless --replace is given, so an interrupted run resumes where it stopped.
+
+Run from app/backend: python crater_detection.py [--workers N] [--limit N] [--replace] [--export results.json]
+--export also writes the results in the crater_detection_results format read by
+app/system/insert_detection_results.py (iter_detection_results / bulk_insert_crater_results) for Snowflake.
+"""
+import json
+import math
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+from PIL import Image, ImageFilter
+
+from config import MCAD_DATA_ROOT, MCAD_DB_PATH
+from mcad_database_setup import METERS_TO_MILES, MCADDatabase
+from utils.crater_calculations import compute_crater_sizes
+
+DOWNSCALE = 4  # Detection runs on a 648x512 reduction of the 2592x2048 images
+MIN_RADIUS_PX = 12  # Full-resolution pixels
+MAX_RADIUS_PX = 160
+RADIUS_STEP = 1.15  # Ratio between consecutive Hough radii
+EDGE_FRACTION = 0.06  # Share of pixels kept as edge points
+MIN_GRADIENT = 24.0  # Sobel magnitude floor, so flat images do not produce edges out of noise
+MIN_CONFIDENCE = 0.45
+MAX_CRATERS = 300  # Per image, strongest first
+
+DEFAULT_SETTINGS = {
+    "downscale": DOWNSCALE,
+    "min_radius": MIN_RADIUS_PX,
+    "max_radius": MAX_RADIUS_PX,
+    "min_confidence": MIN_CONFIDENCE,
+    "max_craters": MAX_CRATERS,
+}
+
+INSERT_CRATER_SQL = '''
+INSERT INTO detected_craters (
+    image_id, center_x, center_y, diameter_pixels,
+    diameter_meters, diameter_miles, confidence_score
+) VALUES (?, ?, ?, ?, ?, ?, ?)
+'''
+
+RECORD_RUN_SQL = "INSERT OR REPLACE INTO detection_runs (image_id, crater_count) VALUES (?, ?)"
+
+
+####################
+### Detection ######
+####################
+
+def load_gray(png_path, downscale=DOWNSCALE, blur=True):
+    """The PNG as a float32 gray array reduced `downscale` times, and the full-resolution (width, height)."""
+    with Image.open(png_path) as img:
+        size = img.size
+        img = img.convert("L")
+        if downscale > 1:
+            img = img.reduce(downscale)
+        if blur:
+            img = img.filter(ImageFilter.GaussianBlur(1))
+        return np.asarray(img, dtype=np.float32), size
+
+
+def to_full_resolution(craters, downscale):
+    """
+    Map (N, >= 3) detections (center_x, center_y, radius, ...) from a load_gray reduction back to
+    full-resolution pixels, in place. Reduced pixel i averages full pixels i * downscale .. i * downscale
+    + downscale - 1, so its center is at i * downscale + (downscale - 1) / 2.
+    """
+    craters[:, 0:2] = craters[:, 0:2] * downscale + (downscale - 1) / 2
+    craters[:, 2] *= downscale
+    return craters
+
+
+def sobel(gray):
+    """Sobel x/y gradients of the interior pixels (output is 2 pixels smaller in each dimension)."""
+    left = gray[:-2, :-2] + 2 * gray[1:-1, :-2] + gray[2:, :-2]
+    right = gray[:-2, 2:] + 2 * gray[1:-1, 2:] + gray[2:, 2:]
+    top = gray[:-2, :-2] + 2 * gray[:-2, 1:-1] + gray[:-2, 2:]
+    bottom = gray[2:, :-2] + 2 * gray[2:, 1:-1] + gray[2:, 2:]
+    return right - left, bottom - top
+
+
+def _box_sum(a, size):
+    """size x size neighbourhood sums (zero padded) over the last two axes, as separable shifted adds."""
+    k = size // 2
+    height, width = a.shape[-2:]
+    p = np.pad(a, [(0, 0)] * (a.ndim - 2) + [(k, k), (k, k)])
+    columns = p[..., 0:height, :].copy()
+    for i in range(1, size):
+        columns += p[..., i:i + height, :]
+    out = columns[..., 0:width].copy()
+    for i in range(1, size):
+        out += columns[..., i:i + width]
+    return out
+
+
+def _max_filter(a, size):
+    """Separable sliding-window maximum (size x size, edge padded)."""
+    k = size // 2
+    height, width = a.shape
+    p = np.pad(a, k, mode="edge")
+    columns = p[0:height].copy()
+    for i in range(1, size):
+        np.maximum(columns, p[i:i + height], out=columns)
+    out = columns[:, 0:width].copy()
+    for i in range(1, size):
+        np.maximum(out, columns[:, i:i + width], out=out)
+    return out
+
+
+def hough_radii(min_radius, max_radius, step=RADIUS_STEP):
+    """Geometrically spaced radii (in the reduced image) from min_radius to max_radius."""
+    count = max(1, int(math.log(max_radius / min_radius) / math.log(step)) + 1)
+    return np.unique(np.round(min_radius * step ** np.arange(count)).astype(int))
+
+
+def merge_detections(candidates, max_craters):
+    """
+    Greedy non-maximum suppression, strongest first: a candidate is dropped if it is centered inside a stronger,
+    larger crater (shading inside a bowl also forms small arcs) or near the center of a stronger one of similar size.
+    """
+    candidates = candidates[np.argsort(-candidates[:, 3], kind="stable")]
+    kept = np.empty((min(len(candidates), max_craters), 4), dtype=np.float32)
+    n = 0
+    for x, y, r, score in candidates:
+        if n:
+            k = kept[:n]
+            distance = np.hypot(k[:, 0] - x, k[:, 1] - y)
+            ratio = np.maximum(k[:, 2], r) / np.minimum(k[:, 2], r)
+            if np.any(((distance < k[:, 2]) & (r < k[:, 2]))
+                      | ((distance < 0.5 * np.maximum(k[:, 2], r)) & (ratio < 2.0))):
+                continue
+        kept[n] = (x, y, r, score)
+        n += 1
+        if n == max_craters:
+            break
+    return kept[:n]
+
+
+def detect_craters(gray, min_radius, max_radius, min_confidence=MIN_CONFIDENCE, max_craters=MAX_CRATERS):
+    """
+    Circle Hough transform on a gray image. Radii are in the image's own pixels.
+    Returns an (N, 4) float32 array of (center_x, center_y, radius, confidence), strongest first.
+    """
+    gx, gy = sobel(gray)
+    magnitude = np.hypot(gx, gy)
+    threshold = max(float(np.quantile(magnitude, 1 - EDGE_FRACTION)), MIN_GRADIENT)
+    ys, xs = np.nonzero(magnitude >= threshold)
+    if len(xs) == 0:
+        return np.empty((0, 4), dtype=np.float32)
+    ux = gx[ys, xs] / magnitude[ys, xs]
+    uy = gy[ys, xs] / magnitude[ys, xs]
+    xs = xs + 1.0  # Sobel output is offset by one pixel
+    ys = ys + 1.0
+    dx = np.concatenate((ux, -ux))  # Direction from each voter to the center it votes for
+    dy = np.concatenate((uy, -uy))
+    # Vote channels: count, direction (x, y) and doubled-angle direction (x, y)
+    weights = np.stack((np.ones_like(dx), dx, dy, dx * dx - dy * dy, 2 * dx * dy))
+
+    height, width = gray.shape
+    channels = np.arange(len(weights))[:, None] * (height * width)
+    window = 5
+    found = []
+    for r in hough_radii(min_radius, max_radius):
+        # Rims are lit on one side and shadowed on the other, so the gradient points into the crater on
+        # one side and out of it on the other: vote both ways
+        cx = np.rint(np.concatenate((xs + r * ux, xs - r * ux))).astype(np.int64)
+        cy = np.rint(np.concatenate((ys + r * uy, ys - r * uy))).astype(np.int64)
+        inside = (cx >= 0) & (cx < width) & (cy >= 0) & (cy < height)
+        index = (channels + (cy[inside] * width + cx[inside])).ravel()
+        acc = np.bincount(index, weights[:, inside].ravel(), len(weights) * height * width)
+        # Votes of a rim between two Hough radii land on a small ring around its center; the vote box
+        # grows with the gap between radii so those are still counted
+        box = 2 * math.ceil(r * (RADIUS_STEP - 1) / 2) + 1
+        votes, rx, ry, rx2, ry2 = _box_sum(acc.reshape(-1, height, width).astype(np.float32), box)
+        # A rim votes from all around its center, while a shading ramp or a straight ridge votes from two
+        # opposite sides only: the resultants of the vote directions, and of the doubled angles (which do
+        # not cancel for opposite sides), are subtracted from the count
+        score = (votes - np.hypot(rx, ry) - np.hypot(rx2, ry2)) / np.float32(2 * math.pi * r)
+        peaks = (score >= min_confidence) & (score == _max_filter(score, window))
+        py, px = np.nonzero(peaks)
+        if len(px):
+            found.append(np.column_stack((px, py, np.full(len(px), r), np.minimum(score[py, px], 1.0))))
+    if not found:
+        return np.empty((0, 4), dtype=np.float32)
+    return merge_detections(np.concatenate(found).astype(np.float32), max_craters)
+
+
+def detect_image(task):
+    """
+    Worker step: detect craters in one PNG. task is (image_id, png_path, settings).
+    Returns (image_id, craters, image_width, seconds, error) with craters as (N, 4) float32
+    (center_x, center_y, radius, confidence) in full-resolution pixels.
+    Must stay a top-level function so it can run in a process pool.
+    """
+    image_id, png_path, settings = task
+    start = time.perf_counter()
+    try:
+        downscale = settings["downscale"]
+        gray, (width, _) = load_gray(png_path, downscale)
+        craters = detect_craters(gray, settings["min_radius"] / downscale, settings["max_radius"] / downscale,
+                                 settings["min_confidence"], settings["max_craters"])
+        to_full_resolution(craters, downscale)
+        return image_id, craters, width, time.perf_counter() - start, None
+    except Exception as e:
+        return image_id, None, None, time.perf_counter() - start, f"Error detecting craters in {png_path}: {e}"
+
+
+####################
+### Engine #########
+####################
+
+def _local_png_path(png_path, folder_num, image_num):
+    """The stored png_path, or the same image under MCAD_DATA_ROOT (stored paths are from the importing machine)."""
+    for path in (Path(png_path) if png_path else None,
+                 Path(MCAD_DATA_ROOT) / f"{folder_num:03d}" / f"image_{image_num}.png"):
+        if path is not None and path.is_file():
+            return path
+    return None
+
+
+def detection_result(folder_num, image_num, craters, seconds):
+    """One image's detections in the crater_detection_results (Snowflake) format."""
+    return {
+        "image_id": f"{folder_num:03d}/image_{image_num}.png",
+        "detected_craters": [
+            {"center": [round(float(x), 1), round(float(y), 1)], "radius": round(float(r), 1),
+             "confidence": round(float(c), 3)}
+            for x, y, r, c in craters
+        ],
+        "crater_count": len(craters),
+        "processing_time": round(seconds, 3),
+        "detection_timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+
+def size_craters(images, detections):
+    """
+    detected_craters rows for a batch. images maps image_id -> (cam_pos_x, cam_pos_y, cam_pos_z, fov_x, fov_y,
+    ncols); detections is a list of (image_id, craters, image_width). Every crater of the batch is sized in one
+    compute_crater_sizes call. Craters of images with unknown geometry are left out.
+    Returns (rows, unsized crater count).
+    """
+    detections = [d for d in detections if len(d[1])]
+    if not detections:
+        return [], 0
+    geometry = np.array([images[image_id] for image_id, _, _ in detections], dtype=np.float64)  # None -> nan
+    width_px = np.where(np.isnan(geometry[:, 5]), [width for _, _, width in detections], geometry[:, 5])
+    craters = np.concatenate([c for _, c, _ in detections]).astype(np.float64)
+    image_index = np.repeat(np.arange(len(detections)), [len(c) for _, c, _ in detections])
+    image_ids = np.array([image_id for image_id, _, _ in detections])[image_index]
+
+    diameter_px = 2 * craters[:, 2]
+    _, _, _, diameter_m = compute_crater_sizes(geometry[:, 0:3], geometry[:, 3], geometry[:, 4], width_px,
+                                               diameter_px, image_index)
+    sized = ~np.isnan(diameter_m)
+    rows = list(zip(image_ids[sized].tolist(), craters[sized, 0].tolist(), craters[sized, 1].tolist(),
+                    diameter_px[sized].tolist(), diameter_m[sized].tolist(),
+                    (diameter_m[sized] * METERS_TO_MILES).tolist(), craters[sized, 3].tolist()))
+    return rows, int((~sized).sum())
+
+
+def run_detection(db_path=MCAD_DB_PATH, workers=None, settings=None, replace=False, limit=None,
+                  batch_size=32, export=None, detect=detect_image, initializer=None, initargs=()):
+    """
+    Detect craters in every lunar_images PNG available on this machine and write them to detected_craters.
+    One worker process per core by default. detect is the worker step (same task/result contract as
+    detect_image) and initializer(*initargs) runs once in each worker, e.g. to load a model
+    (see crater_inference.py). Returns run statistics (including images_per_sec).
+    """
+    settings = {**DEFAULT_SETTINGS, **(settings or {})}
+    start_time = time.perf_counter()
+    db = MCADDatabase(db_path)
+
+    query = '''
+    SELECT id, folder_num, image_num, png_path, cam_pos_x, cam_pos_y, cam_pos_z, fov_x_rad, fov_y_rad, ncols
+    FROM lunar_images
+    '''
+    if not replace:
+        query += '''
+        WHERE NOT EXISTS (SELECT 1 FROM detection_runs dr WHERE dr.image_id = lunar_images.id)
+        AND NOT EXISTS (SELECT 1 FROM detected_craters dc WHERE dc.image_id = lunar_images.id)
+        '''
+    query += " ORDER BY folder_num, image_num"
+    if limit:
+        query += f" LIMIT {int(limit)}"
+    rows = db.cursor.execute(query).fetchall()
+
+    stats = {"scanned": len(rows), "processed": 0, "craters": 0, "missing": 0, "errors": 0, "unsized": 0}
+    images, keys, tasks = {}, {}, []
+    for image_id, folder_num, image_num, png_path, *geometry in rows:
+        path = _local_png_path(png_path, folder_num, image_num)
+        if path is None:
+            stats["missing"] += 1
+            continue
+        images[image_id] = geometry
+        keys[image_id] = (folder_num, image_num)
+        tasks.append((image_id, str(path), settings))
+    if stats["missing"]:
+        print(f"Warning: {stats['missing']} image(s) not found on this machine. Skipping.")
+
+    results = [] if export else None
+    batch = []
+
+    def write_batch():
+        crater_rows, unsized = size_craters(images, batch)
+        with db.connection:
+            if replace:
+                db.cursor.executemany("DELETE FROM detected_craters WHERE image_id = ?",
+                                      [(image_id,) for image_id, _, _ in batch])
+            db.cursor.executemany(INSERT_CRATER_SQL, crater_rows)
+            counts = Counter(row[0] for row in crater_rows)
+            db.cursor.executemany(RECORD_RUN_SQL, [(image_id, counts[image_id]) for image_id, _, _ in batch])
+        stats["processed"] += len(batch)
+        stats["craters"] += len(crater_rows)
+        stats["unsized"] += unsized
+        batch.clear()
+
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=initializer,
+                             initargs=initargs) as executor:
+        for image_id, craters, width, seconds, error in executor.map(detect, tasks):
+            if error:
+                print(error)
+                stats["errors"] += 1
+                continue
+            batch.append((image_id, craters, width))
+            if results is not None:
+                results.append(detection_result(*keys[image_id], craters, seconds))
+            if len(batch) >= batch_size:
+                write_batch()
+                folder_num, image_num = keys[image_id]
+                print(f"Detected {stats['craters']} craters in {stats['processed']} images "
+                      f"(up to {folder_num:03d}/image_{image_num})")
+    write_batch()
+    db.connection.close()
+
+    if export:
+        with open(export, "w") as f:
+            json.dump(results, f)
+
+    stats["seconds"] = time.perf_counter() - start_time
+    stats["images_per_sec"] = stats["processed"] / stats["seconds"] if stats["seconds"] > 0 else 0.0
+    if stats["unsized"]:
+        print(f"Warning: {stats['unsized']} crater(s) not written: image geometry is unknown")
+    print(f"Detection complete! {stats['craters']} craters in {stats['processed']} images, "
+          f"{stats['missing']} missing, {stats['errors']} errors ({stats['images_per_sec']:.2f} images/s)")
+    return stats
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Detect craters in the lunar images and store them in detected_craters")
+    parser.add_argument("--db", default=MCAD_DB_PATH)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4)
+    parser.add_argument("--limit", type=int, help="Process at most this many images")
+    parser.add_argument("--replace", action="store_true", help="Re-detect images that were already processed")
+    parser.add_argument("--min-confidence", type=float, default=MIN_CONFIDENCE)
+    parser.add_argument("--downscale", type=int, default=DOWNSCALE)
+    parser.add_argument("--export", help="Also write the results as crater_detection_results JSON")
+    args = parser.parse_args()
+    run_detection(args.db, args.workers, {"min_confidence": args.min_confidence, "downscale": args.downscale},
+                  args.replace, args.limit, export=args.export)
@@ -0,0 +1,211 @@
+"""
+MCAD Crater Inference
+Batched CPU inference for learned crater detectors exported to ONNX, writing into detected_craters
+through the crater_detection engine (process pool, batch sizing with utils.crater_calculations, resume/--replace).
+
+Each worker process loads the model once (onnxruntime InferenceSession, CPU provider) and, per image:
+    1. decodes the PNG as gray (optionally reduced `downscale` times)
+    2. cuts it into tile_size x tile_size tiles overlapping by `overlap` pixels, so a crater cut by one tile
+       edge is whole in the neighbouring tile; edge tiles are shifted inwards instead of padded
+    3. normalizes the tiles ((x / 255 - mean) / std) and runs them through the model tile_batch at a time
+    4. maps every tile detection back to image pixel coordinates and merges the duplicates from the
+       overlaps (crater_detection.merge_detections)
+    5. maps the craters of a reduced image back to full-resolution pixels the way the Hough detector does
+       (crater_detection.to_full_resolution)
+
+Model contract:
+    input   float32 (batch, channels, tile, tile), channels 1 (gray) or 3 (gray repeated); a fixed batch
+            dimension of 1 limits tile_batch to 1, a fixed tile size overrides tile_size
+    output  first output, float32 (batch, K, >= 4): center_x, center_y, radius, confidence in tile pixels;
+            unused slots have confidence 0
+
+Threads: intra_op_threads is the thread count inside one operator, inter_op_threads the count for running
+independent operators in parallel. With one model per worker the product workers * intra_op_threads should
+not exceed the number of cores (the defaults use one process per core with one thread each).
+
+int8: quantized models run the same way. quantize_model() writes a dynamically quantized (int8 weights)
+copy of a float model: python crater_inference.py --model crater.onnx --quantize crater.int8.onnx
+
+Run from app/backend: python crater_inference.py --model crater.onnx [--tile-batch N] [--workers N] [--replace]
+Needs onnxruntime (pip install onnxruntime).
+"""
+import os
+import time
+
+import numpy as np
+
+from config import MCAD_DB_PATH
+from crater_detection import load_gray, merge_detections, run_detection, to_full_resolution
+
+TILE_SIZE = 512
+OVERLAP = 64
+TILE_BATCH = 16
+MIN_CONFIDENCE = 0.5
+MAX_CRATERS = 300
+
+DEFAULT_SETTINGS = {
+    "tile_size": TILE_SIZE,
+    "overlap": OVERLAP,
+    "tile_batch": TILE_BATCH,
+    "downscale": 1,
+    "mean": 0.0,
+    "std": 1.0,
+    "min_confidence": MIN_CONFIDENCE,
+    "max_craters": MAX_CRATERS,
+}
+
+_session = None  # One InferenceSession per worker process, created by init_worker
+
+
+def create_session(model_path, intra_op_threads=1, inter_op_threads=1):
+    """An onnxruntime CPU session with all graph optimizations and the given thread counts."""
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    options.intra_op_num_threads = intra_op_threads
+    options.inter_op_num_threads = inter_op_threads
+    options.execution_mode = (ort.ExecutionMode.ORT_PARALLEL if inter_op_threads > 1
+                              else ort.ExecutionMode.ORT_SEQUENTIAL)
+    return ort.InferenceSession(str(model_path), sess_options=options, providers=["CPUExecutionProvider"])
+
+
+def init_worker(model_path, intra_op_threads=1, inter_op_threads=1):
+    """Process pool initializer: load the model once per worker."""
+    global _session
+    _session = create_session(model_path, intra_op_threads, inter_op_threads)
+
+
+def quantize_model(model_path, output_path):
+    """Write an int8 copy of a float ONNX model (dynamic quantization: int8 weights, activations at run time)."""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(str(model_path), str(output_path), weight_type=QuantType.QInt8)
+    return output_path
+
+
+def model_input(session, settings):
+    """(input name, channels, tile size, max batch) from the model's input shape (symbolic dims are free)."""
+    model_in = session.get_inputs()[0]
+    batch, channels, tile = (model_in.shape + [None] * 4)[0:3]
+    return (
+        model_in.name,
+        channels if isinstance(channels, int) else 1,
+        tile if isinstance(tile, int) else settings["tile_size"],
+        batch if isinstance(batch, int) else None,
+    )
+
+
+def tile_origins(length, tile, overlap):
+    """Tile start offsets along one axis; the last tile ends at the image edge."""
+    if length <= tile:
+        return [0]
+    stride = tile - overlap
+    origins = list(range(0, length - tile, stride))
+    return origins + [length - tile]
+
+
+def make_tiles(gray, tile, overlap):
+    """(tiles (N, tile, tile), origins (N, 2) as (x, y)). Images smaller than a tile are zero padded."""
+    height, width = gray.shape
+    if height < tile or width < tile:
+        gray = np.pad(gray, ((0, max(0, tile - height)), (0, max(0, tile - width))))
+    origins = [(x, y) for y in tile_origins(height, tile, overlap) for x in tile_origins(width, tile, overlap)]
+    tiles = np.stack([gray[y:y + tile, x:x + tile] for x, y in origins])
+    return tiles, np.array(origins, dtype=np.float32)
+
+
+def infer_tiles(session, tiles, settings):
+    """
+    Run normalized tiles through the model in batches of tile_batch.
+    Returns (N, K, 4) float32 tile detections (center_x, center_y, radius, confidence).
+    """
+    name, channels, _, max_batch = model_input(session, settings)
+    batch_size = min(settings["tile_batch"], max_batch or settings["tile_batch"])
+    tiles = ((tiles / np.float32(255) - np.float32(settings["mean"])) / np.float32(settings["std"]))[:, None]
+    if channels > 1:
+        tiles = np.repeat(tiles, channels, axis=1)
+    outputs = []
+    for start in range(0, len(tiles), batch_size):
+        batch = np.ascontiguousarray(tiles[start:start + batch_size], dtype=np.float32)
+        outputs.append(np.asarray(session.run(None, {name: batch})[0], dtype=np.float32)[..., 0:4])
+    return np.concatenate(outputs)
+
+
+def detect_tiled(session, gray, settings):
+    """
+    Craters in a gray image, in that image's pixels: tile, infer, map back to image coordinates and merge.
+    Returns an (N, 4) float32 array of (center_x, center_y, radius, confidence), strongest first.
+    """
+    _, _, tile, _ = model_input(session, settings)
+    tiles, origins = make_tiles(gray, tile, settings["overlap"])
+    detections = infer_tiles(session, tiles, settings)
+    keep = detections[..., 3] >= settings["min_confidence"]
+    tile_index, _ = np.nonzero(keep)
+    craters = detections[keep]
+    craters[:, 0:2] += origins[tile_index]
+    height, width = gray.shape
+    inside = (craters[:, 0] < width) & (craters[:, 1] < height)  # Not in the zero padding
+    return merge_detections(craters[inside], settings["max_craters"])
+
+
+def infer_image(task):
+    """
+    Worker step with the crater_detection.detect_image contract: task is (image_id, png_path, settings),
+    returns (image_id, craters, image_width, seconds, error) in full-resolution pixels.
+    Needs init_worker to have run in this process.
+    """
+    image_id, png_path, settings = task
+    start = time.perf_counter()
+    try:
+        downscale = settings["downscale"]
+        gray, (width, _) = load_gray(png_path, downscale, blur=False)
+        craters = detect_tiled(_session, gray, settings)
+        to_full_resolution(craters, downscale)
+        return image_id, craters, width, time.perf_counter() - start, None
+    except Exception as e:
+        return image_id, None, None, time.perf_counter() - start, f"Error running the crater model on {png_path}: {e}"
+
+
+def run_inference(model_path, db_path=MCAD_DB_PATH, workers=None, intra_op_threads=1, inter_op_threads=1,
+                  settings=None, replace=False, limit=None, export=None):
+    """Run the ONNX crater model over lunar_images and write the detections to detected_craters."""
+    settings = {**DEFAULT_SETTINGS, **(settings or {})}
+    # Load once here first: a missing onnxruntime or a bad model fails now with its own error instead of
+    # as a broken process pool
+    create_session(model_path, intra_op_threads, inter_op_threads)
+    workers = workers or max(1, (os.cpu_count() or 1) // intra_op_threads)
+    return run_detection(db_path, workers, settings, replace, limit, export=export, detect=infer_image,
+                         initializer=init_worker, initargs=(str(model_path), intra_op_threads, inter_op_threads))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run an ONNX crater detector over the lunar images")
+    parser.add_argument("--model", required=True, help="ONNX model (float or int8-quantized)")
+    parser.add_argument("--quantize", metavar="OUTPUT", help="Only write an int8-quantized copy of --model")
+    parser.add_argument("--db", default=MCAD_DB_PATH)
+    parser.add_argument("--workers", type=int, help="Worker processes (default: cores / intra-op threads)")
+    parser.add_argument("--intra-op-threads", type=int, default=1)
+    parser.add_argument("--inter-op-threads", type=int, default=1)
+    parser.add_argument("--tile-size", type=int, default=TILE_SIZE, help="Used when the model input size is dynamic")
+    parser.add_argument("--overlap", type=int, default=OVERLAP)
+    parser.add_argument("--tile-batch", type=int, default=TILE_BATCH)
+    parser.add_argument("--downscale", type=int, default=1)
+    parser.add_argument("--mean", type=float, default=0.0)
+    parser.add_argument("--std", type=float, default=1.0)
+    parser.add_argument("--min-confidence", type=float, default=MIN_CONFIDENCE)
+    parser.add_argument("--limit", type=int, help="Process at most this many images")
+    parser.add_argument("--replace", action="store_true", help="Re-detect images that were already processed")
+    parser.add_argument("--export", help="Also write the results as crater_detection_results JSON")
+    args = parser.parse_args()
+
+    if args.quantize:
+        print(f"Wrote {quantize_model(args.model, args.quantize)}")
+    else:
+        run_inference(args.model, args.db, args.workers, args.intra_op_threads, args.inter_op_threads,
+                      {"tile_size": args.tile_size, "overlap": args.overlap, "tile_batch": args.tile_batch,
+                       "downscale": args.downscale, "mean": args.mean, "std": args.std,
+                       "min_confidence": args.min_confidence},
+                      args.replace, args.limit, args.export)
@@ -23,8 +23,15 @@
 ### Configure Snowflake Database Connection ###
 ###############################################
 import os
-import snowflake.connector
+import sqlite3
+import threading
 from dotenv import load_dotenv
+from fastapi import HTTPException, Request
+from config import (
+    MCAD_DB_PATH, DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE, DB_POOL_TIMEOUT,
+    DB_POOL_IDLE_TIMEOUT, DB_POOL_LEAK_TIMEOUT, DB_POOL_HEALTH_CHECK_INTERVAL
+)
+from connection_pool import ConnectionPool, PoolTimeoutError
 
 # Load environment variables
 load_dotenv()
@@ -40,6 +47,8 @@ SNOWFLAKE_WAREHOUSE = os.getenv("SNOWFLAKE_WAREHOUSE")
 def get_snowflake_connection():
     """Establish and return a Snowflake database connection."""
     try:
+        # Imported here: the connector is slow to import and only needed once a connection is opened
+        import snowflake.connector
         conn = snowflake.connector.connect(
             user=SNOWFLAKE_USER,
             password=SNOWFLAKE_PASSWORD,
@@ -53,16 +62,93 @@ def get_snowflake_connection():
         print(f"Error connecting to Snowflake: {e}")
         return None
 
+def get_sqlite_connection():
+    """Establish and return a connection to the local SQLite mcad.db database."""
+    try:
+        # Pooled connections are handed to FastAPI's worker threads, so allow cross-thread use
+        return sqlite3.connect(MCAD_DB_PATH, check_same_thread=False)
+    except Exception as e:
+        print(f"Error connecting to SQLite database at {MCAD_DB_PATH}: {e}")
+        return None
+
+########################
+### Connection Pools ###
+########################
+_pools = {}
+_pools_lock = threading.Lock()
+
+def _get_pool(name, connect):
+    """Return the named pool, creating it on first use."""
+    pool = _pools.get(name)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(name)
+            if pool is None:
+                pool = ConnectionPool(
+                    connect,
+                    name=name,
+                    min_size=DB_POOL_MIN_SIZE,
+                    max_size=DB_POOL_MAX_SIZE,
+                    timeout=DB_POOL_TIMEOUT,
+                    idle_timeout=DB_POOL_IDLE_TIMEOUT,
+                    leak_timeout=DB_POOL_LEAK_TIMEOUT,
+                    health_check_interval=DB_POOL_HEALTH_CHECK_INTERVAL,
+                )
+                _pools[name] = pool
+    return pool
+
+def get_snowflake_pool():
+    """Shared pool of Snowflake connections."""
+    return _get_pool("snowflake", get_snowflake_connection)
+
+def get_sqlite_pool():
+    """Shared pool of connections to the local mcad.db."""
+    return _get_pool("sqlite", get_sqlite_connection)
+
+def pool_metrics():
+    """Metrics for every pool that has been created so far."""
+    return {name: pool.metrics() for name, pool in list(_pools.items())}
+
+def close_pools():
+    """Close all pools (called when the backend shuts down)."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
+
+def _checkout(pool, request):
+    """Check a connection out of `pool` for the lifetime of one request."""
+    try:
+        conn = pool.acquire(owner=f"{request.method} {request.url.path}")
+    except PoolTimeoutError as e:
+        raise HTTPException(status_code=503, detail=f"Database busy: {e}")
+    except Exception as e:
+        print(f"Error checking out {pool.name} connection: {e}")
+        raise HTTPException(status_code=500, detail="Database connection failed")
+    try:
+        yield conn
+    finally:
+        pool.release(conn)
+
+def get_snowflake_db(request: Request):
+    """FastAPI dependency yielding a pooled Snowflake connection for the current request."""
+    yield from _checkout(get_snowflake_pool(), request)
+
+def get_sqlite_db(request: Request):
+    """FastAPI dependency yielding a pooled SQLite (mcad.db) connection for the current request."""
+    yield from _checkout(get_sqlite_pool(), request)
+
 def create_users_table():
-    """Create the 'users' table if it does not exist."""
-    conn = get_snowflake_connection()
-    if conn:
-        try:
+    """Create the 'users' table if it does not exist, and migrate older tables to username_lower."""
+    try:
+        with get_snowflake_pool().connection(owner="create_users_table") as conn:
             cur = conn.cursor()
             cur.execute("""
                 CREATE TABLE IF NOT EXISTS users (
                     id INTEGER AUTOINCREMENT PRIMARY KEY,
                     username STRING UNIQUE NOT NULL,
+                    username_lower STRING UNIQUE,
                     email STRING UNIQUE NOT NULL,
                     hashed_password STRING NOT NULL,
                     is_active BOOLEAN DEFAULT TRUE
@@ -70,11 +156,30 @@ def create_users_table():
             """)
             conn.commit()
             cur.close()
+            migrate_users_table(conn)
             print("✅ Users table is ready.")
+    except Exception as e:
+        print(f"Error creating users table: {e}")
+
+def migrate_users_table(conn):
+    """
+    Add and backfill users.username_lower (the lowercased username, written on insert) so logins can match
+    it directly; WHERE LOWER(username)=... has to evaluate LOWER() on every row and cannot be pruned.
+    Safe to run repeatedly.
+    """
+    cur = conn.cursor()
+    try:
+        cur.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS username_lower STRING")
+        cur.execute("UPDATE users SET username_lower = LOWER(username) WHERE username_lower IS NULL")
+        if cur.rowcount:
+            print(f"Backfilled username_lower for {cur.rowcount} users")
+        conn.commit()
+        try:
+            # Point lookups on username_lower; needs Enterprise Edition, so a failure here is not fatal
+            cur.execute("ALTER TABLE users ADD SEARCH OPTIMIZATION ON EQUALITY(username_lower)")
         except Exception as e:
-            print(f"Error creating users table: {e}")
-        finally:
-            conn.close()
+            print(f"Search optimization on users.username_lower not enabled: {e}")
+    finally:
+        cur.close()
 
-# Run this function when starting the backend to ensure the table exists
-create_users_table()
+# Note: create_users_table() runs once in main.py's lifespan hook instead of at import time
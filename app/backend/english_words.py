@@ -0,0 +1,130 @@
+"""
+MCAD English Dictionary
+Compact, memory-mapped English word list used by validate_password() to reject dictionary words.
+
+Replaces `nltk.download("words")` + `set(words.words())` at import time (a network call and a 236k-entry
+set built in every uvicorn worker) with a precompiled sorted array that is memory-mapped on first use,
+so workers share the pages and lookups are a binary search.
+
+File format (little-endian):
+    b"MCADWRD1" | uint32 count | uint32 offsets[count + 1] | concatenated UTF-8 words (sorted bytewise)
+
+Build the file once (needs the NLTK "words" corpus, downloaded if missing):
+    python english_words.py
+main.py's lifespan hook calls ensure_index() at startup, which builds it the same way if it is missing.
+Lookups never build or download anything: without the file is_english_word() raises EnglishWordsUnavailable.
+"""
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from pathlib import Path
+
+from config import ENGLISH_WORDS_PATH
+
+MAGIC = b"MCADWRD1"
+_HEADER = struct.Struct("<8sI")
+
+_index = None
+_index_lock = threading.Lock()
+
+
+class EnglishWordsUnavailable(RuntimeError):
+    """The word index file has not been built."""
+
+
+class WordIndex:
+    """Read-only sorted word array backed by an mmap'd file; supports `word in index`."""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self._count = _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an MCAD word index")
+        offsets_end = _HEADER.size + 4 * (self._count + 1)
+        self._offsets = memoryview(self._mmap)[_HEADER.size:offsets_end].cast("I")
+        self._data_start = offsets_end
+
+    def __len__(self):
+        return self._count
+
+    def _word_at(self, i):
+        start = self._data_start + self._offsets[i]
+        return self._mmap[start:self._data_start + self._offsets[i + 1]]
+
+    def __contains__(self, word):
+        key = word.encode("utf-8")
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._word_at(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo < self._count and self._word_at(lo) == key
+
+
+def build_index(words, path=ENGLISH_WORDS_PATH):
+    """Write a word index file for `words` (written atomically so concurrent workers never read a partial file)."""
+    encoded = sorted({w.encode("utf-8") for w in words})
+    offsets = [0]
+    for w in encoded:
+        offsets.append(offsets[-1] + len(w))
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, len(encoded)))
+        f.write(struct.pack(f"<{len(offsets)}I", *offsets))
+        f.write(b"".join(encoded))
+    os.replace(tmp_path, path)
+    return len(encoded)
+
+
+def build_from_nltk(path=ENGLISH_WORDS_PATH):
+    """Compile the index from the NLTK "words" corpus, downloading the corpus if needed."""
+    import nltk
+    from nltk.corpus import words
+
+    try:
+        corpus = words.words()
+    except LookupError:
+        nltk.download("words", quiet=True)
+        corpus = words.words()
+    # Passwords are checked with word.lower(), so entries containing capitals could never match
+    return build_index((w for w in corpus if w == w.lower()), path)
+
+
+def ensure_index(path=ENGLISH_WORDS_PATH):
+    """Build the index from NLTK if it does not exist yet (startup/setup only, may download the corpus)."""
+    if not Path(path).is_file():
+        print(f"English word index not found at {path}; building it from NLTK")
+        build_from_nltk(path)
+    return get_english_words()
+
+
+def get_english_words():
+    """The shared word index, memory-mapped on first use. Raises EnglishWordsUnavailable if it was never built."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                if not Path(ENGLISH_WORDS_PATH).is_file():
+                    raise EnglishWordsUnavailable(
+                        f"English word index not found at {ENGLISH_WORDS_PATH}; "
+                        f"build it with: python english_words.py")
+                _index = WordIndex(ENGLISH_WORDS_PATH)
+    return _index
+
+
+def is_english_word(word):
+    """True if `word` is in the English dictionary (case-sensitive; callers lowercase first)."""
+    return word in get_english_words()
+
+
+if __name__ == "__main__":
+    count = build_from_nltk()
+    print(f"Wrote {count} words to {ENGLISH_WORDS_PATH}")
@@ -0,0 +1,193 @@
+"""
+MCAD File Catalog
+Persisted index of the PNG files per folder, so /list_png_files and /folders never list the Snowflake
+stage. The catalog lives in mcad.db:
+
+    file_catalog     (folder_num, image_num) -> file name, local png_path, size and mtime
+                     (WITHOUT ROWID, so rows are stored clustered by folder)
+    catalog_folders  folder_num -> directory mtime at the last scan, for incremental refreshes
+
+It is filled by the importer (MCADDatabase._write_import_batch) in the same transaction as
+lunar_images, rebuilt from lunar_images for databases that predate it, and refreshed incrementally by
+sync_catalog_folders(), which only rescans folders whose directory mtime changed.
+
+The backend answers listings from an in-memory FileCatalog snapshot (a dict of sorted file name
+lists), reloaded when data_versions.file_catalog changes.
+"""
+import os
+import re
+import threading
+import time
+from pathlib import Path
+
+from config import CATALOG_REFRESH_INTERVAL, MCAD_DATA_ROOT
+
+_PNG_NAME = re.compile(r"^image_(\d+)\.png$")
+
+UPSERT_CATALOG_SQL = """
+INSERT INTO file_catalog (folder_num, image_num, file_name, png_path, png_size, png_mtime_ns)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT(folder_num, image_num) DO UPDATE SET
+    file_name = excluded.file_name, png_path = excluded.png_path,
+    png_size = excluded.png_size, png_mtime_ns = excluded.png_mtime_ns
+"""
+
+BUMP_CATALOG_VERSION_SQL = """
+INSERT INTO data_versions (name, version) VALUES ('file_catalog', 1)
+ON CONFLICT(name) DO UPDATE SET version = version + 1
+"""
+
+
+def create_catalog_tables(conn):
+    """Create the catalog tables if they do not exist."""
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS file_catalog (
+        folder_num INTEGER NOT NULL,
+        image_num INTEGER NOT NULL,
+        file_name TEXT NOT NULL,
+        png_path TEXT,
+        png_size INTEGER,
+        png_mtime_ns INTEGER,
+        PRIMARY KEY (folder_num, image_num)
+    ) WITHOUT ROWID
+    ''')
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS catalog_folders (
+        folder_num INTEGER PRIMARY KEY,
+        dir_mtime_ns INTEGER NOT NULL,
+        scanned_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+
+
+def catalog_entry(folder_num, image_num, png_path, png_size=None, png_mtime_ns=None):
+    """Row tuple for UPSERT_CATALOG_SQL."""
+    return folder_num, image_num, f"image_{image_num}.png", png_path, png_size, png_mtime_ns
+
+
+def rebuild_file_catalog(conn):
+    """Rebuild the catalog from lunar_images (sizes/mtimes from import_checkpoints). Returns the row count."""
+    with conn:
+        conn.execute("DELETE FROM file_catalog")
+        conn.execute('''
+            INSERT INTO file_catalog (folder_num, image_num, file_name, png_path, png_size, png_mtime_ns)
+            SELECT li.folder_num, li.image_num, 'image_' || li.image_num || '.png', li.png_path,
+                   ic.png_size, ic.png_mtime_ns
+            FROM lunar_images li
+            LEFT JOIN import_checkpoints ic ON ic.folder_num = li.folder_num AND ic.image_num = li.image_num
+        ''')
+        count = conn.execute("SELECT COUNT(*) FROM file_catalog").fetchone()[0]
+        conn.execute(BUMP_CATALOG_VERSION_SQL)
+    return count
+
+
+def sync_catalog_folders(conn, data_root=MCAD_DATA_ROOT):
+    """
+    Incrementally refresh the catalog from the files under data_root ({folder:03d}/image_N.png).
+    Only folders whose directory mtime changed since the last scan (files added, removed or renamed)
+    are listed again. Returns the number of folders rescanned.
+    """
+    root = Path(data_root)
+    if not root.is_dir():
+        return 0
+
+    known = dict(conn.execute("SELECT folder_num, dir_mtime_ns FROM catalog_folders"))
+    changed = []
+    with os.scandir(root) as entries:
+        for entry in entries:
+            if entry.is_dir() and entry.name.isdigit():
+                mtime_ns = entry.stat().st_mtime_ns
+                if known.get(int(entry.name)) != mtime_ns:
+                    changed.append((int(entry.name), entry.path, mtime_ns))
+    if not changed:
+        return 0
+
+    with conn:
+        for folder_num, folder_path, mtime_ns in changed:
+            rows = []
+            with os.scandir(folder_path) as files:
+                for file in files:
+                    match = _PNG_NAME.match(file.name)
+                    if match and file.is_file():
+                        stat = file.stat()
+                        rows.append(catalog_entry(folder_num, int(match.group(1)), file.path,
+                                                  stat.st_size, stat.st_mtime_ns))
+            present = [row[1] for row in rows]
+            conn.execute(f"DELETE FROM file_catalog WHERE folder_num = ? AND image_num NOT IN "
+                         f"({', '.join('?' * len(present))})", (folder_num, *present))
+            conn.executemany(UPSERT_CATALOG_SQL, rows)
+            conn.execute("INSERT OR REPLACE INTO catalog_folders (folder_num, dir_mtime_ns) VALUES (?, ?)",
+                         (folder_num, mtime_ns))
+        conn.execute(BUMP_CATALOG_VERSION_SQL)
+    return len(changed)
+
+
+def _read_version(conn):
+    try:
+        row = conn.execute("SELECT version FROM data_versions WHERE name = 'file_catalog'").fetchone()
+    except Exception:  # Database created before data_versions existed
+        return None
+    return row[0] if row else 0
+
+
+class CatalogSnapshot:
+    """Immutable folder -> sorted file names mapping."""
+
+    def __init__(self, rows, version):
+        self.version = version
+        self.folders = {}
+        for folder_num, file_name in rows:  # rows arrive in primary-key order
+            self.folders.setdefault(folder_num, []).append(file_name)
+        self.total_files = len(rows)
+        # /folders response, built once per snapshot
+        self.listing = {f"{folder:03d}": files for folder, files in self.folders.items()}
+
+
+class FileCatalog:
+    """Process-wide holder of the current CatalogSnapshot."""
+
+    def __init__(self, data_root=MCAD_DATA_ROOT, refresh_interval=CATALOG_REFRESH_INTERVAL):
+        self.data_root = data_root
+        self.refresh_interval = refresh_interval
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._last_check = 0.0
+
+    def load(self, conn):
+        rows = conn.execute("SELECT folder_num, file_name FROM file_catalog ORDER BY folder_num, image_num").fetchall()
+        snapshot = CatalogSnapshot(rows, _read_version(conn))
+        self._snapshot = snapshot
+        self._last_check = time.monotonic()
+        return snapshot
+
+    def snapshot(self, conn):
+        """Current snapshot; every refresh_interval seconds new files are picked up and the version rechecked."""
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - self._last_check < self.refresh_interval:
+            return snapshot
+        with self._lock:
+            if self._snapshot is not snapshot:  # Refreshed by another request while we waited
+                return self._snapshot
+            self._last_check = time.monotonic()
+            try:
+                sync_catalog_folders(conn, self.data_root)
+            except Exception as e:
+                print(f"Error refreshing file catalog from {self.data_root}: {e}")
+            if snapshot is None or _read_version(conn) != snapshot.version:
+                snapshot = self.load(conn)
+        return snapshot
+
+    def list_folder(self, conn, folder_num, offset=0, limit=None):
+        """(file names in the folder, total count), or (None, 0) if the folder is not in the catalog."""
+        files = self.snapshot(conn).folders.get(folder_num)
+        if files is None:
+            return None, 0
+        end = None if limit is None else offset + limit
+        return files[offset:end], len(files)
+
+    def all_folders(self, conn):
+        snapshot = self.snapshot(conn)
+        return snapshot.listing, snapshot.total_files
+
+
+file_catalog = FileCatalog()
@@ -0,0 +1,188 @@
+"""
+MCAD Image Store
+Serves the lunar PNGs as raw image/png bytes instead of base64-in-JSON.
+Images are streamed in chunks straight from the local png_path files recorded in lunar_images
+(mcad.db), falling back to the Snowflake BLOB table MOON_CRATER_IMAGES when the file is not on this
+machine. Supports HTTP Range requests, ETag/Last-Modified validators and conditional GETs (304).
+"""
+import hashlib
+import os
+import re
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+
+from fastapi import HTTPException
+from fastapi.responses import Response, StreamingResponse
+
+from config import MCAD_DATA_ROOT
+
+CHUNK_SIZE = 64 * 1024  # bytes per streamed chunk
+CACHE_CONTROL = "public, max-age=86400"  # the dataset is immutable once imported
+
+_IMAGE_NAME = re.compile(r"^image_(\d+)\.png$")
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def parse_image_key(folder_number, file_name):
+    """Turn ('001', 'image_3.png') into (1, 3), the (folder_num, image_num) key used in lunar_images."""
+    match = _IMAGE_NAME.match(file_name)
+    if not folder_number.isdigit() or not match:
+        raise HTTPException(status_code=400, detail="Invalid image name. Expected '<folder>/image_<n>.png'.")
+    return int(folder_number), int(match.group(1))
+
+
+def find_png_path(conn, folder_num, image_num):
+    """Return the local path of a PNG from lunar_images, or None if it is not available on disk."""
+    cur = conn.cursor()
+    cur.execute("SELECT png_path FROM lunar_images WHERE folder_num = ? AND image_num = ?", (folder_num, image_num))
+    row = cur.fetchone()
+    cur.close()
+
+    candidates = []
+    if row and row[0]:
+        candidates.append(Path(row[0]))
+    # The stored paths are absolute paths on the machine that ran the import; also try the local data root
+    candidates.append(Path(MCAD_DATA_ROOT) / f"{folder_num:03d}" / f"image_{image_num}.png")
+
+    for path in candidates:
+        if path.is_file():
+            return path
+    return None
+
+
+def fetch_png_blob(conn, folder_number, file_name):
+    """Fetch the PNG bytes from the Snowflake BLOB table (None if not found)."""
+    cur = conn.cursor()
+    cur.execute(
+        'SELECT "Image_Data" FROM MCAD.MCAD_DATA.MOON_CRATER_IMAGES WHERE "PNG File" = %s',
+        (f"{folder_number}/{file_name}",),
+    )
+    row = cur.fetchone()
+    cur.close()
+    return row[0] if row and row[0] else None
+
+
+####################
+### HTTP helpers ###
+####################
+
+def parse_range(range_header, size):
+    """
+    Parse a single-range 'Range: bytes=...' header into an inclusive (start, end) pair.
+    Returns None when the header is absent or uses a form we do not serve (e.g. multiple ranges),
+    in which case the whole file is sent. Raises 416 for unsatisfiable ranges.
+    """
+    if not range_header:
+        return None
+    match = _RANGE.match(range_header.strip())
+    if not match:
+        return None
+
+    first, last = match.groups()
+    if first == "" and last == "":
+        return None
+    if first == "":
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise _range_not_satisfiable(size)
+        start, end = max(size - length, 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+        if start > end or start >= size:
+            raise _range_not_satisfiable(size)
+    return start, end
+
+
+def _range_not_satisfiable(size):
+    return HTTPException(status_code=416, detail="Requested range not satisfiable",
+                         headers={"Content-Range": f"bytes */{size}"})
+
+
+def _etag_matches(if_none_match, etag):
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison: W/"x" matches "x"
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return etag in tags
+
+
+def _not_modified(request, etag, mtime):
+    """True if the client's cached copy is still valid (If-None-Match takes precedence)."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and mtime is not None:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def iter_file(path, start, end, chunk_size=CHUNK_SIZE):
+    """Yield bytes start..end (inclusive) of a file in chunks without reading it all into memory."""
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def iter_bytes(data, start, end, chunk_size=CHUNK_SIZE):
+    """Yield bytes start..end (inclusive) of an in-memory buffer as zero-copy slices."""
+    view = memoryview(data)
+    for offset in range(start, end + 1, chunk_size):
+        yield view[offset:min(offset + chunk_size, end + 1)]
+
+
+def stream_png(request, size, etag, chunks, mtime=None):
+    """
+    Build the response for a PNG of `size` bytes.
+    `chunks(start, end)` returns an iterator over the requested byte range.
+    """
+    headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": CACHE_CONTROL,
+    }
+    if mtime is not None:
+        headers["Last-Modified"] = formatdate(mtime, usegmt=True)
+
+    if _not_modified(request, etag, mtime):
+        return Response(status_code=304, headers=headers)
+
+    byte_range = None
+    if_range = request.headers.get("if-range")
+    if if_range is None or if_range.strip() == etag:
+        byte_range = parse_range(request.headers.get("range"), size)
+
+    if byte_range is None:
+        headers["Content-Length"] = str(size)
+        return StreamingResponse(chunks(0, size - 1), media_type="image/png", headers=headers)
+
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(chunks(start, end), status_code=206, media_type="image/png", headers=headers)
+
+
+def file_response(request, path):
+    """Stream a PNG from disk."""
+    stat = os.stat(path)
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    return stream_png(request, stat.st_size, etag,
+                      lambda start, end: iter_file(path, start, end), mtime=stat.st_mtime)
+
+
+def blob_response(request, data):
+    """Stream a PNG that was fetched from the BLOB store."""
+    etag = f'"{hashlib.md5(data).hexdigest()}"'
+    return stream_png(request, len(data), etag, lambda start, end: iter_bytes(data, start, end))
@@ -0,0 +1,244 @@
+"""
+MCAD Image Tiles
+Multi-resolution tile pyramid and thumbnail service for the 2592x2048 lunar PNGs, keyed on
+(folder_num, image_num) from lunar_images, so clients only download the pixels they display.
+
+Pyramids are generated lazily the first time an image is requested (the source PNG is decoded once
+and every level is written out) and cached on disk under MCAD_TILE_CACHE:
+    {folder:03d}/{image}/meta.json
+    {folder:03d}/{image}/{z}/{x}_{y}.png
+    {folder:03d}/{image}/thumb_{w}.png
+Level 0 fits in a single tile; the highest level is the full-resolution image.
+The dataset is immutable once imported, so cached tiles are never invalidated (delete the cache to rebuild).
+
+To pre-generate every pyramid ahead of time run: python image_tiles.py [--workers N]
+"""
+import io
+import json
+import math
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+from fastapi import HTTPException
+from PIL import Image
+
+from config import MCAD_TILE_CACHE
+from image_store import find_png_path, fetch_png_blob
+
+TILE_SIZE = 256  # pixels per tile edge
+THUMB_STEP = 64  # thumbnail widths are rounded up to a multiple of this to bound the cache size
+
+_image_locks = {}
+_image_locks_guard = threading.Lock()
+
+
+def _image_lock(folder_num, image_num):
+    """One lock per image so concurrent requests do not generate the same pyramid twice."""
+    with _image_locks_guard:
+        return _image_locks.setdefault((folder_num, image_num), threading.Lock())
+
+
+def image_cache_dir(folder_num, image_num):
+    return Path(MCAD_TILE_CACHE) / f"{folder_num:03d}" / str(image_num)
+
+
+def max_zoom_level(width, height, tile_size=TILE_SIZE):
+    """Highest pyramid level (full resolution); level 0 fits in one tile."""
+    return max(0, math.ceil(math.log2(max(width, height) / tile_size)))
+
+
+def level_dimensions(width, height, z, max_zoom):
+    """Pixel size of the image at pyramid level z."""
+    scale = 2 ** (z - max_zoom)
+    return max(1, math.ceil(width * scale)), max(1, math.ceil(height * scale))
+
+
+def _level_info(width, height, z, max_zoom):
+    level_w, level_h = level_dimensions(width, height, z, max_zoom)
+    return {"z": z, "width": level_w, "height": level_h,
+            "cols": math.ceil(level_w / TILE_SIZE), "rows": math.ceil(level_h / TILE_SIZE)}
+
+
+def _atomic_save(image, path):
+    """Write a PNG via a temp file + rename so readers never see a half-written tile."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            image.save(f, format="PNG")
+        os.replace(tmp_path, path)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+
+
+def _atomic_write_text(text, path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+
+
+######################
+### Source loading ###
+######################
+
+def load_source_image(sqlite_conn, folder_num, image_num, snowflake_pool=None):
+    """Decode the full-resolution PNG from its local png_path, or from the Snowflake BLOB store."""
+    png_path = find_png_path(sqlite_conn, folder_num, image_num)
+    if png_path:
+        return Image.open(png_path)
+
+    if snowflake_pool is not None:
+        try:
+            with snowflake_pool.connection(owner=f"tiles {folder_num:03d}/{image_num}") as conn:
+                image_blob = fetch_png_blob(conn, f"{folder_num:03d}", f"image_{image_num}.png")
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+        if image_blob:
+            return Image.open(io.BytesIO(image_blob))
+
+    raise HTTPException(status_code=404, detail="Image not found")
+
+
+##########################
+### Pyramid generation ###
+##########################
+
+def build_pyramid(source, folder_num, image_num):
+    """Write every pyramid level of `source` to the cache and return the pyramid metadata."""
+    cache_dir = image_cache_dir(folder_num, image_num)
+    source.load()
+    width, height = source.size
+    max_zoom = max_zoom_level(width, height)
+
+    level_image = source
+    for z in range(max_zoom, -1, -1):
+        level_w, level_h = level_dimensions(width, height, z, max_zoom)
+        if level_image.size != (level_w, level_h):
+            # Each level is downsampled from the one above it, which is much cheaper than from the source
+            level_image = level_image.resize((level_w, level_h), Image.Resampling.LANCZOS)
+
+        for ty in range(math.ceil(level_h / TILE_SIZE)):
+            for tx in range(math.ceil(level_w / TILE_SIZE)):
+                box = (tx * TILE_SIZE, ty * TILE_SIZE,
+                       min((tx + 1) * TILE_SIZE, level_w), min((ty + 1) * TILE_SIZE, level_h))
+                _atomic_save(level_image.crop(box), cache_dir / str(z) / f"{tx}_{ty}.png")
+
+    meta = {
+        "folder_num": folder_num,
+        "image_num": image_num,
+        "width": width,
+        "height": height,
+        "tile_size": TILE_SIZE,
+        "max_zoom": max_zoom,
+        "levels": [_level_info(width, height, z, max_zoom) for z in range(max_zoom + 1)],
+    }
+    # meta.json is written last; its presence marks the pyramid as complete
+    _atomic_write_text(json.dumps(meta), cache_dir / "meta.json")
+    return meta
+
+
+def get_pyramid(sqlite_conn, folder_num, image_num, snowflake_pool=None):
+    """Return the pyramid metadata for an image, generating the pyramid on first use."""
+    meta_path = image_cache_dir(folder_num, image_num) / "meta.json"
+    if meta_path.is_file():
+        return json.loads(meta_path.read_text())
+
+    with _image_lock(folder_num, image_num):
+        if meta_path.is_file():  # Generated by another request while we waited
+            return json.loads(meta_path.read_text())
+        source = load_source_image(sqlite_conn, folder_num, image_num, snowflake_pool)
+        return build_pyramid(source, folder_num, image_num)
+
+
+def get_tile_path(sqlite_conn, folder_num, image_num, z, x, y, snowflake_pool=None):
+    """Path of the cached tile (z, x, y), generating the pyramid if needed."""
+    meta = get_pyramid(sqlite_conn, folder_num, image_num, snowflake_pool)
+    if not 0 <= z <= meta["max_zoom"]:
+        raise HTTPException(status_code=404, detail=f"Zoom level must be between 0 and {meta['max_zoom']}")
+    level = meta["levels"][z]
+    if not (0 <= x < level["cols"] and 0 <= y < level["rows"]):
+        raise HTTPException(status_code=404, detail="Tile out of range")
+    return image_cache_dir(folder_num, image_num) / str(z) / f"{x}_{y}.png"
+
+
+def get_thumbnail_path(sqlite_conn, folder_num, image_num, width, snowflake_pool=None):
+    """Path of a cached thumbnail at least `width` pixels wide (aspect ratio preserved)."""
+    meta = get_pyramid(sqlite_conn, folder_num, image_num, snowflake_pool)
+    width = min(max(THUMB_STEP, math.ceil(width / THUMB_STEP) * THUMB_STEP), meta["width"])
+    thumb_path = image_cache_dir(folder_num, image_num) / f"thumb_{width}.png"
+    if thumb_path.is_file():
+        return thumb_path
+
+    with _image_lock(folder_num, image_num):
+        if thumb_path.is_file():
+            return thumb_path
+        # Resize from the smallest pyramid level that is still at least as wide as the thumbnail
+        level = next(lvl for lvl in meta["levels"] if lvl["width"] >= width)
+        level_image = _assemble_level(folder_num, image_num, level)
+        height = max(1, round(meta["height"] * width / meta["width"]))
+        _atomic_save(level_image.resize((width, height), Image.Resampling.LANCZOS), thumb_path)
+    return thumb_path
+
+
+def _assemble_level(folder_num, image_num, level):
+    """Stitch the tiles of one pyramid level back into a single image."""
+    level_dir = image_cache_dir(folder_num, image_num) / str(level["z"])
+    canvas = None
+    for ty in range(level["rows"]):
+        for tx in range(level["cols"]):
+            with Image.open(level_dir / f"{tx}_{ty}.png") as tile:
+                if canvas is None:
+                    canvas = Image.new(tile.mode, (level["width"], level["height"]))
+                canvas.paste(tile, (tx * TILE_SIZE, ty * TILE_SIZE))
+    return canvas
+
+
+######################
+### Pre-generation ###
+######################
+
+def pregenerate_all(db_path, workers=4):
+    """Generate the pyramid for every image in lunar_images (skips images already cached)."""
+    import sqlite3
+    from concurrent.futures import ThreadPoolExecutor
+
+    conn = sqlite3.connect(db_path)
+    keys = conn.execute("SELECT folder_num, image_num FROM lunar_images ORDER BY folder_num, image_num").fetchall()
+    conn.close()
+
+    local = threading.local()
+
+    def generate(key):
+        if not hasattr(local, "conn"):
+            local.conn = sqlite3.connect(db_path)
+        try:
+            get_pyramid(local.conn, *key)
+            return True
+        except Exception as e:
+            print(f"Error generating tiles for {key[0]:03d}/image_{key[1]}: {e}")
+            return False
+
+    # Pillow releases the GIL while decoding and resampling, so threads scale well here
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        done = sum(executor.map(generate, keys))
+    print(f"Generated/verified {done}/{len(keys)} pyramids in {MCAD_TILE_CACHE}")
+
+
+if __name__ == "__main__":
+    import argparse
+    from config import MCAD_DB_PATH
+
+    parser = argparse.ArgumentParser(description="Pre-generate tile pyramids for all lunar images")
+    parser.add_argument("--db", default=MCAD_DB_PATH)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4)
+    args = parser.parse_args()
+    pregenerate_all(args.db, args.workers)
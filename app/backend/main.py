@@ -17,7 +17,8 @@
 # # # # # # # # # # # # # # # # # # # # # # # # # # # #
 # # # # # # # # # # # # # # # # # # # # # # # # # # # #
  installed dependencies using PyCharm terminal:
- pip install fastapi uvicorn bcrypt pyjwt python-dotenv snowflake-connector-python
+ pip install fastapi uvicorn bcrypt pyjwt python-dotenv snowflake-connector-python pillow
+ Build the English word index once (needs nltk): python english_words.py
  In PyCharm terminal press: Ctrl + C to stop the server
 """
 #####################################
@@ -25,36 +26,52 @@
 #####################################
 import json
 import re
-import nltk
-import jwt
-import bcrypt
 import os
 import numpy as np
 import base64
-from nltk.corpus import words
-from fastapi import FastAPI, Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.security import OAuth2PasswordRequestForm
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
-from datetime import datetime, timedelta, UTC  # Ensure UTC is imported
-from dotenv import load_dotenv
-from database import get_snowflake_connection
-from utils.crater_calculations import compute_camera_altitude, compute_image_dimensions, crater_diameter_meters
-from typing import List
-
-# Load environment variables
-load_dotenv()
-
-SECRET_KEY = os.getenv("SECRET_KEY")
-ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 30
-
-# Download English words dataset (only needed once)
-nltk.download("words")
-english_words = set(words.words())
-
-app = FastAPI()
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+from contextlib import asynccontextmanager
+from auth import (oauth2_scheme, create_access_token, auth_executor, hash_password_async, verify_password_async,
+                  get_current_user, revoke_token, auth_cache_metrics)
+from config import MCAD_DB_PATH
+from mcad_database_setup import MCADDatabase, EXPORT_COLUMNS, craters_for_image
+from english_words import EnglishWordsUnavailable, ensure_index, is_english_word
+from database import (create_users_table, get_snowflake_db, get_sqlite_db, get_snowflake_pool, get_sqlite_pool,
+                      close_pools, pool_metrics)
+from metadata_cache import metadata_cache
+from file_catalog import file_catalog
+from metadata_export import FORMATS, export_schema, sqlite_record_batches, snowflake_record_batches, stream_export
+from image_store import parse_image_key, find_png_path, fetch_png_blob, file_response, blob_response
+from image_tiles import get_pyramid, get_tile_path, get_thumbnail_path
+from spatial_index import images_near, images_overlapping
+from utils.crater_calculations import (compute_camera_altitude, compute_image_dimensions, crater_diameter_meters,
+                                       compute_crater_sizes)
+from typing import List, Optional
+
+# English words come from a precompiled index (see english_words.py), built if needed and mapped once at startup
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Startup/shutdown hook. Schema work runs once per worker here rather than at import time:
+    create the Snowflake users table, migrate the local mcad.db, build/map the English word index and load the
+    metadata cache and file catalog on startup, close pooled connections on shutdown.
+    """
+    create_users_table()
+    ensure_index()  # Never built on the request path; fails startup here if it cannot be built
+    MCADDatabase(MCAD_DB_PATH).close()
+    with get_sqlite_pool().connection(owner="metadata_cache") as sqlite_conn:
+        metadata_cache.load(sqlite_conn)
+        file_catalog.snapshot(sqlite_conn)
+    yield
+    auth_executor.shutdown()
+    close_pools()
+
+app = FastAPI(lifespan=lifespan)
 
 # User schema for registration
 class UserCreate(BaseModel):
@@ -92,7 +109,7 @@ def validate_password(password: str) -> bool:
     password_words = [word for word in re.findall(r'\b[a-zA-Z]+\b', password) if len(word) > 1]
     print(f"Extracted words: {password_words}")  # Debugging
 
-    if any(word.lower() in english_words for word in password_words):
+    if any(is_english_word(word.lower()) for word in password_words):
         print(f"Failed: Contains dictionary words -> {password_words}")
         return False
 
@@ -132,87 +149,163 @@ def validate_password(password: str) -> bool:
 ###################################################
 
 # Function to hash passwords
-def hash_password(password: str) -> str:
-    """Hashes the password if it meets complexity requirements."""
-    if not validate_password(password):
+def check_password_complexity(password: str):
+    """Raises 400 unless the password meets the complexity requirements (503 if the word index is missing)."""
+    try:
+        valid = validate_password(password)
+    except EnglishWordsUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    if not valid:
         raise HTTPException(
             status_code=400,
             detail="Password must be 16-64 characters long, include uppercase, lowercase, special characters, and not contain dictionary words."
         )
-    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
-
-# Function to verify passwords
-def verify_password(plain_password, hashed_password) -> bool:
-    return bcrypt.checkpw(plain_password.encode("utf-8"), hashed_password.encode("utf-8"))
 
-# Function to create JWT token
-def create_access_token(data: dict, expires_delta: timedelta = None):
-    to_encode = data.copy()
-    expire = datetime.now(UTC) + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
-    to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+# Password hashing/verification and JWT helpers live in auth.py; bcrypt runs on auth_executor
+# so a burst of logins cannot tie up the request threadpool (429 when the executor is saturated).
+
+def _find_user(conn, username_lower):
+    cur = conn.cursor()
+    cur.execute("SELECT id, username, hashed_password FROM users WHERE username_lower=%s", (username_lower,))
+    user = cur.fetchone()
+    cur.close()
+    return user
+
+def _username_or_email_taken(conn, username_lower, email):
+    cur = conn.cursor()
+    cur.execute("SELECT id FROM users WHERE username_lower=%s OR email=%s", (username_lower, email))
+    taken = cur.fetchone() is not None
+    cur.close()
+    return taken
+
+def _insert_user(conn, username_lower, email, hashed_password):
+    cur = conn.cursor()
+    cur.execute(
+        "INSERT INTO users (username, username_lower, email, hashed_password) VALUES (%s, %s, %s, %s)",
+        (username_lower, username_lower, email, hashed_password),
+    )
+    conn.commit()
+    cur.close()
+
+    # Retrieve the newly created user
+    cur = conn.cursor()
+    cur.execute("SELECT id, username, email, is_active FROM users WHERE username_lower=%s", (username_lower,))
+    new_user = cur.fetchone()
+    cur.close()
+    return new_user
 
 @app.post("/register", response_model=UserResponse)
-def register_user(user: UserCreate):
+async def register_user(user: UserCreate, conn=Depends(get_snowflake_db)):
     """Register a new user in the database."""
-    conn = get_snowflake_connection()
-    if conn:
-        try:
-            cur = conn.cursor()
-
-            # Convert username to lowercase
-            username_lower = user.username.lower()
+    try:
+        # Convert username to lowercase
+        username_lower = user.username.lower()
 
-            # Check if username or email already exists (case-insensitive check)
-            cur.execute("SELECT id FROM users WHERE LOWER(username)=%s OR email=%sc", (username_lower, user.email))
-            if cur.fetchone():
-                raise HTTPException(status_code=400, detail="Username or email already registered")
+        # Check if username or email already exists (case-insensitive check)
+        if await run_in_threadpool(_username_or_email_taken, conn, username_lower, user.email):
+            raise HTTPException(status_code=400, detail="Username or email already registered")
 
-            # Validate and hash the password
-            hashed_password = hash_password(user.password)
-
-            # Insert new user with lowercase username
-            cur.execute(
-                "INSERT INTO users (username, email, hashed_password) VALUES (%s, %s, %s)",
-                (username_lower, user.email, hashed_password),
-            )
-            conn.commit()
-            cur.close()
+        # Validate and hash the password
+        check_password_complexity(user.password)
+        hashed_password = await hash_password_async(user.password)
 
-            # Retrieve the newly created user
-            cur = conn.cursor()
-            cur.execute("SELECT id, username, email, is_active FROM users WHERE LOWER(username)=%s", (username_lower,))
-            new_user = cur.fetchone()
+        # Insert new user with lowercase username
+        new_user = await run_in_threadpool(_insert_user, conn, username_lower, user.email, hashed_password)
 
-            return UserResponse(id=new_user[0], username=new_user[1], email=new_user[2], is_active=new_user[3])
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Database error: {e}")
-        finally:
-            conn.close()
-    raise HTTPException(status_code=500, detail="Database connection failed")
+        return UserResponse(id=new_user[0], username=new_user[1], email=new_user[2], is_active=new_user[3])
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {e}")
 
 @app.post("/token")
-def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), conn=Depends(get_snowflake_db)):
     """Authenticate user and return JWT token."""
-    conn = get_snowflake_connection()
-    if conn:
-        try:
-            cur = conn.cursor()
-
-            # Convert username to lowercase when querying (case-insensitive login)
-            cur.execute("SELECT id, username, hashed_password FROM users WHERE LOWER(username)=%s", (form_data.username.lower(),))
-            user = cur.fetchone()
-            if not user or not verify_password(form_data.password, user[2]):
-                raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
-
-            # Generate JWT token
-            access_token = create_access_token(data={"sub": user[1]})
-            return {"access_token": access_token, "token_type": "bearer"}
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Database error: {e}")
-        finally:
-            conn.close()
-    raise HTTPException(status_code=500, detail="Database connection failed")
+    try:
+        # Convert username to lowercase when querying (case-insensitive login)
+        user = await run_in_threadpool(_find_user, conn, form_data.username.lower())
+        if not user or not await verify_password_async(form_data.password, user[2]):
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+
+        # Generate JWT token
+        access_token = create_access_token(data={"sub": user[1]})
+        return {"access_token": access_token, "token_type": "bearer"}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {e}")
+
+@app.post("/logout")
+def logout(token: str = Depends(oauth2_scheme), current_user: dict = Depends(get_current_user)):
+    """Revoke the bearer token used for this request."""
+    revoke_token(token)
+    return {"detail": f"Logged out {current_user['username']}"}
+
+@app.get("/users/me", response_model=UserResponse)
+def read_current_user(current_user: dict = Depends(get_current_user)):
+    """The authenticated user (served from the user cache)."""
+    return UserResponse(**current_user)
+
+@app.get("/metadata/metrics")
+def get_metadata_metrics():
+    """In-memory metadata cache size, version and hit/miss counters."""
+    return metadata_cache.metrics()
+
+@app.get("/metadata/export")
+def export_metadata(request: Request,
+                    format: str = Query("arrow", pattern="^(arrow|parquet|ndjson)$"),
+                    source: str = Query("sqlite", pattern="^(sqlite|snowflake)$"),
+                    folder: Optional[List[int]] = Query(None, description="Repeat to export several folders"),
+                    columns: Optional[str] = Query(None, description="Comma-separated subset of columns (sqlite)"),
+                    min_fov: Optional[float] = None, max_fov: Optional[float] = None,
+                    min_altitude_m: Optional[float] = None, max_altitude_m: Optional[float] = None,
+                    current_user: dict = Depends(get_current_user)):
+    """
+    Stream every image's metadata (or a filtered subset) in one response as Arrow IPC, Parquet or NDJSON.
+    source=sqlite reads lunar_images from mcad.db; source=snowflake reads MOON_CRATER_DATA (folder filter only).
+    """
+    try:
+        schema = export_schema(EXPORT_COLUMNS)
+    except ImportError:
+        raise HTTPException(status_code=501, detail="Metadata export requires pyarrow on the server")
+
+    filters = {"min_fov": min_fov, "max_fov": max_fov, "min_altitude_m": min_altitude_m,
+               "max_altitude_m": max_altitude_m}
+    owner = f"GET {request.url.path}"
+    if source == "snowflake":
+        if columns or any(value is not None for value in filters.values()):
+            raise HTTPException(status_code=400, detail="source=snowflake only supports the folder filter")
+        schema = None
+
+        def batches():
+            with get_snowflake_pool().connection(owner=owner) as conn:
+                yield from snowflake_record_batches(conn, folders=folder)
+    else:
+        selected = tuple(col.strip() for col in columns.split(",")) if columns else EXPORT_COLUMNS
+        unknown = [col for col in selected if col not in EXPORT_COLUMNS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown column(s): {', '.join(unknown)}")
+        schema = export_schema(selected)
+
+        # The connection is checked out inside the generator so it stays open while the response streams
+        def batches():
+            with get_sqlite_pool().connection(owner=owner) as conn:
+                yield from sqlite_record_batches(conn, selected, folders=folder, **filters)
+
+    media_type, extension = FORMATS[format]
+    return StreamingResponse(stream_export(batches(), format, schema), media_type=media_type,
+                             headers={"Content-Disposition": f'attachment; filename="mcad_metadata.{extension}"'})
+
+@app.get("/pool/metrics")
+def get_pool_metrics():
+    """Connection pool metrics (size, utilization, checkout wait time, timeouts, leaks)."""
+    return pool_metrics()
+
+@app.get("/auth/metrics")
+def get_auth_metrics():
+    """Password hashing executor metrics (in flight, queued, rejected with 429, average wait/run time)
+    and token/user cache hit rates."""
+    return {"executor": auth_executor.metrics(), "caches": auth_cache_metrics()}
 
 ###########################################################################
 ############# Calculate Camera Distance From Moon #########################
@@ -255,6 +348,94 @@ async def compute_crater_size(request: CraterRequest):
         "image_width_m": image_width_m,
         "crater_diameter_m": crater_size_m
     }
+
+#####################################################
+####### Batch (Vectorized) Crater Size Endpoint #####
+#####################################################
+"""
+Sizes thousands of craters from many images in one request/one NumPy pass, e.g.:
+curl -X 'POST' 'http://127.0.0.1:8000/compute_crater_sizes/batch' \
+-H 'Content-Type: application/json' \
+-d '{"images": [{"folder_num": 0, "image_num": 0, "pixel_diameters": [50, 12.5, 80]},
+                {"cam_pos": [1890303.16, 1971386.84, 2396504.62], "pixel_diameters": [50]}]}'
+"""
+
+class CraterImageBatch(BaseModel):
+    pixel_diameters: List[float]  # Crater sizes in pixels
+    # Either identify the image (camera position, FOV and width are read from lunar_images) ...
+    folder_num: Optional[int] = None
+    image_num: Optional[int] = None
+    # ... or give the geometry directly (FOV/width default to the constants above)
+    cam_pos: Optional[List[float]] = None
+    fov_x: Optional[float] = None
+    fov_y: Optional[float] = None
+    image_width_px: Optional[int] = None
+
+class CraterBatchRequest(BaseModel):
+    images: List[CraterImageBatch]
+
+def lookup_image_geometry(conn, keys):
+    """Fetch camera position, FOV and sensor width for many (folder_num, image_num) keys in one query."""
+    if not keys:
+        return {}
+    placeholders = ", ".join(["(?, ?)"] * len(keys))
+    cur = conn.cursor()
+    cur.execute(f"""
+        SELECT folder_num, image_num, cam_pos_x, cam_pos_y, cam_pos_z, fov_x_rad, fov_y_rad, ncols
+        FROM lunar_images
+        WHERE (folder_num, image_num) IN (VALUES {placeholders})
+    """, [value for key in keys for value in key])
+    rows = cur.fetchall()
+    cur.close()
+    return {(row[0], row[1]): (row[2:5], row[5], row[6], row[7]) for row in rows}
+
+@app.post("/compute_crater_sizes/batch")
+def compute_crater_sizes_batch(request: CraterBatchRequest, sqlite_conn=Depends(get_sqlite_db)):
+    """Compute crater diameters in meters for many craters across many images in one vectorized pass."""
+    keys = list({(img.folder_num, img.image_num) for img in request.images
+                 if img.cam_pos is None and img.folder_num is not None and img.image_num is not None})
+    geometry = lookup_image_geometry(sqlite_conn, keys)
+
+    cam_pos, fov_x, fov_y, width_px = [], [], [], []
+    for i, img in enumerate(request.images):
+        if img.cam_pos is not None:
+            if len(img.cam_pos) != 3:
+                raise HTTPException(status_code=400, detail=f"images[{i}]: cam_pos must have exactly three values (x, y, z)")
+            image_geometry = (img.cam_pos, FOV_X, FOV_Y, IMAGE_WIDTH_PX)
+        elif (img.folder_num, img.image_num) in geometry:
+            image_geometry = geometry[(img.folder_num, img.image_num)]
+        else:
+            raise HTTPException(status_code=404,
+                                detail=f"images[{i}]: no cam_pos given and image {img.folder_num}/{img.image_num} not found")
+        cam_pos.append(image_geometry[0])
+        # Explicit values in the request override the stored/default ones
+        fov_x.append(img.fov_x if img.fov_x is not None else image_geometry[1])
+        fov_y.append(img.fov_y if img.fov_y is not None else image_geometry[2])
+        width_px.append(img.image_width_px if img.image_width_px is not None else image_geometry[3])
+
+    counts = [len(img.pixel_diameters) for img in request.images]
+    image_index = np.repeat(np.arange(len(request.images)), counts)
+    pixel_diameters = np.fromiter((d for img in request.images for d in img.pixel_diameters),
+                                  dtype=np.float64, count=sum(counts))
+
+    altitude, image_width_m, image_height_m, crater_m = compute_crater_sizes(
+        np.array(cam_pos, dtype=np.float64).reshape(-1, 3), np.array(fov_x, dtype=np.float64),
+        np.array(fov_y, dtype=np.float64), np.array(width_px, dtype=np.float64), pixel_diameters, image_index
+    )
+
+    # Split the flat per-crater result back into one list per image
+    offsets = np.cumsum(counts)[:-1]
+    results = []
+    for i, (img, diameters) in enumerate(zip(request.images, np.split(crater_m, offsets))):
+        results.append({
+            "folder_num": img.folder_num,
+            "image_num": img.image_num,
+            "camera_altitude_m": float(altitude[i]),
+            "image_width_m": float(image_width_m[i]),
+            "image_height_m": float(image_height_m[i]),
+            "crater_diameters_m": diameters.tolist(),
+        })
+    return {"images": results, "crater_count": int(pixel_diameters.size)}
 ###########################################
 ################ Old Version ##############
 ###########################################
@@ -294,11 +475,16 @@ async def compute_crater_size(request: CraterRequest):
 ##############################
 
 @app.get("/list_png_files/{folder_number}")
-def list_png_files(folder_number: str):
-    """Fetch PNG filenames from Snowflake based on the folder number."""
-    conn = get_snowflake_connection()
-    if conn:
-        try:
+def list_png_files(folder_number: str, request: Request, offset: int = Query(0, ge=0),
+                   limit: Optional[int] = Query(None, ge=1), sqlite_conn=Depends(get_sqlite_db)):
+    """List the PNG filenames in a folder (from the file catalog, falling back to the Snowflake stage)."""
+    if folder_number.isdigit():
+        png_files, total = file_catalog.list_folder(sqlite_conn, int(folder_number), offset, limit)
+        if png_files is not None:
+            return {"png_files": png_files, "total": total, "offset": offset, "limit": limit}
+
+    try:
+        with get_snowflake_pool().connection(owner=f"GET {request.url.path}") as conn:
             cur = conn.cursor()
 
             # Query staged files for the selected folder
@@ -312,10 +498,17 @@ def list_png_files(folder_number: str):
             # Extract filenames
             png_files = [row[0].split("/")[-1] for row in cur.fetchall()]
             cur.close()
-            return {"png_files": png_files}
+        return {"png_files": png_files}
 
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+
+@app.get("/folders")
+def list_folders(sqlite_conn=Depends(get_sqlite_db)):
+    """Every folder's PNG filenames in one response ({"000": ["image_0.png", ...], ...})."""
+    folders, total_files = file_catalog.all_folders(sqlite_conn)
+    return {"folders": folders, "folder_count": len(folders), "total_files": total_files}
 
 
 ###########################################################
@@ -453,68 +646,155 @@ def list_png_files(folder_number: str):
 #             raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 # Add this endpoint below your other endpoints
 @app.get("/get_json/{folder_number}/{file_name}")
-def get_json(folder_number: str, file_name: str):
-    """Fetch JSON data from Snowflake and return it."""
-    conn = get_snowflake_connection()
-    if conn:
-        try:
+def get_json(folder_number: str, file_name: str, request: Request, current_user: dict = Depends(get_current_user),
+             sqlite_conn=Depends(get_sqlite_db)):
+    """Return an image's JSON metadata from the in-memory cache, falling back to Snowflake."""
+    # Convert filename to match PNG format
+    png_file_name = file_name.replace(".json", ".png")
+
+    folder_num, image_num = parse_image_key(folder_number, png_file_name)
+    json_data = metadata_cache.get_json(sqlite_conn, folder_num, image_num)
+    if json_data is not None:
+        return {"json_data": json_data}
+
+    try:
+        with get_snowflake_pool().connection(owner=f"GET {request.url.path}") as conn:
             cur = conn.cursor()
 
-            # Convert filename to match PNG format
-            png_file_name = file_name.replace(".json", ".png")
-
             # Query to retrieve the JSON data from the MCAD_CRATER_DATA table
-            query = f"""
+            query = """
             SELECT * 
             FROM MCAD.MCAD_DATA.MOON_CRATER_DATA
-            WHERE "PNG File" = '{folder_number}/{png_file_name}'
+            WHERE "PNG File" = %s
             """
-            cur.execute(query)
+            cur.execute(query, (f"{folder_number}/{png_file_name}",))
             column_names = [col[0] for col in cur.description]
             row = cur.fetchone()
+            cur.close()
 
-            if row:
-                # Create a dictionary with column names as keys and row values as values
-                json_data = {column_names[i]: row[i] for i in range(len(column_names))}
-                cur.close()
-                return {"json_data": json_data}
-            else:
-                raise HTTPException(status_code=404, detail="JSON data not found")
-
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
-    else:
-        raise HTTPException(status_code=500, detail="Database connection failed")
+        if row:
+            # Create a dictionary with column names as keys and row values as values
+            json_data = {column_names[i]: row[i] for i in range(len(column_names))}
+            return {"json_data": json_data}
+        else:
+            raise HTTPException(status_code=404, detail="JSON data not found")
 
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 # You might need to modify your get_png endpoint to ensure it properly identifies the file paths
 @app.get("/get_png/{folder_number}/{file_name}")
-def get_png(folder_number: str, file_name: str):
+def get_png(folder_number: str, file_name: str, current_user: dict = Depends(get_current_user),
+            conn=Depends(get_snowflake_db)):
     """Fetch PNG image from Snowflake and return it as a base64 string."""
-    conn = get_snowflake_connection()
-    if conn:
-        try:
-            cur = conn.cursor()
-
-            # Query to retrieve the PNG file as BLOB
-            query = f"""
-            SELECT "Image_Data" 
-            FROM MCAD.MCAD_DATA.MOON_CRATER_IMAGES
-            WHERE "PNG File" = '{folder_number}/{file_name}'
-            """
-            cur.execute(query)
-            image_blob = cur.fetchone()
-
-            if image_blob and image_blob[0]:
-                image_base64 = base64.b64encode(image_blob[0]).decode("utf-8")
-                cur.close()
-                return {"image_base64": image_base64}
-            else:
-                raise HTTPException(status_code=404, detail="Image not found")
-
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
-    else:
-        raise HTTPException(status_code=500, detail="Database connection failed")
+    try:
+        cur = conn.cursor()
+
+        # Query to retrieve the PNG file as BLOB
+        query = f"""
+        SELECT "Image_Data" 
+        FROM MCAD.MCAD_DATA.MOON_CRATER_IMAGES
+        WHERE "PNG File" = '{folder_number}/{file_name}'
+        """
+        cur.execute(query)
+        image_blob = cur.fetchone()
+        cur.close()
+
+        if image_blob and image_blob[0]:
+            image_base64 = base64.b64encode(image_blob[0]).decode("utf-8")
+            return {"image_base64": image_base64}
+        else:
+            raise HTTPException(status_code=404, detail="Image not found")
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+
+#############################################################
+####### 5th get_png script (raw image/png, streaming) #######
+#############################################################
+@app.get("/png/{folder_number}/{file_name}")
+def get_png_raw(folder_number: str, file_name: str, request: Request, current_user: dict = Depends(get_current_user),
+                sqlite_conn=Depends(get_sqlite_db)):
+    """
+    Stream a PNG as raw image/png (no base64/JSON wrapping).
+    Served in chunks from the local png_path file when available, otherwise from the Snowflake BLOB store.
+    Supports Range requests and conditional GETs (ETag / Last-Modified -> 304). Requires a bearer token,
+    like /get_png and the /tiles and /thumb endpoints that serve the same pixels.
+    """
+    folder_num, image_num = parse_image_key(folder_number, file_name)
+
+    png_path = find_png_path(sqlite_conn, folder_num, image_num)
+    if png_path:
+        return file_response(request, png_path)
+
+    try:
+        with get_snowflake_pool().connection(owner=f"GET {request.url.path}") as conn:
+            image_blob = fetch_png_blob(conn, folder_number, file_name)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+    if not image_blob:
+        raise HTTPException(status_code=404, detail="Image not found")
+    return blob_response(request, image_blob)
 
 
+#############################################
+####### Tiled Image Pyramid & Thumbnails ####
+#############################################
+@app.get("/tiles/{folder}/{image}")
+def get_tile_info(folder: int, image: int, current_user: dict = Depends(get_current_user),
+                  sqlite_conn=Depends(get_sqlite_db)):
+    """Pyramid metadata for an image: full size, tile size and the width/height/cols/rows of every zoom level."""
+    return get_pyramid(sqlite_conn, folder, image, get_snowflake_pool())
+
+
+@app.get("/tiles/{folder}/{image}/{z}/{x}/{y}")
+def get_tile(folder: int, image: int, z: int, x: int, y: int, request: Request,
+             current_user: dict = Depends(get_current_user), sqlite_conn=Depends(get_sqlite_db)):
+    """One 256x256 PNG tile at zoom level z (0 = whole image in one tile, max_zoom = full resolution)."""
+    tile_path = get_tile_path(sqlite_conn, folder, image, z, x, y, get_snowflake_pool())
+    return file_response(request, tile_path)
+
+
+@app.get("/thumb/{folder}/{image}")
+def get_thumbnail(folder: int, image: int, request: Request, w: int = Query(256, ge=1, le=4096),
+                  current_user: dict = Depends(get_current_user), sqlite_conn=Depends(get_sqlite_db)):
+    """Downscaled PNG preview about `w` pixels wide (rounded up to a multiple of 64, capped at full width)."""
+    thumb_path = get_thumbnail_path(sqlite_conn, folder, image, w, get_snowflake_pool())
+    return file_response(request, thumb_path)
+
+
+@app.get("/craters/{folder}/{image}")
+def get_image_craters(folder: int, image: int, sqlite_conn=Depends(get_sqlite_db)):
+    """Detected craters of an image (centers and diameters in full-resolution pixels), largest first."""
+    rows = craters_for_image(sqlite_conn, folder, image)
+    if rows is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+    craters = [{"center_x": center_x, "center_y": center_y, "diameter_pixels": diameter_pixels,
+                "diameter_meters": diameter_meters, "confidence_score": confidence_score}
+               for center_x, center_y, diameter_pixels, diameter_meters, _, confidence_score, _ in rows]
+    return {"folder": folder, "image": image, "craters": craters}
+
+
+#######################################
+####### Spatial (Footprint) Search ####
+#######################################
+@app.get("/images/near")
+def get_images_near(lat: float = Query(..., ge=-90, le=90), lon: float = Query(..., ge=-180, le=360),
+                    radius: float = Query(0.0, ge=0), sqlite_conn=Depends(get_sqlite_db)):
+    """Images whose ground footprint comes within `radius` meters of (lat, lon) in degrees, nearest first."""
+    return {"images": images_near(sqlite_conn, lat, lon, radius)}
+
+
+@app.get("/images/overlapping/{folder}/{image}")
+def get_images_overlapping(folder: int, image: int, sqlite_conn=Depends(get_sqlite_db)):
+    """Images whose ground footprint overlaps the footprint of the given image, nearest first."""
+    results = images_overlapping(sqlite_conn, folder, image)
+    if results is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+    return {"images": results}
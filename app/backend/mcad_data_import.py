@@ -13,13 +13,15 @@ def main():
     print("Initializing MCAD database...")
     db = MCADDatabase()
 
-    # Import all data
+    # Import all data (parallel, resumable; unchanged files are skipped on re-import)
     print("Starting import of MCAD lunar data...")
     start_time = time.time()
-    db.import_mcad_data()
+    stats = db.import_mcad_data()
     end_time = time.time()
 
     print(f"Import completed in {end_time - start_time:.2f} seconds")
+    print(f"{stats['imported']} rows imported at {stats['rows_per_sec']:.1f} rows/sec "
+          f"({stats['skipped']} unchanged, {stats['missing']} missing, {stats['errors']} errors)")
 
     # Test a query
     print("\nTesting database queries:")
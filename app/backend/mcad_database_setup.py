@@ -6,10 +6,257 @@ This script contains functions such as initializing a database, creating a datab
 and PNG data, etc.
 
 """
+import hashlib
 import json
+import os
 import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
 
+import numpy as np
+
+import file_catalog
+import spatial_index
+from utils.crater_calculations import MOON_RADIUS, compute_camera_altitude, compute_image_dimensions
+
+METERS_TO_MILES = 0.000621371
+
+# Vector fields stored as typed REAL component columns next to the original str(list) TEXT columns
+# (the TEXT columns are kept for backwards compatibility with existing consumers)
+VECTOR_COLUMNS = {
+    "sun_los": ("sun_los_x", "sun_los_y", "sun_los_z"),
+    "cam_pos_m": ("cam_pos_x", "cam_pos_y", "cam_pos_z"),
+    "cam_quat_v": ("cam_quat_x", "cam_quat_y", "cam_quat_z"),
+    "cam_los": ("cam_los_x", "cam_los_y", "cam_los_z"),
+}
+
+# Columns written by the importer, in the order produced by parse_image_files()
+LUNAR_IMAGE_COLUMNS = (
+    "folder_num", "image_num", "png_path", "json_path",
+    "time_s", "sun_los", "cam_pos_m", "cam_quat_s", "cam_quat_v",
+    "cam_los", "fov_x_rad", "fov_y_rad", "nrows", "ncols",
+    *(col for components in VECTOR_COLUMNS.values() for col in components),
+)
+
+# Upsert keeps the row id stable on re-import (INSERT OR REPLACE would delete the row and orphan detected_craters)
+UPSERT_LUNAR_IMAGE_SQL = f"""
+INSERT INTO lunar_images ({", ".join(LUNAR_IMAGE_COLUMNS)})
+VALUES ({", ".join("?" * len(LUNAR_IMAGE_COLUMNS))})
+ON CONFLICT(folder_num, image_num) DO UPDATE SET
+    {", ".join(f"{col} = excluded.{col}" for col in LUNAR_IMAGE_COLUMNS[2:])}
+"""
+
+# Secondary indexes created (and added to older databases) by initialize_database
+INDEXES = {
+    # get_craters_for_image: equality on image_id, already sorted by size
+    "idx_detected_craters_image_diameter": "detected_craters (image_id, diameter_pixels DESC)",
+    # Range queries in search_craters
+    "idx_detected_craters_diameter_meters": "detected_craters (diameter_meters)",
+    "idx_detected_craters_confidence": "detected_craters (confidence_score)",
+    "idx_detected_craters_detection_date": "detected_craters (detection_date)",
+    # search_images_by_criteria FOV range
+    "idx_lunar_images_fov_x": "lunar_images (fov_x_rad)",
+}
+
+# Hot queries whose plans must stay index-driven (checked by check_query_plans)
+HOT_QUERIES = {
+    "image_by_key": ("SELECT id FROM lunar_images WHERE folder_num = ? AND image_num = ?", (0, 0)),
+    "craters_for_image": ('''
+        SELECT center_x, center_y, diameter_pixels, diameter_meters,
+               diameter_miles, confidence_score, detection_date
+        FROM detected_craters
+        WHERE image_id = ?
+        ORDER BY diameter_pixels DESC
+    ''', (1,)),
+    "craters_by_diameter": ("SELECT id FROM detected_craters WHERE diameter_meters BETWEEN ? AND ?", (100.0, 200.0)),
+    "craters_by_confidence": ("SELECT id FROM detected_craters WHERE confidence_score >= ?", (0.99,)),
+    "craters_by_date": ("SELECT id FROM detected_craters WHERE detection_date >= ?", ("2025-12-30",)),
+    "images_by_fov": ("SELECT id FROM lunar_images WHERE fov_x_rad BETWEEN ? AND ?", (0.34, 0.36)),
+}
+
+# Tables the hot queries read; any SCAN of these (including "SCAN ... USING COVERING INDEX", which still
+# reads the whole index) fails check_query_plans unless it is allow-listed here as (query name, plan detail)
+HOT_TABLES = ("lunar_images", "detected_craters")
+ALLOWED_PLAN_SCANS = set()
+
+UPSERT_CHECKPOINT_SQL = """
+INSERT OR REPLACE INTO import_checkpoints (
+    folder_num, image_num, json_mtime_ns, json_size, png_mtime_ns, png_size, json_sha1
+) VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+# Columns available to bulk exports (the typed vector components, not the str(list) TEXT columns)
+EXPORT_COLUMNS = (
+    "folder_num", "image_num", "png_path", "json_path", "time_s", "cam_quat_s",
+    "fov_x_rad", "fov_y_rad", "nrows", "ncols",
+    *(col for components in VECTOR_COLUMNS.values() for col in components),
+)
+
+# Bumped in the same transaction as every write to lunar_images, so readers in other processes
+# (the backend's in-memory metadata cache) can tell that the table changed
+BUMP_DATA_VERSION_SQL = """
+INSERT INTO data_versions (name, version) VALUES (?, 1)
+ON CONFLICT(name) DO UPDATE SET version = version + 1
+"""
+
+
+def _file_signature(json_path, png_path):
+    """(json_mtime_ns, json_size, png_mtime_ns, png_size) used to detect unchanged files without reading them."""
+    json_stat = os.stat(json_path)
+    png_stat = os.stat(png_path)
+    return json_stat.st_mtime_ns, json_stat.st_size, png_stat.st_mtime_ns, png_stat.st_size
+
+
+def _vector_components(value):
+    """Split a JSON [x, y, z] list into three floats (None for anything else)."""
+    if isinstance(value, (list, tuple)) and len(value) == 3:
+        return tuple(float(v) for v in value)
+    return None, None, None
+
+
+def parse_image_id(image_id):
+    """Turn an image id like '001/image_3.png' (or 'Folder 001/image_3.png') into (1, 3)."""
+    folder, file_name = image_id.rsplit("/", 1)
+    return int(folder.removeprefix("Folder ").strip()), int(file_name.removeprefix("image_").removesuffix(".png"))
+
+
+def _crater_row(image_id, crater, meters_per_pixel):
+    """Build a detected_craters row from a sized crater dict or raw {center, radius, confidence} output."""
+    if "center_x" in crater:
+        center_x, center_y = crater["center_x"], crater["center_y"]
+        diameter_pixels = crater["diameter_pixels"]
+    else:
+        center_x, center_y = crater["center"]
+        diameter_pixels = 2 * crater["radius"]
+
+    diameter_meters = crater.get("diameter_meters")
+    if diameter_meters is None:
+        if meters_per_pixel is None:
+            raise ValueError(f"Cannot size crater for image id {image_id}: image geometry is unknown")
+        diameter_meters = diameter_pixels * meters_per_pixel
+    diameter_miles = crater.get("diameter_miles")
+    if diameter_miles is None:
+        diameter_miles = diameter_meters * METERS_TO_MILES
+
+    confidence = crater.get("confidence_score", crater.get("confidence"))
+    return image_id, center_x, center_y, diameter_pixels, diameter_meters, diameter_miles, confidence
+
+
+def parse_image_files(task):
+    """
+    Worker step of the parallel import: stat the PNG/JSON pair and parse the JSON.
+    task is (folder_num, image_num, json_path, png_path, previous_signature, previous_sha1).
+    Returns (status, folder_num, image_num, payload) where status is one of
+    "skip" (unchanged since the last import), "touched" (new mtime but identical content),
+    "row" (payload = (row, signature, sha1)), "missing" or "error" (payload = message).
+    Must stay a top-level function so it can run in a process pool.
+    """
+    folder_num, image_num, json_path, png_path, previous_signature, previous_sha1 = task
+    try:
+        signature = _file_signature(json_path, png_path)
+    except FileNotFoundError:
+        return "missing", folder_num, image_num, None
+
+    if previous_signature is not None and signature == previous_signature:
+        return "skip", folder_num, image_num, None
+
+    try:
+        with open(json_path, "rb") as f:
+            raw = f.read()
+        sha1 = hashlib.sha1(raw).hexdigest()
+        if sha1 == previous_sha1 and previous_signature is not None and signature[3] == previous_signature[3]:
+            return "touched", folder_num, image_num, (None, signature, sha1)
+
+        json_data = json.loads(raw)
+        row = (
+            folder_num,
+            image_num,
+            str(png_path),
+            str(json_path),
+            json_data.get("Time (s)"),
+            str(json_data.get("SUN LoS")),
+            str(json_data.get("Cam Pos (m)")),
+            json_data.get("Cam Quat (s)"),
+            str(json_data.get("Cam Quat (v)")),
+            str(json_data.get("Cam LoS")),
+            json_data.get("FOV X (rad)"),
+            json_data.get("FOV Y (rad)"),
+            json_data.get("Nrows"),
+            json_data.get("Ncols"),
+            *_vector_components(json_data.get("SUN LoS")),
+            *_vector_components(json_data.get("Cam Pos (m)")),
+            *_vector_components(json_data.get("Cam Quat (v)")),
+            *_vector_components(json_data.get("Cam LoS")),
+        )
+        return "row", folder_num, image_num, (row, signature, sha1)
+    except Exception as e:
+        return "error", folder_num, image_num, f"Error processing {json_path}: {e}"
+
+
+def image_filter_sql(folders=None, min_fov=None, max_fov=None, min_altitude_m=None, max_altitude_m=None):
+    """WHERE clause and parameters for the lunar_images filters shared by searches and exports."""
+    clauses, params = ["1=1"], []
+
+    if folders:
+        folders = list(folders)
+        clauses.append(f"folder_num IN ({', '.join('?' * len(folders))})")
+        params.extend(folders)
+
+    if min_fov is not None:
+        clauses.append("fov_x_rad >= ?")
+        params.append(min_fov)
+
+    if max_fov is not None:
+        clauses.append("fov_x_rad <= ?")
+        params.append(max_fov)
+
+    # Altitude filters run on the typed columns (squared distance from the Moon's center, no sqrt needed)
+    distance_sq = "(cam_pos_x * cam_pos_x + cam_pos_y * cam_pos_y + cam_pos_z * cam_pos_z)"
+    if min_altitude_m is not None:
+        clauses.append(f"{distance_sq} >= ?")
+        params.append((MOON_RADIUS + min_altitude_m) ** 2)
+
+    if max_altitude_m is not None:
+        clauses.append(f"{distance_sq} <= ?")
+        params.append((MOON_RADIUS + max_altitude_m) ** 2)
+
+    return " AND ".join(clauses), params
+
+
+def iter_image_rows(conn, columns=EXPORT_COLUMNS, batch_size=10000, **filters):
+    """
+    Yield lunar_images rows as lists of tuples (at most batch_size per list), ordered by folder and image.
+    `columns` must be a subset of EXPORT_COLUMNS; `filters` are the image_filter_sql() arguments.
+    """
+    unknown = [col for col in columns if col not in EXPORT_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown column(s): {', '.join(unknown)}")
+    where, params = image_filter_sql(**filters)
+    cur = conn.cursor()
+    try:
+        cur.execute(f"SELECT {', '.join(columns)} FROM lunar_images WHERE {where} ORDER BY folder_num, image_num",
+                    params)
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        cur.close()
+
+
+def craters_for_image(conn, folder_num, image_num):
+    """
+    Detected craters of one image, largest first, as (center_x, center_y, diameter_pixels, diameter_meters,
+    diameter_miles, confidence_score, detection_date) tuples. Returns None if the image is not in lunar_images.
+    """
+    row = conn.execute("SELECT id FROM lunar_images WHERE folder_num = ? AND image_num = ?",
+                       (folder_num, image_num)).fetchone()
+    if not row:
+        return None
+    return conn.execute(HOT_QUERIES["craters_for_image"][0], (row[0],)).fetchall()
+
 
 class MCADDatabase:
     def __init__(self, db_path="/Users/joshuajackson/PycharmProjects/mcad/data/database/mcad.db"):
@@ -45,6 +292,10 @@ class MCADDatabase:
             fov_y_rad REAL,
             nrows INTEGER,
             ncols INTEGER,
+            sun_los_x REAL, sun_los_y REAL, sun_los_z REAL,
+            cam_pos_x REAL, cam_pos_y REAL, cam_pos_z REAL,
+            cam_quat_x REAL, cam_quat_y REAL, cam_quat_z REAL,
+            cam_los_x REAL, cam_los_y REAL, cam_los_z REAL,
             UNIQUE(folder_num, image_num)
         )
         ''')
@@ -64,13 +315,114 @@ class MCADDatabase:
         )
         ''')
 
+        # One row per image crater_detection.py has processed, also when it found no craters, so a
+        # resumed run skips it
+        self.cursor.execute('''
+        CREATE TABLE IF NOT EXISTS detection_runs (
+            image_id INTEGER PRIMARY KEY,
+            crater_count INTEGER NOT NULL,
+            detected_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (image_id) REFERENCES lunar_images (id)
+        )
+        ''')
+
+        for name, target in INDEXES.items():
+            self.cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {target}")
+
+        # Per-file signatures of the last import, used to resume and to skip unchanged files
+        self.cursor.execute('''
+        CREATE TABLE IF NOT EXISTS import_checkpoints (
+            folder_num INTEGER NOT NULL,
+            image_num INTEGER NOT NULL,
+            json_mtime_ns INTEGER NOT NULL,
+            json_size INTEGER NOT NULL,
+            png_mtime_ns INTEGER NOT NULL,
+            png_size INTEGER NOT NULL,
+            json_sha1 TEXT NOT NULL,
+            imported_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (folder_num, image_num)
+        )
+        ''')
+
+        # Change counters per table (see BUMP_DATA_VERSION_SQL)
+        self.cursor.execute('''
+        CREATE TABLE IF NOT EXISTS data_versions (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL
+        )
+        ''')
+
         self.connection.commit()
 
-    def import_mcad_data(self, base_path="/Users/joshuajackson/PycharmProjects/mcad/data/original/mcad_moon_data"):
-        """Import all JSON and PNG files from the mcad_moon_data directory"""
+        # Databases created before the typed vector columns existed are migrated in place
+        self.migrate_vector_columns()
+
+        # Ground footprint R*Tree (built once for existing databases, rebuilt after each import)
+        spatial_index.create_spatial_tables(self.connection)
+        if self.cursor.execute("SELECT NOT EXISTS (SELECT 1 FROM image_footprints)").fetchone()[0]:
+            self.rebuild_spatial_index()
+
+        # Per-folder file listing (built from lunar_images once for existing databases, then kept by the importer)
+        file_catalog.create_catalog_tables(self.connection)
+        if self.cursor.execute("SELECT NOT EXISTS (SELECT 1 FROM file_catalog)").fetchone()[0]:
+            file_catalog.rebuild_file_catalog(self.connection)
+
+    def rebuild_spatial_index(self):
+        """Recompute every image's ground footprint and rebuild the spatial index"""
+        return spatial_index.rebuild_spatial_index(self.connection)
+
+    def migrate_vector_columns(self):
+        """
+        Add the typed sun_los/cam_pos/cam_quat/cam_los component columns to an existing lunar_images
+        table and backfill them from the str(list) TEXT columns. Safe to run repeatedly; returns the
+        number of rows backfilled.
+        """
+        existing = {row[1] for row in self.cursor.execute("PRAGMA table_info(lunar_images)")}
+        missing = [col for components in VECTOR_COLUMNS.values() for col in components if col not in existing]
+        for col in missing:
+            self.cursor.execute(f"ALTER TABLE lunar_images ADD COLUMN {col} REAL")
+
+        # str() of a list of floats is valid JSON, so the parsing happens inside SQLite with json_extract
+        assignments = ", ".join(
+            f"{col} = CASE WHEN json_valid({text_col}) THEN json_extract({text_col}, '$[{i}]') END"
+            for text_col, components in VECTOR_COLUMNS.items()
+            for i, col in enumerate(components)
+        )
+        needs_backfill = " OR ".join(
+            f"({components[0]} IS NULL AND json_valid({text_col}))" for text_col, components in VECTOR_COLUMNS.items()
+        )
+        self.cursor.execute(f"UPDATE lunar_images SET {assignments} WHERE {needs_backfill}")
+        migrated = self.cursor.rowcount
+        if migrated:
+            self.cursor.execute(BUMP_DATA_VERSION_SQL, ("lunar_images",))
+        self.connection.commit()
+        return migrated
+
+    def import_mcad_data(self, base_path="/Users/joshuajackson/PycharmProjects/mcad/data/original/mcad_moon_data",
+                         workers=None, batch_size=1000, use_processes=False, force=False):
+        """
+        Import all JSON and PNG files from the mcad_moon_data directory.
+
+        A pool of workers stats the files and parses the JSON while this thread is the single writer,
+        inserting rows with executemany in large transactions. Each batch commits together with its
+        import_checkpoints rows, so an interrupted import resumes where it stopped, and files whose
+        mtime/size (or JSON content hash) are unchanged since the last import are skipped.
+        Set force=True to re-import everything. Returns a dict of import statistics.
+        """
         base_path = Path(base_path)
+        start_time = time.perf_counter()
+        self._tune_for_bulk_load()
+
+        previous = {} if force else {
+            (row[0], row[1]): (tuple(row[2:6]), row[6])
+            for row in self.cursor.execute('''
+                SELECT folder_num, image_num, json_mtime_ns, json_size, png_mtime_ns, png_size, json_sha1
+                FROM import_checkpoints
+            ''')
+        }
 
         # Loop through all folders (000-275)
+        tasks = []
         for folder_num in range(276):
             folder_name = f"{folder_num:03d}"
             folder_path = base_path / folder_name
@@ -82,152 +434,264 @@ class MCADDatabase:
             # Max files is 10 per folder (0-9), except folder 275 which has 7
             max_files = 7 if folder_num == 275 else 10
 
-            # Process each image in the folder
             for image_num in range(max_files):
-                json_filename = f"image_{image_num}.json"
-                png_filename = f"image_{image_num}.png"
-
-                json_path = folder_path / json_filename
-                png_path = folder_path / png_filename
-
-                # Check if both files exist
-                if not json_path.exists() or not png_path.exists():
-                    print(f"Warning: Missing file(s) for folder {folder_name}, image {image_num}. Skipping.")
-                    continue
-
-                # Load JSON data
-                try:
-                    with open(json_path, 'r') as f:
-                        json_data = json.load(f)
-
-                    # Insert record into database
-                    self.cursor.execute('''
-                    INSERT OR REPLACE INTO lunar_images (
-                        folder_num, image_num, png_path, json_path, 
-                        time_s, sun_los, cam_pos_m, cam_quat_s, cam_quat_v, 
-                        cam_los, fov_x_rad, fov_y_rad, nrows, ncols
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    ''', (
-                        folder_num,
-                        image_num,
-                        str(png_path),
-                        str(json_path),
-                        json_data.get("Time (s)"),
-                        str(json_data.get("SUN LoS")),
-                        str(json_data.get("Cam Pos (m)")),
-                        json_data.get("Cam Quat (s)"),
-                        str(json_data.get("Cam Quat (v)")),
-                        str(json_data.get("Cam LoS")),
-                        json_data.get("FOV X (rad)"),
-                        json_data.get("FOV Y (rad)"),
-                        json_data.get("Nrows"),
-                        json_data.get("Ncols")
-                    ))
-
-                    if (folder_num * 10 + image_num) % 100 == 0:
-                        print(f"Imported {folder_num:03d}/image_{image_num}")
-                        self.connection.commit()  # Commit every 100 records
-
-                except Exception as e:
-                    print(f"Error processing {json_path}: {e}")
+                signature, sha1 = previous.get((folder_num, image_num), (None, None))
+                tasks.append((
+                    folder_num, image_num,
+                    folder_path / f"image_{image_num}.json",
+                    folder_path / f"image_{image_num}.png",
+                    signature, sha1,
+                ))
+
+        stats = {"scanned": len(tasks), "imported": 0, "skipped": 0, "missing": 0, "errors": 0}
+        rows, checkpoints = [], []
+
+        executor_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+        with executor_class(max_workers=workers or os.cpu_count()) as executor:
+            for status, folder_num, image_num, payload in executor.map(parse_image_files, tasks, chunksize=32):
+                if status == "row":
+                    row, signature, sha1 = payload
+                    rows.append(row)
+                    checkpoints.append((folder_num, image_num, *signature, sha1))
+                elif status == "touched":
+                    _, signature, sha1 = payload
+                    checkpoints.append((folder_num, image_num, *signature, sha1))
+                    stats["skipped"] += 1
+                elif status == "skip":
+                    stats["skipped"] += 1
+                elif status == "missing":
+                    print(f"Warning: Missing file(s) for folder {folder_num:03d}, image {image_num}. Skipping.")
+                    stats["missing"] += 1
+                else:
+                    print(payload)
+                    stats["errors"] += 1
+
+                if len(checkpoints) >= batch_size:
+                    stats["imported"] += self._write_import_batch(rows, checkpoints)
+                    print(f"Imported {stats['imported']} images (up to {folder_num:03d}/image_{image_num})")
+                    rows, checkpoints = [], []
 
         # Final commit
-        self.connection.commit()
-        print("Import complete!")
+        stats["imported"] += self._write_import_batch(rows, checkpoints)
+        if stats["imported"]:
+            self.rebuild_spatial_index()
+
+        stats["seconds"] = time.perf_counter() - start_time
+        stats["rows_per_sec"] = stats["imported"] / stats["seconds"] if stats["seconds"] > 0 else 0.0
+        print(f"Import complete! {stats['imported']} imported, {stats['skipped']} unchanged, "
+              f"{stats['missing']} missing, {stats['errors']} errors")
+        return stats
+
+    def _write_import_batch(self, rows, checkpoints):
+        """Write one batch of rows and their checkpoints in a single transaction."""
+        if not rows and not checkpoints:
+            return 0
+        with self.connection:
+            self.cursor.executemany(UPSERT_LUNAR_IMAGE_SQL, rows)
+            self.cursor.executemany(UPSERT_CHECKPOINT_SQL, checkpoints)
+            if rows:
+                self.cursor.execute(BUMP_DATA_VERSION_SQL, ("lunar_images",))
+                # Checkpoint rows are (folder, image, json_mtime_ns, json_size, png_mtime_ns, png_size, sha1)
+                png_stats = {(c[0], c[1]): (c[5], c[4]) for c in checkpoints}
+                self.cursor.executemany(file_catalog.UPSERT_CATALOG_SQL, [
+                    file_catalog.catalog_entry(row[0], row[1], row[2], *png_stats.get((row[0], row[1]), (None, None)))
+                    for row in rows
+                ])
+                self.cursor.execute(BUMP_DATA_VERSION_SQL, ("file_catalog",))
+        return len(rows)
+
+    def _tune_for_bulk_load(self):
+        """PRAGMAs for fast bulk writes: WAL lets readers (e.g. the backend) keep working during an import."""
+        self.cursor.execute("PRAGMA journal_mode=WAL")
+        self.cursor.execute("PRAGMA synchronous=NORMAL")
+        self.cursor.execute("PRAGMA temp_store=MEMORY")
+        self.cursor.execute("PRAGMA cache_size=-65536")  # 64 MiB
 
     def add_crater_detection(self, folder_num, image_num, crater_data):
         """Add crater detection results for a specific lunar image"""
-        # First, get the image_id
-        self.cursor.execute('''
-        SELECT id FROM lunar_images 
-        WHERE folder_num = ? AND image_num = ?
-        ''', (folder_num, image_num))
-
-        result = self.cursor.fetchone()
-        if not result:
-            raise ValueError(f"Image not found: folder {folder_num}, image {image_num}")
-
-        image_id = result[0]
+        return self.add_crater_detections_bulk({(folder_num, image_num): crater_data})
+
+    def resolve_images(self, keys):
+        """
+        Map many (folder_num, image_num) keys to (id, meters_per_pixel) in one query.
+        meters_per_pixel comes from the image's camera altitude, FOV and sensor width (None if unknown).
+        """
+        keys = list(set(keys))
+        if not keys:
+            return {}
+        self.cursor.execute("CREATE TEMP TABLE IF NOT EXISTS _image_keys (folder_num INTEGER, image_num INTEGER)")
+        self.cursor.execute("DELETE FROM _image_keys")
+        self.cursor.executemany("INSERT INTO _image_keys VALUES (?, ?)", keys)
+        rows = self.cursor.execute('''
+        SELECT li.folder_num, li.image_num, li.id, li.cam_pos_x, li.cam_pos_y, li.cam_pos_z,
+               li.fov_x_rad, li.fov_y_rad, li.ncols
+        FROM _image_keys k
+        JOIN lunar_images li ON li.folder_num = k.folder_num AND li.image_num = k.image_num
+        ''').fetchall()
+        self.cursor.execute("DELETE FROM _image_keys")
+        if not rows:
+            return {}
+
+        geometry = np.array([row[3:9] for row in rows], dtype=np.float64)  # None -> nan
+        altitude = compute_camera_altitude(geometry[:, 0:3])
+        image_width_m, _ = compute_image_dimensions(altitude, geometry[:, 3], geometry[:, 4])
+        meters_per_pixel = image_width_m / geometry[:, 5]
+        return {
+            (row[0], row[1]): (row[2], None if np.isnan(mpp) else float(mpp))
+            for row, mpp in zip(rows, meters_per_pixel)
+        }
+
+    def add_crater_detections_bulk(self, detections, skip_missing=False):
+        """
+        Add crater detections for many images in one transaction.
+        detections maps (folder_num, image_num) -> list of crater dicts (or is an iterable of such pairs).
+        Craters are either fully sized ({center_x, center_y, diameter_pixels, diameter_meters, diameter_miles,
+        confidence_score}) or raw detector output ({center: (x, y), radius, confidence}); missing meter/mile
+        sizes are computed from the image geometry. Image ids are resolved in a single query.
+        Raises ValueError for unknown images unless skip_missing is set. Returns the number of craters added.
+        """
+        items = list(detections.items() if isinstance(detections, dict) else detections)
+        images = self.resolve_images(key for key, _ in items)
+
+        missing = sorted({key for key, _ in items if key not in images})
+        if missing and not skip_missing:
+            folder_num, image_num = missing[0]
+            raise ValueError(f"Image not found: folder {folder_num}, image {image_num}"
+                             + (f" (and {len(missing) - 1} more)" if len(missing) > 1 else ""))
+
+        rows = []
+        for key, craters in items:
+            if key not in images:
+                continue
+            image_id, meters_per_pixel = images[key]
+            rows.extend(_crater_row(image_id, crater, meters_per_pixel) for crater in craters)
 
-        # Add each crater
-        for crater in crater_data:
-            self.cursor.execute('''
+        with self.connection:
+            self.cursor.executemany('''
             INSERT INTO detected_craters (
                 image_id, center_x, center_y, diameter_pixels,
                 diameter_meters, diameter_miles, confidence_score
             ) VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                image_id,
-                crater['center_x'],
-                crater['center_y'],
-                crater['diameter_pixels'],
-                crater['diameter_meters'],
-                crater['diameter_miles'],
-                crater.get('confidence_score')
-            ))
-
-        self.connection.commit()
-        return len(crater_data)
+            ''', rows)
+        return len(rows)
+
+    def ingest_detection_results(self, results, skip_missing=True):
+        """
+        Bulk-ingest detector output in the crater_detection_results format
+        ({"image_id": "001/image_0.png", "detected_craters": [...], ...}). Returns the number of craters added.
+        """
+        detections = {}
+        for result in results:
+            detections.setdefault(parse_image_id(result["image_id"]), []).extend(result["detected_craters"])
+        return self.add_crater_detections_bulk(detections, skip_missing=skip_missing)
 
     def get_image_data(self, folder_num, image_num):
-        """Get image data and path information for a specific image"""
+        """
+        Get image data and path information for a specific image.
+        Columns are (id, png_path, json_path, time_s, sun_los, cam_pos_m, cam_quat_s, cam_quat_v,
+        cam_los, fov_x_rad, fov_y_rad, nrows, ncols), with the four vector fields as float64 NumPy arrays.
+        """
         self.cursor.execute('''
-        SELECT id, png_path, json_path, time_s, sun_los, cam_pos_m,
-               cam_quat_s, cam_quat_v, cam_los, fov_x_rad, fov_y_rad,
-               nrows, ncols
+        SELECT id, png_path, json_path, time_s,
+               sun_los_x, sun_los_y, sun_los_z,
+               cam_pos_x, cam_pos_y, cam_pos_z,
+               cam_quat_s,
+               cam_quat_x, cam_quat_y, cam_quat_z,
+               cam_los_x, cam_los_y, cam_los_z,
+               fov_x_rad, fov_y_rad, nrows, ncols
         FROM lunar_images
         WHERE folder_num = ? AND image_num = ?
         ''', (folder_num, image_num))
 
-        return self.cursor.fetchone()
+        row = self.cursor.fetchone()
+        if row is None:
+            return None
+        return (
+            *row[0:4],
+            np.array(row[4:7], dtype=np.float64),
+            np.array(row[7:10], dtype=np.float64),
+            row[10],
+            np.array(row[11:14], dtype=np.float64),
+            np.array(row[14:17], dtype=np.float64),
+            *row[17:21],
+        )
 
     def get_craters_for_image(self, folder_num, image_num):
-        """Get all detected craters for a specific image"""
-        # First, get the image_id
-        self.cursor.execute('''
-        SELECT id FROM lunar_images 
-        WHERE folder_num = ? AND image_num = ?
-        ''', (folder_num, image_num))
-
-        result = self.cursor.fetchone()
-        if not result:
-            return []
+        """Get all detected craters for a specific image (see craters_for_image())"""
+        return craters_for_image(self.connection, folder_num, image_num) or []
+
+    def search_craters(self, min_diameter_m=None, max_diameter_m=None, min_confidence=None, since=None, limit=100):
+        """Search detected craters by diameter (meters), confidence score and detection date"""
+        query = '''
+        SELECT li.folder_num, li.image_num, dc.center_x, dc.center_y, dc.diameter_pixels,
+               dc.diameter_meters, dc.confidence_score, dc.detection_date
+        FROM detected_craters dc
+        JOIN lunar_images li ON li.id = dc.image_id
+        WHERE 1=1'''
+        params = []
 
-        image_id = result[0]
+        if min_diameter_m is not None:
+            query += " AND dc.diameter_meters >= ?"
+            params.append(min_diameter_m)
 
-        # Get all craters for this image
-        self.cursor.execute('''
-        SELECT center_x, center_y, diameter_pixels, diameter_meters, 
-               diameter_miles, confidence_score, detection_date
-        FROM detected_craters
-        WHERE image_id = ?
-        ORDER BY diameter_pixels DESC
-        ''', (image_id,))
+        if max_diameter_m is not None:
+            query += " AND dc.diameter_meters <= ?"
+            params.append(max_diameter_m)
 
-        return self.cursor.fetchall()
+        if min_confidence is not None:
+            query += " AND dc.confidence_score >= ?"
+            params.append(min_confidence)
 
-    def search_images_by_criteria(self, min_fov=None, max_fov=None, limit=10):
-        """Search for images based on criteria like field of view"""
-        query = "SELECT folder_num, image_num, png_path, fov_x_rad, fov_y_rad FROM lunar_images WHERE 1=1"
-        params = []
+        if since is not None:
+            query += " AND dc.detection_date >= ?"
+            params.append(since)
 
-        if min_fov is not None:
-            query += " AND fov_x_rad >= ?"
-            params.append(min_fov)
+        query += " LIMIT ?"
+        params.append(limit)
 
-        if max_fov is not None:
-            query += " AND fov_x_rad <= ?"
-            params.append(max_fov)
+        self.cursor.execute(query, params)
+        return self.cursor.fetchall()
 
+    def explain_query_plan(self, query, params=()):
+        """Return the EXPLAIN QUERY PLAN detail lines for a query"""
+        return [row[3] for row in self.cursor.execute(f"EXPLAIN QUERY PLAN {query}", params)]
+
+    def check_query_plans(self):
+        """
+        Check that none of the HOT_QUERIES regressed to a scan of a HOT_TABLES table (table or whole index)
+        or a temp B-tree sort. Returns a list of (query name, plan detail) problems; empty means every plan
+        is an index search.
+        """
+        problems = []
+        for name, (query, params) in HOT_QUERIES.items():
+            for detail in self.explain_query_plan(query, params):
+                words = detail.split()
+                hot_scan = words[:1] == ["SCAN"] and len(words) > 1 and words[1] in HOT_TABLES
+                if (hot_scan and (name, detail) not in ALLOWED_PLAN_SCANS) or "USE TEMP B-TREE" in detail:
+                    problems.append((name, detail))
+        return problems
+
+    def search_images_by_criteria(self, min_fov=None, max_fov=None, min_altitude_m=None, max_altitude_m=None,
+                                  limit=10):
+        """Search for images based on criteria like field of view or camera altitude"""
+        where, params = image_filter_sql(min_fov=min_fov, max_fov=max_fov,
+                                         min_altitude_m=min_altitude_m, max_altitude_m=max_altitude_m)
+        query = f"SELECT folder_num, image_num, png_path, fov_x_rad, fov_y_rad FROM lunar_images WHERE {where}"
         query += " ORDER BY folder_num, image_num LIMIT ?"
         params.append(limit)
 
         self.cursor.execute(query, params)
         return self.cursor.fetchall()
 
+    def iter_image_rows(self, columns=EXPORT_COLUMNS, batch_size=10000, **filters):
+        """Yield lists of lunar_images row tuples (see iter_image_rows())"""
+        return iter_image_rows(self.connection, columns, batch_size, **filters)
+
     def close(self):
         """Close the database connection"""
         if self.connection:
+            # Lets SQLite refresh planner statistics for tables whose indexes were used heavily
+            self.connection.execute("PRAGMA optimize")
             self.connection.close()
             self.connection = None
             self.cursor = None
\ No newline at end of file
@@ -0,0 +1,27 @@
+"""
+One-shot migrator for existing mcad.db files: adds the typed vector columns to lunar_images
+(sun_los_x/y/z, cam_pos_x/y/z, cam_quat_x/y/z, cam_los_x/y/z) and backfills them from the
+str(list) TEXT columns. Re-running it is harmless.
+Usage: python mcad_schema_migrate.py [path/to/mcad.db ...]
+"""
+import sys
+
+from config import MCAD_DB_PATH
+from mcad_database_setup import MCADDatabase
+
+
+def main(db_paths):
+    for db_path in db_paths:
+        print(f"Migrating {db_path}...")
+        db = MCADDatabase(db_path)  # initialize_database() creates/migrates the schema
+        # Rows are backfilled on open; a second pass reports anything that could not be parsed
+        leftover = db.cursor.execute(
+            "SELECT COUNT(*) FROM lunar_images WHERE cam_pos_x IS NULL"
+        ).fetchone()[0]
+        total = db.cursor.execute("SELECT COUNT(*) FROM lunar_images").fetchone()[0]
+        print(f"{total - leftover}/{total} rows have typed vector columns")
+        db.close()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:] or [MCAD_DB_PATH])
@@ -0,0 +1,186 @@
+"""
+MCAD Metadata Cache
+Per-image metadata (the lunar_images mirror of MOON_CRATER_DATA) held in memory, so /get_json is
+answered without a database round-trip. The dataset is ~2,757 rows, so the whole
+table is loaded into a columnar snapshot: one NumPy array per field (vectors as (N, 3) arrays) plus a
+(folder_num, image_num) -> row dict for O(1) lookups.
+
+The snapshot is loaded at startup and replaced wholesale when lunar_images changes: the importer bumps
+data_versions.lunar_images in the same transaction as its writes, and the cache re-reads that counter
+at most every METADATA_CACHE_CHECK_INTERVAL seconds (one primary-key lookup). invalidate() forces a
+reload on the next request.
+"""
+import json
+import threading
+import time
+
+import numpy as np
+
+from config import METADATA_CACHE_CHECK_INTERVAL
+
+VECTOR_FIELDS = {
+    "sun_los": ("sun_los_x", "sun_los_y", "sun_los_z"),
+    "cam_pos": ("cam_pos_x", "cam_pos_y", "cam_pos_z"),
+    "cam_quat_v": ("cam_quat_x", "cam_quat_y", "cam_quat_z"),
+    "cam_los": ("cam_los_x", "cam_los_y", "cam_los_z"),
+}
+SCALAR_FIELDS = {
+    "cam_quat_s": np.float64,
+    "fov_x_rad": np.float64,
+    "fov_y_rad": np.float64,
+    "nrows": np.float64,  # float so missing values can be NaN
+    "ncols": np.float64,
+}
+TEXT_FIELDS = ("png_path", "json_path", "time_s")
+
+# Field names as they appear in the original image_N.json files (and MOON_CRATER_DATA)
+JSON_KEYS = {
+    "time_s": "Time (s)",
+    "sun_los": "SUN LoS",
+    "cam_pos": "Cam Pos (m)",
+    "cam_quat_s": "Cam Quat (s)",
+    "cam_quat_v": "Cam Quat (v)",
+    "cam_los": "Cam LoS",
+    "fov_x_rad": "FOV X (rad)",
+    "fov_y_rad": "FOV Y (rad)",
+    "nrows": "Nrows",
+    "ncols": "Ncols",
+}
+
+_SELECT_COLUMNS = ("folder_num", "image_num", *TEXT_FIELDS, *SCALAR_FIELDS,
+                   *(col for components in VECTOR_FIELDS.values() for col in components))
+
+
+def _read_version(conn):
+    try:
+        row = conn.execute("SELECT version FROM data_versions WHERE name = 'lunar_images'").fetchone()
+    except Exception:  # Database created before data_versions existed
+        return None
+    return row[0] if row else 0
+
+
+def _number(value):
+    """JSON-friendly scalar: NaN -> None, integral floats -> int."""
+    value = float(value)
+    if np.isnan(value):
+        return None
+    return int(value) if value.is_integer() else value
+
+
+def _time_value(text):
+    if text is None:
+        return None
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+
+class MetadataSnapshot:
+    """Immutable columnar copy of lunar_images."""
+
+    def __init__(self, rows, version):
+        self.version = version
+        self.loaded_at = time.time()
+        columns = list(zip(*rows)) if rows else [()] * len(_SELECT_COLUMNS)
+        data = dict(zip(_SELECT_COLUMNS, columns))
+
+        self.folder_num = np.array(data["folder_num"], dtype=np.int32)
+        self.image_num = np.array(data["image_num"], dtype=np.int32)
+        self.text = {name: np.array(data[name], dtype=object) for name in TEXT_FIELDS}
+        self.scalars = {name: np.array([np.nan if v is None else v for v in data[name]], dtype=dtype)
+                        for name, dtype in SCALAR_FIELDS.items()}
+        self.vectors = {
+            name: np.array([[np.nan if v is None else v for v in xyz]
+                            for xyz in zip(*(data[col] for col in components))], dtype=np.float64).reshape(-1, 3)
+            for name, components in VECTOR_FIELDS.items()
+        }
+        self.index = {(int(f), int(i)): row for row, (f, i) in enumerate(zip(self.folder_num, self.image_num))}
+
+    def __len__(self):
+        return len(self.folder_num)
+
+    def row(self, folder_num, image_num):
+        return self.index.get((folder_num, image_num))
+
+    def to_json(self, row):
+        """The image's metadata in the same shape as the original image_N.json (plus "PNG File")."""
+        folder_num, image_num = int(self.folder_num[row]), int(self.image_num[row])
+        record = {"PNG File": f"{folder_num:03d}/image_{image_num}.png",
+                  JSON_KEYS["time_s"]: _time_value(self.text["time_s"][row])}
+        for name in ("sun_los", "cam_pos"):
+            record[JSON_KEYS[name]] = [_number(v) for v in self.vectors[name][row]]
+        record[JSON_KEYS["cam_quat_s"]] = _number(self.scalars["cam_quat_s"][row])
+        for name in ("cam_quat_v", "cam_los"):
+            record[JSON_KEYS[name]] = [_number(v) for v in self.vectors[name][row]]
+        for name in ("fov_x_rad", "fov_y_rad", "nrows", "ncols"):
+            record[JSON_KEYS[name]] = _number(self.scalars[name][row])
+        return record
+
+
+class MetadataCache:
+    """Process-wide holder of the current MetadataSnapshot with hit/miss counters."""
+
+    def __init__(self, check_interval=METADATA_CACHE_CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._last_check = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+
+    def load(self, conn):
+        """(Re)load the snapshot from an SQLite connection to mcad.db."""
+        version = _read_version(conn)
+        rows = conn.execute(f"SELECT {', '.join(_SELECT_COLUMNS)} FROM lunar_images").fetchall()
+        snapshot = MetadataSnapshot(rows, version)
+        with self._lock:
+            self._snapshot = snapshot
+            self._last_check = time.monotonic()
+            self.reloads += 1
+        return snapshot
+
+    def invalidate(self):
+        """Drop the snapshot; the next snapshot() call reloads it."""
+        with self._lock:
+            self._snapshot = None
+
+    def snapshot(self, conn):
+        """Current snapshot, reloading it if lunar_images changed since it was loaded."""
+        snapshot = self._snapshot
+        if snapshot is None:
+            return self.load(conn)
+        now = time.monotonic()
+        if now - self._last_check >= self.check_interval:
+            self._last_check = now
+            if _read_version(conn) != snapshot.version:
+                return self.load(conn)
+        return snapshot
+
+    def get_json(self, conn, folder_num, image_num):
+        """Metadata dict for one image, or None (counted as a miss) if the image is not cached."""
+        snapshot = self.snapshot(conn)
+        row = snapshot.row(folder_num, image_num)
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return snapshot.to_json(row)
+
+    def metrics(self):
+        snapshot = self._snapshot
+        lookups = self.hits + self.misses
+        return {
+            "rows": len(snapshot) if snapshot else 0,
+            "folders": len(np.unique(snapshot.folder_num)) if snapshot else 0,
+            "version": snapshot.version if snapshot else None,
+            "loaded_at": snapshot.loaded_at if snapshot else None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "reloads": self.reloads,
+        }
+
+
+metadata_cache = MetadataCache()
@@ -0,0 +1,140 @@
+"""
+MCAD Metadata Export
+Bulk export of per-image metadata (camera pose, FOV, sensor size) in one response, instead of one
+/get_json call per image. Rows are streamed batch by batch as Arrow IPC, Parquet or NDJSON.
+
+Sources:
+    sqlite     lunar_images in mcad.db, read in fetchmany() batches (mcad_database_setup.iter_image_rows)
+               and turned into Arrow record batches column by column
+    snowflake  MOON_CRATER_DATA, read with the connector's fetch_arrow_batches()
+No per-row dicts are built on the way; NDJSON lines are formatted straight from the column lists.
+
+pyarrow is imported lazily so the backend starts without it (pip install pyarrow to enable exports).
+"""
+import io
+import json
+
+from mcad_database_setup import EXPORT_COLUMNS, iter_image_rows
+
+FORMATS = {
+    "arrow": ("application/vnd.apache.arrow.stream", "arrow"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+}
+
+SNOWFLAKE_METADATA_TABLE = "MCAD.MCAD_DATA.MOON_CRATER_DATA"
+
+
+def _pyarrow():
+    import pyarrow as pa
+    return pa
+
+
+def export_schema(columns=EXPORT_COLUMNS):
+    """Arrow schema for the lunar_images export columns."""
+    pa = _pyarrow()
+    types = {"folder_num": pa.int32(), "image_num": pa.int32(), "nrows": pa.int32(), "ncols": pa.int32(),
+             "png_path": pa.string(), "json_path": pa.string(), "time_s": pa.string()}
+    return pa.schema([(col, types.get(col, pa.float64())) for col in columns])
+
+
+def sqlite_record_batches(conn, columns=EXPORT_COLUMNS, batch_size=10000, **filters):
+    """Arrow record batches of lunar_images rows (filters as in mcad_database_setup.image_filter_sql)."""
+    pa = _pyarrow()
+    schema = export_schema(columns)
+    for rows in iter_image_rows(conn, columns, batch_size, **filters):
+        arrays = [pa.array(values, type=field.type) for values, field in zip(zip(*rows), schema)]
+        yield pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def snowflake_record_batches(conn, folders=None):
+    """Arrow record batches of MOON_CRATER_DATA rows, optionally limited to some folders."""
+    cur = conn.cursor()
+    try:
+        query = f"SELECT * FROM {SNOWFLAKE_METADATA_TABLE}"
+        params = ()
+        if folders:
+            folders = [f"{int(folder):03d}" for folder in folders]
+            query += f""" WHERE SPLIT_PART("PNG File", '/', 1) IN ({', '.join(['%s'] * len(folders))})"""
+            params = tuple(folders)
+        cur.execute(query + ' ORDER BY "PNG File"', params)
+        for table in cur.fetch_arrow_batches():
+            yield from table.to_batches()
+    finally:
+        cur.close()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object that collects written bytes until they are drained."""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _ndjson_lines(batch):
+    keys = [json.dumps(name) + ":" for name in batch.schema.names]
+    columns = [column.to_pylist() for column in batch.columns]
+    lines = []
+    for row in zip(*columns):
+        lines.append("{" + ",".join(key + json.dumps(value, default=str) for key, value in zip(keys, row)) + "}\n")
+    return "".join(lines).encode("utf-8")
+
+
+def stream_export(batches, fmt, schema=None):
+    """
+    Serialize record batches to `fmt`, yielding bytes as each batch is encoded.
+    `schema` is used for an empty export (so Arrow/Parquet output still carries the columns).
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format {fmt!r} (expected one of {', '.join(FORMATS)})")
+    if fmt == "ndjson":
+        for batch in batches:
+            yield _ndjson_lines(batch)
+        return
+
+    pa = _pyarrow()
+    import pyarrow.parquet as pq
+
+    def open_writer(schema):
+        if fmt == "arrow":
+            return pa.ipc.new_stream(sink, schema)
+        return pq.ParquetWriter(sink, schema, compression="zstd")
+
+    sink = _ChunkSink()
+    writer = None
+    for batch in batches:
+        if writer is None:
+            writer = open_writer(batch.schema)
+        if fmt == "arrow":
+            writer.write_batch(batch)
+        else:
+            writer.write_table(pa.Table.from_batches([batch]))
+        yield sink.drain()
+    if writer is None and schema is not None:
+        writer = open_writer(schema)
+    if writer is not None:
+        writer.close()
+    yield sink.drain()
+
+
+def write_export(batches, fmt, path, schema=None):
+    """Write an export to a file; returns the number of bytes written."""
+    written = 0
+    with open(path, "wb") as f:
+        for chunk in stream_export(batches, fmt, schema):
+            f.write(chunk)
+            written += len(chunk)
+    return written
@@ -0,0 +1,168 @@
+"""
+MCAD Spatial Index
+Answers "which images see this part of the Moon" without scanning lunar_images.
+
+Each image's ground footprint is computed from its camera position, line of sight and field of view:
+the line of sight is intersected with the lunar sphere to get the footprint center, and the image
+dimensions at that slant range (compute_image_dimensions) give the footprint size. The footprint is
+stored as a spherical cap (center + angular radius) that bounds the image rectangle at any camera roll,
+so the camera quaternion is not needed for the bound; the cap is widened for oblique views.
+
+Caps are indexed in an SQLite R*Tree as 3D boxes on the unit sphere (no longitude wrap-around or
+pole special cases), then candidates are filtered exactly by great-circle distance.
+Positions are assumed to be in a Moon-centered, Moon-fixed frame (meters).
+"""
+import math
+
+import numpy as np
+
+from utils.crater_calculations import MOON_RADIUS, compute_image_dimensions
+
+MIN_INCIDENCE_COS = 0.2  # caps at grazing angles are widened by at most 5x
+
+
+def create_spatial_tables(conn):
+    """Create the footprint table and its R*Tree index if they do not exist."""
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS image_footprints (
+        image_id INTEGER PRIMARY KEY,
+        center_lat REAL NOT NULL,
+        center_lon REAL NOT NULL,
+        center_x REAL NOT NULL,
+        center_y REAL NOT NULL,
+        center_z REAL NOT NULL,
+        radius_rad REAL NOT NULL,
+        FOREIGN KEY (image_id) REFERENCES lunar_images (id)
+    )
+    ''')
+    conn.execute('''
+    CREATE VIRTUAL TABLE IF NOT EXISTS image_footprints_rtree USING rtree(
+        image_id, min_x, max_x, min_y, max_y, min_z, max_z
+    )
+    ''')
+
+
+def compute_footprints(cam_pos, cam_los, fov_x, fov_y):
+    """
+    Vectorized footprint computation for M images.
+    Returns (center unit vectors (M, 3), angular radius in radians (M,)).
+    """
+    cam_pos = np.asarray(cam_pos, dtype=np.float64)
+    los = np.asarray(cam_los, dtype=np.float64)
+    los = los / np.linalg.norm(los, axis=-1, keepdims=True)
+
+    # Ray/sphere intersection: |p + t*d| = R  ->  t = -b - sqrt(b^2 - c)
+    b = np.einsum("ij,ij->i", cam_pos, los)
+    c = np.einsum("ij,ij->i", cam_pos, cam_pos) - MOON_RADIUS ** 2
+    discriminant = b * b - c
+    hits = discriminant >= 0
+    slant_range = np.where(hits, -b - np.sqrt(np.where(hits, discriminant, 0.0)), 0.0)
+
+    # Lines of sight that miss the Moon fall back to the nadir point
+    altitude = np.sqrt(c + MOON_RADIUS ** 2) - MOON_RADIUS
+    slant_range = np.where(hits & (slant_range > 0), slant_range, altitude)
+    surface = np.where((hits & (slant_range > 0))[:, None], cam_pos + slant_range[:, None] * los, cam_pos)
+    centers = surface / np.linalg.norm(surface, axis=-1, keepdims=True)
+
+    width_m, height_m = compute_image_dimensions(slant_range, fov_x, fov_y)
+    half_diagonal_m = 0.5 * np.hypot(width_m, height_m)
+    # Oblique views stretch the footprint along the viewing direction
+    incidence_cos = np.clip(-np.einsum("ij,ij->i", los, centers), MIN_INCIDENCE_COS, 1.0)
+    radius_rad = np.minimum(half_diagonal_m / incidence_cos / MOON_RADIUS, np.pi)
+    return centers, radius_rad
+
+
+def lat_lon_to_unit(lat_deg, lon_deg):
+    lat, lon = np.radians(lat_deg), np.radians(lon_deg)
+    return np.array([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+
+
+def cap_bounding_box(center, radius_rad):
+    """Axis-aligned 3D box containing a spherical cap (the ball of its chord radius around the center)."""
+    chord = 2 * np.sin(np.minimum(radius_rad, np.pi) / 2)
+    low = np.clip(center - chord, -1.0, 1.0)
+    high = np.clip(center + chord, -1.0, 1.0)
+    return low, high
+
+
+def rebuild_spatial_index(conn):
+    """Recompute every image footprint from lunar_images and rebuild the R*Tree. Returns the row count."""
+    create_spatial_tables(conn)
+    rows = conn.execute('''
+        SELECT id, cam_pos_x, cam_pos_y, cam_pos_z, cam_los_x, cam_los_y, cam_los_z, fov_x_rad, fov_y_rad
+        FROM lunar_images
+        WHERE cam_pos_x IS NOT NULL AND cam_los_x IS NOT NULL AND fov_x_rad IS NOT NULL AND fov_y_rad IS NOT NULL
+    ''').fetchall()
+
+    with conn:
+        conn.execute("DELETE FROM image_footprints")
+        conn.execute("DELETE FROM image_footprints_rtree")
+        if not rows:
+            return 0
+
+        data = np.array(rows, dtype=np.float64)
+        ids = data[:, 0].astype(np.int64)
+        centers, radius_rad = compute_footprints(data[:, 1:4], data[:, 4:7], data[:, 7], data[:, 8])
+        lat = np.degrees(np.arcsin(np.clip(centers[:, 2], -1.0, 1.0)))
+        lon = np.degrees(np.arctan2(centers[:, 1], centers[:, 0]))
+        low, high = cap_bounding_box(centers, radius_rad[:, None])
+
+        conn.executemany(
+            "INSERT INTO image_footprints VALUES (?, ?, ?, ?, ?, ?, ?)",
+            zip(ids.tolist(), lat.tolist(), lon.tolist(), *centers.T.tolist(), radius_rad.tolist()),
+        )
+        conn.executemany(
+            "INSERT INTO image_footprints_rtree VALUES (?, ?, ?, ?, ?, ?, ?)",
+            zip(ids.tolist(), low[:, 0].tolist(), high[:, 0].tolist(), low[:, 1].tolist(),
+                high[:, 1].tolist(), low[:, 2].tolist(), high[:, 2].tolist()),
+        )
+    return len(rows)
+
+
+def _query_cap(conn, center, radius_rad, exclude_id=None):
+    """Images whose footprint cap intersects the cap (center, radius_rad), nearest first."""
+    low, high = cap_bounding_box(center, radius_rad)
+    candidates = conn.execute('''
+        SELECT li.folder_num, li.image_num, f.image_id, f.center_lat, f.center_lon,
+               f.center_x, f.center_y, f.center_z, f.radius_rad
+        FROM image_footprints_rtree r
+        JOIN image_footprints f ON f.image_id = r.image_id
+        JOIN lunar_images li ON li.id = r.image_id
+        WHERE r.max_x >= ? AND r.min_x <= ? AND r.max_y >= ? AND r.min_y <= ? AND r.max_z >= ? AND r.min_z <= ?
+    ''', (low[0], high[0], low[1], high[1], low[2], high[2])).fetchall()
+
+    cx, cy, cz = (float(v) for v in center)
+    results = []
+    for folder_num, image_num, image_id, lat, lon, x, y, z, footprint_rad in candidates:
+        if image_id == exclude_id:
+            continue
+        angle = math.acos(max(-1.0, min(1.0, cx * x + cy * y + cz * z)))
+        if angle <= radius_rad + footprint_rad:
+            results.append({
+                "folder_num": folder_num,
+                "image_num": image_num,
+                "center_lat": lat,
+                "center_lon": lon,
+                "footprint_radius_m": footprint_rad * MOON_RADIUS,
+                "distance_m": angle * MOON_RADIUS,
+            })
+    results.sort(key=lambda r: r["distance_m"])
+    return results
+
+
+def images_near(conn, lat, lon, radius_m=0.0):
+    """Images whose footprint comes within radius_m of the surface point (lat, lon) in degrees."""
+    return _query_cap(conn, lat_lon_to_unit(lat, lon), radius_m / MOON_RADIUS)
+
+
+def images_overlapping(conn, folder_num, image_num):
+    """Images whose footprint overlaps the footprint of (folder_num, image_num); None if the image is unknown."""
+    row = conn.execute('''
+        SELECT f.image_id, f.center_x, f.center_y, f.center_z, f.radius_rad
+        FROM image_footprints f
+        JOIN lunar_images li ON li.id = f.image_id
+        WHERE li.folder_num = ? AND li.image_num = ?
+    ''', (folder_num, image_num)).fetchone()
+    if row is None:
+        return None
+    return _query_cap(conn, np.array(row[1:4]), row[4], exclude_id=row[0])
@@ -6,25 +6,46 @@ This script computes the camera's altitude (distance from the lunar surface) usi
 It computes the real-world width and height of the area captured in the image.
 Also, this script defines a function to convert crater size from pixels to meters.
 If a crater spans 50 pixels, it calculates its real-world size in meters.
+
+All three functions are NumPy-vectorized: they accept a single value (as before) or arrays, so a whole
+detection run (many images, thousands of craters) can be sized in one pass with compute_crater_sizes.
 """
 import numpy as np
 
 MOON_RADIUS = 1737400  # meters
 
 def compute_camera_altitude(cam_pos):
-    """Compute camera altitude above the lunar surface."""
-    distance_from_center = np.linalg.norm(cam_pos)
+    """Compute camera altitude above the lunar surface.
+    cam_pos is one (x, y, z) position or an (N, 3) array of positions."""
+    distance_from_center = np.linalg.norm(np.asarray(cam_pos, dtype=np.float64), axis=-1)
     return distance_from_center - MOON_RADIUS
 
 def compute_image_dimensions(altitude, fov_x, fov_y):
-    """Compute the width and height of the lunar surface captured in the image."""
-    image_width_m = 2 * altitude * np.tan(fov_x / 2)
-    image_height_m = 2 * altitude * np.tan(fov_y / 2)
+    """Compute the width and height of the lunar surface captured in the image.
+    All arguments may be scalars or arrays of the same shape."""
+    image_width_m = 2 * altitude * np.tan(np.asarray(fov_x) / 2)
+    image_height_m = 2 * altitude * np.tan(np.asarray(fov_y) / 2)
     return image_width_m, image_height_m
 
 def crater_diameter_meters(pixel_diameter, image_width_m, image_width_px):
-    """Calculate crater diameter in meters from pixel size."""
-    return pixel_diameter * (image_width_m / image_width_px)
+    """Calculate crater diameter in meters from pixel size.
+    All arguments may be scalars or broadcastable arrays."""
+    return np.asarray(pixel_diameter) * (image_width_m / np.asarray(image_width_px))
+
+def compute_crater_sizes(cam_pos, fov_x, fov_y, image_width_px, pixel_diameters, image_index):
+    """
+    Size many craters from many images in one pass.
+    cam_pos: (M, 3) camera positions, one per image
+    fov_x, fov_y, image_width_px: length-M arrays (per-image field of view and sensor width)
+    pixel_diameters: length-N crater diameters in pixels
+    image_index: length-N index into the M images for each crater
+    Returns (altitude_m, image_width_m, image_height_m) per image and crater_diameter_m per crater.
+    """
+    altitude = compute_camera_altitude(cam_pos)
+    image_width_m, image_height_m = compute_image_dimensions(altitude, fov_x, fov_y)
+    meters_per_pixel = image_width_m / np.asarray(image_width_px, dtype=np.float64)
+    crater_diameter_m = np.asarray(pixel_diameters, dtype=np.float64) * meters_per_pixel[image_index]
+    return altitude, image_width_m, image_height_m, crater_diameter_m
 
 """
 Note: "def compute_camera_altitude(cam_pos)", 
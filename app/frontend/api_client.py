@@ -0,0 +1,256 @@
+"""
+MCAD GUI network layer
+Runs every backend request on a small QThreadPool so the Qt UI thread never blocks on the network.
+All requests share one keep-alive requests.Session (its urllib3 pool is sized to the worker count),
+so repeated calls reuse TCP connections instead of opening a new one each time.
+
+Requests are issued with a key ("image", "json", ...). Issuing a new request under the same key
+cancels the previous one: it is removed from the queue if it has not started, its download is
+abandoned between chunks if it has, and its callbacks are never called. Callbacks always run on the
+UI thread.
+
+GET requests made with cache=True go through the client's DiskCache (image_cache.py): the stored ETag is
+sent as If-None-Match and a 304 is answered from disk, so the caller always sees a 200 with the body.
+"""
+import json
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+from PyQt6.QtGui import QImage
+
+CHUNK_SIZE = 64 * 1024
+
+
+class ApiResponse:
+    """Status, headers and body of a finished request (plus the decoded QImage when one was requested)."""
+
+    def __init__(self, status_code, headers, content, image=None, from_cache=False):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.image = image
+        self.from_cache = from_cache  # Body read from the disk cache after a 304
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class _Signals(QObject):
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+    done = pyqtSignal()  # Always emitted last, also for cancelled requests
+
+
+class _RequestTask(QRunnable):
+    def __init__(self, session, method, url, kwargs, decode_image, timeout, disk_cache=None):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.session = session
+        self.method = method
+        self.url = url
+        self.kwargs = kwargs
+        self.decode_image = decode_image
+        self.timeout = timeout
+        self.disk_cache = disk_cache
+        self.cancelled = threading.Event()
+        self.signals = _Signals()
+
+    def run(self):
+        try:
+            self._run()
+        finally:
+            self.signals.done.emit()
+
+    def _run(self):
+        if self.cancelled.is_set():
+            return
+        try:
+            cache_key = etag = None
+            if self.disk_cache is not None:
+                cache_key = requests.Request(self.method, self.url, params=self.kwargs.get("params")).prepare().url
+                etag = self.disk_cache.etag(cache_key)
+            downloaded = self._download(etag)
+            if downloaded is None:
+                return
+            response, content = downloaded
+            status_code, from_cache = response.status_code, False
+            if status_code == 304 and etag:
+                cached = self.disk_cache.load(cache_key)
+                if cached is not None:
+                    status_code, content, from_cache = 200, cached, True
+                else:
+                    # The ETag outlived its body (evicted or unreadable): ask once more, unconditionally
+                    downloaded = self._download(None)
+                    if downloaded is None:
+                        return
+                    response, content = downloaded
+                    status_code = response.status_code
+            if status_code == 200 and cache_key and not from_cache and response.headers.get("ETag"):
+                self.disk_cache.store(cache_key, response.headers["ETag"], content)
+            # QImage (unlike QPixmap) may be decoded off the UI thread
+            image = QImage.fromData(content) if self.decode_image and status_code == 200 else None
+            result = ApiResponse(status_code, dict(response.headers), content, image, from_cache)
+        except Exception as e:
+            if not self.cancelled.is_set():
+                self.signals.failed.emit(str(e))
+            return
+        if not self.cancelled.is_set():
+            self.signals.finished.emit(result)
+
+    def _download(self, etag):
+        """Send the request (conditional on etag if given); (response, body), or None once cancelled."""
+        if etag:
+            self.kwargs["headers"]["If-None-Match"] = etag
+        else:
+            self.kwargs["headers"].pop("If-None-Match", None)
+        with self.session.request(self.method, self.url, stream=True, timeout=self.timeout,
+                                  **self.kwargs) as response:
+            chunks = []
+            for chunk in response.iter_content(CHUNK_SIZE):
+                if self.cancelled.is_set():
+                    return None  # Stale request: stop downloading, the connection is closed by the with block
+                chunks.append(chunk)
+            return response, b"".join(chunks)
+
+
+class ApiClient(QObject):
+    """Asynchronous client for the MCAD backend."""
+
+    def __init__(self, base_url="http://127.0.0.1:8000", max_workers=4, timeout=30, disk_cache=None, parent=None):
+        super().__init__(parent)
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.disk_cache = disk_cache  # image_cache.DiskCache used by cache=True requests
+        self.access_token = None
+        # Called on the UI thread after a 401; returns (username, password) or None to give up
+        self.login_handler = None
+        self._login_waiters = None  # Retries waiting on the login in progress
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max_workers)
+        self._tasks = {}  # key -> in-flight _RequestTask
+        self._active = set()  # Every queued or running task (keeps it alive until the pool is done with it)
+
+    def request(self, method, path, key=None, on_response=None, on_error=None, auth=False, decode_image=False,
+                cache=False, priority=0, _retried=False, **kwargs):
+        """
+        Send a request in the background. on_response(ApiResponse) gets every HTTP response (any status),
+        on_error(message) gets connection errors. With auth=True a 401 prompts for a login and retries once.
+        Queued requests with a higher priority start first (prefetches use a negative one).
+        """
+        if key is not None:
+            self.cancel(key)
+
+        headers = dict(kwargs.pop("headers", {}))
+        if auth and self.access_token:
+            headers["Authorization"] = f"Bearer {self.access_token}"
+        task = _RequestTask(self.session, method, self.base_url + path, dict(kwargs, headers=headers),
+                            decode_image, self.timeout, self.disk_cache if cache and method == "GET" else None)
+
+        def finished(response):
+            self._forget(key, task)
+            if response.status_code == 401 and auth and not _retried and self.login_handler:
+                self._login_and_retry(method, path, key, on_response, on_error, decode_image, cache, kwargs, response)
+            elif on_response:
+                on_response(response)
+
+        def failed(message):
+            self._forget(key, task)
+            if on_error:
+                on_error(message)
+
+        task.signals.finished.connect(finished)
+        task.signals.failed.connect(failed)
+        task.signals.done.connect(lambda: self._active.discard(task))
+        self._active.add(task)
+        if key is not None:
+            self._tasks[key] = task
+        self.pool.start(task, priority)
+        return task
+
+    def get(self, path, **kwargs):
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request("POST", path, **kwargs)
+
+    def _login_and_retry(self, method, path, key, on_response, on_error, decode_image, cache, kwargs, unauthorized):
+        def retry(logged_in):
+            if logged_in:
+                self.request(method, path, key=key, on_response=on_response, on_error=on_error, auth=True,
+                             decode_image=decode_image, cache=cache, _retried=True, **kwargs)
+            elif on_response:
+                on_response(unauthorized)
+
+        # Requests that fail with 401 while a login is already in progress (e.g. a screenful of tiles)
+        # wait for that login instead of prompting again
+        if self._login_waiters is not None:
+            self._login_waiters.append(retry)
+            return
+        self._login_waiters = [retry]
+
+        def finish(logged_in, response=None):
+            waiters, self._login_waiters = self._login_waiters, None
+            for waiter in waiters:
+                waiter(logged_in)
+            if response is not None and on_response:
+                on_response(response)  # The failed login itself (e.g. wrong password) for the first request
+
+        credentials = self.login_handler()
+        if not credentials:
+            finish(False)
+            return
+
+        def logged_in(response):
+            if response.status_code == 200:
+                self.access_token = response.json()["access_token"]
+                finish(True)
+            else:
+                self._login_waiters.remove(retry)
+                finish(False, response)
+
+        def login_failed(message):
+            self._login_waiters.remove(retry)
+            finish(False)
+            if on_error:
+                on_error(message)
+
+        username, password = credentials
+        self.post("/token", key="login", data={"username": username, "password": password},
+                  on_response=logged_in, on_error=login_failed)
+
+    def _forget(self, key, task):
+        if key is not None and self._tasks.get(key) is task:
+            del self._tasks[key]
+
+    def pending(self, key):
+        """True while a request issued under `key` is queued or running."""
+        return key in self._tasks
+
+    def cancel(self, key):
+        """Cancel the request issued under `key`, if it is still pending."""
+        task = self._tasks.pop(key, None)
+        if task is not None:
+            task.cancelled.set()
+            if self.pool.tryTake(task):  # Never started, so it will not emit done
+                self._active.discard(task)
+
+    def cancel_all(self):
+        for key in list(self._tasks):
+            self.cancel(key)
+
+    def shutdown(self, wait_ms=2000):
+        self.cancel_all()
+        self.pool.waitForDone(wait_ms)
+        self.session.close()
@@ -0,0 +1,162 @@
+"""
+MCAD GUI client-side caches
+    PixmapCache  decoded QPixmaps in memory, least-recently-used first out, bounded by pixel bytes
+    DiskCache    PNG bodies on disk next to the ETag they were served with. A cached URL is fetched with
+                 If-None-Match, so an unchanged image costs a 304 (no body, no server-side work) and is
+                 read back from disk. Bounded by bytes; the oldest files are removed first.
+    LRUCache     small keyed LRU for decoded JSON metadata
+
+DiskCache is used from the ApiClient worker threads, the in-memory caches only from the UI thread.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+# Thumbnails and tiles downloaded by the GUI (override with MCAD_GUI_CACHE_DIR)
+DEFAULT_CACHE_DIR = os.getenv("MCAD_GUI_CACHE_DIR", str(Path.home() / ".cache" / "mcad" / "images"))
+
+
+def pixmap_bytes(pixmap):
+    return pixmap.width() * pixmap.height() * max(pixmap.depth(), 8) // 8
+
+
+class LRUCache:
+    """Keyed LRU holding at most max_items entries."""
+
+    def __init__(self, max_items=256):
+        self.max_items = max_items
+        self._items = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        value = self._items.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self._items.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self._items[key] = value
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_items:
+            self._items.popitem(last=False)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def __len__(self):
+        return len(self._items)
+
+    def clear(self):
+        self._items.clear()
+
+
+class PixmapCache(LRUCache):
+    """LRU of QPixmaps bounded by their decoded size in bytes rather than by count."""
+
+    def __init__(self, max_bytes=128 * 1024 * 1024):
+        super().__init__(max_items=None)
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+
+    def put(self, key, pixmap):
+        old = self._items.pop(key, None)
+        if old is not None:
+            self.size_bytes -= pixmap_bytes(old)
+        size = pixmap_bytes(pixmap)
+        if size > self.max_bytes:
+            return
+        self._items[key] = pixmap
+        self.size_bytes += size
+        while self.size_bytes > self.max_bytes:
+            _, evicted = self._items.popitem(last=False)
+            self.size_bytes -= pixmap_bytes(evicted)
+
+    def clear(self):
+        super().clear()
+        self.size_bytes = 0
+
+
+class DiskCache:
+    """
+    URL -> (ETag, body) store. Each entry is two files named by the SHA-1 of the URL: <hash>.png with the
+    body and <hash>.etag with its validator. Both are written to a temporary name and renamed, so a
+    reader never sees a partial entry.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=512 * 1024 * 1024):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._size_bytes = None  # Computed on the first store
+        self.hits = 0
+        self.stores = 0
+
+    def _paths(self, url):
+        name = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        return self.directory / f"{name}.png", self.directory / f"{name}.etag"
+
+    def etag(self, url):
+        """The ETag stored for url, or None if it is not cached."""
+        body_path, etag_path = self._paths(url)
+        try:
+            if body_path.is_file():
+                return etag_path.read_text(encoding="utf-8")
+        except OSError:
+            pass
+        return None
+
+    def load(self, url):
+        """The cached body for url, or None."""
+        body_path, _ = self._paths(url)
+        try:
+            data = body_path.read_bytes()
+        except OSError:
+            return None
+        os.utime(body_path)  # Recently used entries are pruned last
+        self.hits += 1
+        return data
+
+    def store(self, url, etag, data):
+        body_path, etag_path = self._paths(url)
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            for path, content in ((body_path, data), (etag_path, etag.encode("utf-8"))):
+                tmp_path = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+                tmp_path.write_bytes(content)
+                os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Error writing {url} to the image cache: {e}")
+            return
+        self.stores += 1
+        with self._lock:
+            if self._size_bytes is None:
+                self._size_bytes = self._scan_size()
+            else:
+                self._size_bytes += len(data)
+            if self._size_bytes > self.max_bytes:
+                self._prune()
+
+    def _scan_size(self):
+        return sum(entry.stat().st_size for entry in os.scandir(self.directory) if entry.name.endswith(".png"))
+
+    def _prune(self):
+        """Remove the least recently used entries until the cache is back under 90% of max_bytes."""
+        entries = sorted((entry.stat().st_mtime_ns, entry.stat().st_size, entry.path)
+                         for entry in os.scandir(self.directory) if entry.name.endswith(".png"))
+        size = sum(entry[1] for entry in entries)
+        for _, entry_size, path in entries:
+            if size <= self.max_bytes * 0.9:
+                break
+            for stale in (path, path[:-len(".png")] + ".etag"):
+                try:
+                    os.remove(stale)
+                except OSError:
+                    pass
+            size -= entry_size
+        self._size_bytes = size
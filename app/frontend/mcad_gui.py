@@ -1,14 +1,223 @@
 import sys
 import json
-import requests
-import base64
+import math
 from PyQt6.QtWidgets import (QApplication, QWidget, QLabel, QPushButton, QVBoxLayout,
                              QComboBox, QHBoxLayout, QLineEdit, QMessageBox,
-                             QTextEdit, QTabWidget, QScrollArea)
-from PyQt6.QtGui import QPixmap
-from PyQt6.QtCore import Qt
+                             QTextEdit, QTabWidget, QInputDialog, QCheckBox,
+                             QGraphicsView, QGraphicsScene, QGraphicsPixmapItem, QGraphicsEllipseItem)
+from PyQt6.QtGui import QPixmap, QPainter, QPen, QColor
+from PyQt6.QtCore import Qt, QTimer, QRectF
+
+from api_client import ApiClient
+from image_cache import DiskCache, LRUCache, PixmapCache
+
+BASE_URL = "http://127.0.0.1:8000"  # FastAPI server
+THUMB_WIDTH = 600  # Width of the /thumb preview shown (and cached) before the tiles arrive
+
+
+class TiledImageView(QGraphicsView):
+    """
+    Zoom/pan viewer for one lunar image. Scene coordinates are full-resolution pixels.
+    A cached thumbnail is stretched over the whole image as a placeholder; on top of it only the tiles of
+    the pyramid level matching the current zoom that intersect the viewport are requested (/tiles/...),
+    decoded on the ApiClient worker threads, and dropped again once they scroll out of view or the zoom
+    level changes, so memory stays at about one viewport of tiles at any zoom.
+    Detected craters (/craters/...) are drawn as circles.
+    """
+
+    MAX_SCALE = 4.0  # Screen pixels per image pixel at the deepest zoom
+    TILE_MARGIN = 1  # Extra ring of tiles around the viewport, requested ahead of panning
+
+    def __init__(self, api, parent=None):
+        super().__init__(parent)
+        self.api = api
+        self.setScene(QGraphicsScene(self))
+        self.setDragMode(QGraphicsView.DragMode.ScrollHandDrag)
+        self.setTransformationAnchor(QGraphicsView.ViewportAnchor.AnchorUnderMouse)
+        self.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
+        self.setStyleSheet("border: 1px solid #cccccc;")
+
+        self.image = None  # (folder, image number) being shown
+        self.meta = None  # Pyramid metadata from /tiles/{folder}/{image}
+        self.preview_item = None
+        self.tiles = {}  # (z, x, y) -> QGraphicsPixmapItem on screen
+        self.pending = set()  # (z, x, y) being downloaded
+        self.crater_items = []
+        self.show_craters = True
+        self.fitted = True  # Keep the whole image in view until the user zooms
+
+        # Scrolling and zooming fire many events; the visible tile set is recomputed once they settle
+        self.update_timer = QTimer(self)
+        self.update_timer.setSingleShot(True)
+        self.update_timer.setInterval(30)
+        self.update_timer.timeout.connect(self.update_tiles)
+        self.horizontalScrollBar().valueChanged.connect(self.schedule_update)
+        self.verticalScrollBar().valueChanged.connect(self.schedule_update)
+
+    def open_image(self, folder, image):
+        """Switch to another image; its pyramid metadata and craters are requested in the background."""
+        if (folder, image) == self.image:
+            return
+        self.clear()
+        self.image = (folder, image)
+        self.api.get(f"/tiles/{folder}/{image}", key="tile_meta", auth=True,
+                     on_response=lambda response: self.on_meta((folder, image), response))
+        self.api.get(f"/craters/{folder}/{image}", key="craters",
+                     on_response=lambda response: self.on_craters((folder, image), response))
+
+    def clear(self):
+        for key in self.pending:
+            self.api.cancel(("tile", *self.image, *key))
+        self.api.cancel("tile_meta")
+        self.api.cancel("craters")
+        self.pending.clear()
+        self.tiles.clear()
+        self.crater_items.clear()
+        self.scene().clear()
+        self.preview_item = None
+        self.image = None
+        self.meta = None
+        self.fitted = True
+
+    def set_preview(self, pixmap):
+        if self.preview_item is not None:
+            self.scene().removeItem(self.preview_item)
+        self.preview_item = QGraphicsPixmapItem(pixmap)
+        self.preview_item.setTransformationMode(Qt.TransformationMode.SmoothTransformation)
+        self.preview_item.setZValue(-1)
+        self.scene().addItem(self.preview_item)
+        self.layout_scene()
+
+    def layout_scene(self):
+        """Size the scene to the full-resolution image (or to the preview until the metadata arrives)."""
+        if self.meta is not None:
+            rect = QRectF(0, 0, self.meta["width"], self.meta["height"])
+            if self.preview_item is not None:
+                self.preview_item.setScale(self.meta["width"] / self.preview_item.pixmap().width())
+        elif self.preview_item is not None:
+            rect = self.preview_item.boundingRect()
+        else:
+            return
+        self.setSceneRect(rect)
+        if self.fitted:
+            self.fitInView(rect, Qt.AspectRatioMode.KeepAspectRatio)
+        self.schedule_update()
 
-API_URL = "http://127.0.0.1:8000/compute_crater_size/"  # FastAPI endpoint
+    def on_meta(self, image, response):
+        if image != self.image or response.status_code != 200:
+            return
+        self.meta = response.json()
+        self.layout_scene()
+
+    def on_craters(self, image, response):
+        if image != self.image or response.status_code != 200:
+            return
+        pen = QPen(QColor(255, 64, 64))
+        pen.setCosmetic(True)  # Same line width at every zoom
+        pen.setWidth(2)
+        for crater in response.json()["craters"]:
+            radius = crater["diameter_pixels"] / 2
+            item = QGraphicsEllipseItem(crater["center_x"] - radius, crater["center_y"] - radius, 2 * radius, 2 * radius)
+            item.setPen(pen)
+            item.setZValue(100)
+            item.setVisible(self.show_craters)
+            item.setToolTip(f"{crater['diameter_meters']:.1f} m (confidence {crater['confidence_score'] or 0:.2f})")
+            self.scene().addItem(item)
+            self.crater_items.append(item)
+
+    def set_show_craters(self, show):
+        self.show_craters = bool(show)
+        for item in self.crater_items:
+            item.setVisible(self.show_craters)
+
+    def wheelEvent(self, event):
+        if self.sceneRect().isEmpty():
+            return
+        fit_scale = min(self.viewport().width() / self.sceneRect().width(),
+                        self.viewport().height() / self.sceneRect().height())
+        current = self.transform().m11()
+        target = min(max(current * 1.25 ** (event.angleDelta().y() / 120), fit_scale), self.MAX_SCALE)
+        self.scale(target / current, target / current)
+        self.fitted = target <= fit_scale
+        self.schedule_update()
+
+    def mouseDoubleClickEvent(self, event):
+        """Double-click zooms back out to the whole image."""
+        self.fitted = True
+        self.layout_scene()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        if self.fitted and not self.sceneRect().isEmpty():
+            self.fitInView(self.sceneRect(), Qt.AspectRatioMode.KeepAspectRatio)
+        self.schedule_update()
+
+    def schedule_update(self):
+        if self.meta is not None:
+            self.update_timer.start()
+
+    def zoom_level(self):
+        """Smallest pyramid level with at least one level pixel per screen pixel at the current scale."""
+        scale = self.transform().m11()
+        for level in self.meta["levels"]:
+            if level["width"] >= self.meta["width"] * scale:
+                return level["z"]
+        return self.meta["max_zoom"]
+
+    def update_tiles(self):
+        """Request the visible tiles of the current level and evict everything else."""
+        if self.meta is None:
+            return
+        z = self.zoom_level()
+        level = self.meta["levels"][z]
+        tile_size = self.meta["tile_size"]
+        factor = self.meta["width"] / level["width"]  # Image pixels per level pixel
+        span = tile_size * factor
+
+        visible = self.mapToScene(self.viewport().rect()).boundingRect()
+        x0 = max(0, math.floor(visible.left() / span) - self.TILE_MARGIN)
+        x1 = min(level["cols"] - 1, math.floor(visible.right() / span) + self.TILE_MARGIN)
+        y0 = max(0, math.floor(visible.top() / span) - self.TILE_MARGIN)
+        y1 = min(level["rows"] - 1, math.floor(visible.bottom() / span) + self.TILE_MARGIN)
+        wanted = {(z, x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)}
+
+        for key in list(self.tiles):
+            if key not in wanted:
+                self.scene().removeItem(self.tiles.pop(key))
+        for key in list(self.pending):
+            if key not in wanted:
+                self.api.cancel(("tile", *self.image, *key))
+                self.pending.discard(key)
+
+        # Tiles closest to the middle of the view are requested first
+        center_x, center_y = visible.center().x() / span, visible.center().y() / span
+        for key in sorted(wanted - self.tiles.keys() - self.pending,
+                          key=lambda k: (k[1] + 0.5 - center_x) ** 2 + (k[2] + 0.5 - center_y) ** 2):
+            self.request_tile(key, factor, span)
+
+    def request_tile(self, key, factor, span):
+        z, x, y = key
+        image = self.image
+        self.pending.add(key)
+
+        def on_tile(response):
+            if image != self.image or key not in self.pending:
+                return
+            self.pending.discard(key)
+            if response.status_code != 200 or response.image is None or response.image.isNull():
+                return
+            item = QGraphicsPixmapItem(QPixmap.fromImage(response.image))
+            item.setTransformationMode(Qt.TransformationMode.SmoothTransformation)
+            item.setScale(factor)
+            item.setPos(x * span, y * span)
+            self.scene().addItem(item)
+            self.tiles[key] = item
+
+        def on_error(message):
+            self.pending.discard(key)
+
+        self.api.get(f"/tiles/{image[0]}/{image[1]}/{z}/{x}/{y}", key=("tile", *image, *key), decode_image=True,
+                     cache=True, auth=True, on_response=on_tile, on_error=on_error)
 
 
 class MCAD_GUI(QWidget):
@@ -17,6 +226,11 @@ class MCAD_GUI(QWidget):
         self.setWindowTitle("MCAD Lunar Crater Analysis Tool")
         self.setGeometry(100, 100, 800, 800)  # Increased size to accommodate new elements
 
+        # All requests run on background threads; /get_json prompts for a login on the first 401.
+        # Thumbnails and tiles are kept on disk by ETag (revalidated with a conditional GET)
+        self.api = ApiClient(BASE_URL, disk_cache=DiskCache(), parent=self)
+        self.api.login_handler = self.prompt_login
+
         # NASA Logo
         self.nasa_logo = QLabel(self)
         pixmap = QPixmap("nasa_logo.png")
@@ -50,6 +264,19 @@ class MCAD_GUI(QWidget):
         # Initialize current JSON data
         self.current_json_data = None
 
+        # Folder -> PNG file names, loaded from /folders on first use
+        self.folder_index = None
+
+        # Decoded thumbnails are kept in memory, keyed by (folder, image number, width), along with the JSON data
+        self.pixmap_cache = PixmapCache(max_bytes=128 * 1024 * 1024)
+        self.json_cache = LRUCache(max_items=1024)
+        self.wanted_image = None  # Cache key of the image the user asked for last
+        self.prefetch_keys = set()
+
+        # Changing the selection cancels downloads that are still running for the old one
+        self.folder_combo.currentIndexChanged.connect(self.cancel_image_requests)
+        self.png_combo.currentIndexChanged.connect(self.cancel_image_requests)
+
     def setup_image_tab(self):
         # Dropdown for selecting folder
         self.folder_combo = QComboBox()
@@ -66,16 +293,18 @@ class MCAD_GUI(QWidget):
         self.load_img_btn = QPushButton("Load Image & Data")
         self.load_img_btn.clicked.connect(self.load_image_and_data)
 
-        # Image display label
-        self.image_label = QLabel()
-        self.image_label.setFixedSize(600, 600)
-        self.image_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.image_label.setStyleSheet("border: 1px solid #cccccc;")
+        # Step through the folder (neighbouring images are prefetched, so this is usually instant)
+        self.prev_img_btn = QPushButton("< Prev")
+        self.prev_img_btn.clicked.connect(lambda: self.step_image(-1))
+        self.next_img_btn = QPushButton("Next >")
+        self.next_img_btn.clicked.connect(lambda: self.step_image(1))
 
-        # Create a scroll area for the image
-        scroll_area = QScrollArea()
-        scroll_area.setWidget(self.image_label)
-        scroll_area.setWidgetResizable(True)
+        # Zoomable image viewer (wheel to zoom, drag to pan, double-click to fit) with crater overlay
+        self.image_view = TiledImageView(self.api)
+        self.image_view.setMinimumSize(600, 600)
+        self.show_craters_box = QCheckBox("Show detected craters")
+        self.show_craters_box.setChecked(True)
+        self.show_craters_box.toggled.connect(self.image_view.set_show_craters)
 
         # Layout
         folder_hbox = QHBoxLayout()
@@ -87,11 +316,14 @@ class MCAD_GUI(QWidget):
         png_hbox.addWidget(QLabel("Select Image:"))
         png_hbox.addWidget(self.png_combo)
         png_hbox.addWidget(self.load_img_btn)
+        png_hbox.addWidget(self.prev_img_btn)
+        png_hbox.addWidget(self.next_img_btn)
+        png_hbox.addWidget(self.show_craters_box)
 
         vbox = QVBoxLayout()
         vbox.addLayout(folder_hbox)
         vbox.addLayout(png_hbox)
-        vbox.addWidget(scroll_area)
+        vbox.addWidget(self.image_view)
 
         self.image_tab.setLayout(vbox)
 
@@ -147,17 +379,59 @@ class MCAD_GUI(QWidget):
 
         self.analysis_tab.setLayout(vbox)
 
+    def prompt_login(self):
+        """Ask for credentials after a 401 (called by the ApiClient); returns (username, password) or None."""
+        username, ok = QInputDialog.getText(self, "Log In", "Username:")
+        if not ok or not username:
+            return None
+        password, ok = QInputDialog.getText(self, "Log In", "Password:", QLineEdit.EchoMode.Password)
+        if not ok:
+            return None
+        return username, password
+
+    def cancel_image_requests(self):
+        """The selection changed: drop image/JSON downloads for the previous selection."""
+        self.api.cancel("image")
+        self.api.cancel("json")
+
+    def closeEvent(self, event):
+        self.api.shutdown()
+        super().closeEvent(event)
+
+    def show_network_error(self, message):
+        QMessageBox.critical(self, "Error", f"Could not reach the MCAD server: {message}")
+
     def load_png_files(self):
         folder_number = self.folder_combo.currentText()
-        url = f"http://127.0.0.1:8000/list_png_files/{folder_number}"
-        response = requests.get(url)
 
-        if response.status_code == 200:
-            png_files = response.json().get("png_files", [])
+        # Every folder's listing is fetched once (/folders) and reused on later folder switches
+        if self.folder_index is not None:
+            self.show_png_files(folder_number)
+            return
+
+        def on_folders(response):
+            if response.status_code == 200:
+                self.folder_index = response.json().get("folders", {})
+            self.show_png_files(folder_number)
+
+        self.api.get("/folders", key="files", on_response=on_folders, on_error=self.show_network_error)
+
+    def show_png_files(self, folder_number):
+        png_files = self.folder_index.get(folder_number) if self.folder_index else None
+        if png_files is not None:
             self.png_combo.clear()
             self.png_combo.addItems(png_files)
-        else:
-            QMessageBox.critical(self, "Error", f"Error fetching PNG files: {response.text}")
+            return
+
+        def on_files(response):
+            if response.status_code == 200:
+                self.png_combo.clear()
+                self.png_combo.addItems(response.json().get("png_files", []))
+            else:
+                QMessageBox.critical(self, "Error", f"Error fetching PNG files: {response.text}")
+
+        self.api.get(f"/list_png_files/{folder_number}", key="files", on_response=on_files,
+                     on_error=self.show_network_error)
 
     def load_image_and_data(self):
         folder_number = self.folder_combo.currentText()
@@ -166,52 +440,136 @@ class MCAD_GUI(QWidget):
             QMessageBox.warning(self, "Warning", "No file selected")
             return
 
-        # Load the image
+        # The image and its JSON data are requested concurrently
         self.load_image(folder_number, file_name)
-
-        # Load the corresponding JSON data
         self.load_json_data(folder_number, file_name)
 
+    def step_image(self, offset):
+        index = self.png_combo.currentIndex() + offset
+        if 0 <= index < self.png_combo.count():
+            self.png_combo.setCurrentIndex(index)
+            self.load_image_and_data()
+
+    def image_cache_key(self, folder_number, file_name):
+        image_number = int(file_name.removeprefix("image_").removesuffix(".png"))
+        return int(folder_number), image_number, THUMB_WIDTH
+
+    def fetch_image(self, cache_key, key, priority=0, prompt=True):
+        """
+        Download a thumbnail into the pixmap cache; it is shown if it is still the one the user wants.
+        Errors are reported only for that image too, so a prefetch that load_image is waiting on reports them.
+        Thumbnails need a token: with prompt=False (prefetches) the current token is sent but a 401 never
+        asks for a login; a waited-on prefetch is then fetched again with the login prompt.
+        """
+        folder, image, width = cache_key
+
+        def on_image(response):
+            if response.status_code == 200 and response.image is not None and not response.image.isNull():
+                pixmap = QPixmap.fromImage(response.image)
+                self.pixmap_cache.put(cache_key, pixmap)
+                if cache_key == self.wanted_image:
+                    self.image_view.set_preview(pixmap)
+            elif cache_key == self.wanted_image:
+                if response.status_code == 401 and not prompt:
+                    self.fetch_image(cache_key, "image")
+                else:
+                    QMessageBox.critical(self, "Error", f"Error fetching image: {response.text}")
+
+        def on_error(message):
+            if cache_key == self.wanted_image:
+                self.show_network_error(message)
+
+        # Request a server-side thumbnail as the preview instead of the full 2592x2048 PNG
+        auth = {"auth": True} if prompt else {"headers": {"Authorization": f"Bearer {self.api.access_token}"}}
+        self.api.get(f"/thumb/{folder}/{image}", key=key, decode_image=True, cache=True, priority=priority,
+                     params={"w": width}, on_response=on_image, on_error=on_error, **auth)
+
     def load_image(self, folder_number, file_name):
-        url = f"http://127.0.0.1:8000/get_png/{folder_number}/{file_name}"
-        response = requests.get(url)
-
-        if response.status_code == 200:
-            image_base64 = response.json().get("image_base64", "")
-            image_data = base64.b64decode(image_base64)
-            pixmap = QPixmap()
-            pixmap.loadFromData(image_data)
-
-            # Scale pixmap to fit the label while maintaining aspect ratio
-            self.image_label.setPixmap(pixmap.scaled(
-                self.image_label.width(),
-                self.image_label.height(),
-                Qt.AspectRatioMode.KeepAspectRatio
-            ))
-        else:
-            QMessageBox.critical(self, "Error", f"Error fetching image: {response.text}")
+        cache_key = self.image_cache_key(folder_number, file_name)
+        self.wanted_image = cache_key
+        # The viewer fetches full-resolution tiles for whatever part of the image is zoomed into
+        self.image_view.open_image(*cache_key[:2])
+
+        pixmap = self.pixmap_cache.get(cache_key)
+        if pixmap is not None:
+            self.image_view.set_preview(pixmap)
+        elif not self.api.pending(("prefetch", cache_key)):  # A running prefetch shows it when it arrives
+            self.fetch_image(cache_key, "image")
+        self.prefetch_neighbours(folder_number, file_name)
+
+    def prefetch_neighbours(self, folder_number, file_name):
+        """Speculatively fetch the previous/next image in the folder and the first image of the next folder."""
+        targets = []
+        index = self.png_combo.findText(file_name)
+        for neighbour in (index + 1, index - 1):
+            if index >= 0 and 0 <= neighbour < self.png_combo.count():
+                targets.append((folder_number, self.png_combo.itemText(neighbour)))
+        next_folder = f"{int(folder_number) + 1:03d}"
+        if self.folder_index and self.folder_index.get(next_folder):
+            targets.append((next_folder, self.folder_index[next_folder][0]))
+
+        wanted = {("prefetch", self.wanted_image)}  # Keep a prefetch the user is now waiting on
+        for folder, name in targets:
+            # Thumbnails and JSON need a token; prefetches never prompt for a login
+            if not self.api.access_token:
+                break
+            cache_key = self.image_cache_key(folder, name)
+            if cache_key not in self.pixmap_cache:
+                wanted.add(("prefetch", cache_key))
+                if not self.api.pending(("prefetch", cache_key)):
+                    self.fetch_image(cache_key, ("prefetch", cache_key), priority=-1, prompt=False)
+            json_key = (folder, name.replace(".png", ".json"))
+            if json_key not in self.json_cache:
+                wanted.add(("prefetch", json_key))
+                if not self.api.pending(("prefetch", json_key)):
+                    self.prefetch_json(json_key)
+
+        # Prefetches for images that are no longer next to the selection are dropped
+        for stale in self.prefetch_keys - wanted:
+            self.api.cancel(stale)
+        self.prefetch_keys = wanted
+
+    def prefetch_json(self, json_key):
+        def on_json(response):
+            if response.status_code == 200:
+                self.json_cache.put(json_key, response.json().get("json_data", {}))
+
+        folder, json_file_name = json_key
+        self.api.get(f"/get_json/{folder}/{json_file_name}", key=("prefetch", json_key), priority=-1,
+                     headers={"Authorization": f"Bearer {self.api.access_token}"}, on_response=on_json)
+
+    def show_json_data(self, json_data):
+        self.current_json_data = json_data
+
+        # Format JSON for display
+        formatted_json = json.dumps(json_data, indent=2)
+        self.json_display.setText(formatted_json)
+
+        # Switch to the JSON data tab
+        self.tab_widget.setCurrentIndex(1)
 
     def load_json_data(self, folder_number, file_name):
         # Convert PNG filename to JSON filename
         json_file_name = file_name.replace(".png", ".json")
+        json_key = (folder_number, json_file_name)
 
-        # Call API to get JSON data
-        url = f"http://127.0.0.1:8000/get_json/{folder_number}/{json_file_name}"
-        response = requests.get(url)
-
-        if response.status_code == 200:
-            json_data = response.json().get("json_data", {})
-            self.current_json_data = json_data
+        json_data = self.json_cache.get(json_key)
+        if json_data is not None:
+            self.show_json_data(json_data)
+            return
 
-            # Format JSON for display
-            formatted_json = json.dumps(json_data, indent=2)
-            self.json_display.setText(formatted_json)
+        def on_json(response):
+            if response.status_code == 200:
+                json_data = response.json().get("json_data", {})
+                self.json_cache.put(json_key, json_data)
+                self.show_json_data(json_data)
+            else:
+                QMessageBox.critical(self, "Error", f"Error fetching JSON data: {response.text}")
+                self.current_json_data = None
 
-            # Switch to the JSON data tab
-            self.tab_widget.setCurrentIndex(1)
-        else:
-            QMessageBox.critical(self, "Error", f"Error fetching JSON data: {response.text}")
-            self.current_json_data = None
+        # Call API to get JSON data (requires a login; the ApiClient prompts on the first 401)
+        self.api.get(f"/get_json/{folder_number}/{json_file_name}", key="json", auth=True,
+                     on_response=on_json, on_error=self.show_network_error)
 
     def auto_fill_from_json(self):
         if not self.current_json_data:
@@ -255,10 +613,16 @@ class MCAD_GUI(QWidget):
 
             if pixel_diameter <= 0:
                 raise ValueError("Crater pixel diameter must be a positive integer.")
+        except ValueError as ve:
+            QMessageBox.warning(self, "Input Error", str(ve))
+            return
 
-            data = {"cam_pos": cam_pos, "pixel_diameter": pixel_diameter}
-            response = requests.post(API_URL, json=data)
+        data = {"cam_pos": cam_pos, "pixel_diameter": pixel_diameter}
+        self.api.post("/compute_crater_size/", key="crater", json=data, on_response=self.show_crater_size,
+                      on_error=self.show_network_error)
 
+    def show_crater_size(self, response):
+        try:
             if response.status_code == 200:
                 result = response.json()
 
@@ -289,8 +653,6 @@ class MCAD_GUI(QWidget):
                 )
             else:
                 QMessageBox.critical(self, "Error", f"Failed to compute crater size.\nServer Response: {response.text}")
-        except ValueError as ve:
-            QMessageBox.warning(self, "Input Error", str(ve))
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Unexpected error: {str(e)}")
 
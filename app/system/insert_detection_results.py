@@ -1,20 +1,26 @@
 # Insert detection results into Snowflake from algorithm 6
 import snowflake.connector
 import json
+import os
+import tempfile
 from datetime import datetime
+from pathlib import Path
+
+RESULT_COLUMNS = ("image_id", "detected_craters", "crater_count", "processing_time", "detection_timestamp")
 
 # Connect to Snowflake
-conn = snowflake.connector.connect(
-    user=os.getenv("SNOWFLAKE_USER"),
-    password=os.getenv("SNOWFLAKE_PASSWORD"),
-    account=os.getenv("SNOWFLAKE_ACCOUNT"),
-    warehouse="JAMS_WH",
-    database="JAMS_DB",
-    schema="JAMS"
-)
-cur = conn.cursor()
-
-def insert_crater_results(results):
+def get_snowflake_connection():
+    return snowflake.connector.connect(
+        user=os.getenv("SNOWFLAKE_USER"),
+        password=os.getenv("SNOWFLAKE_PASSWORD"),
+        account=os.getenv("SNOWFLAKE_ACCOUNT"),
+        warehouse="JAMS_WH",
+        database="JAMS_DB",
+        schema="JAMS"
+    )
+
+def insert_crater_results(conn, results):
+    cur = conn.cursor()
     image_id = results["image_id"]
     detected_craters = json.dumps(results["detected_craters"])  # Convert list to JSON string
     crater_count = results["crater_count"]
@@ -27,14 +33,71 @@ def insert_crater_results(results):
     """
     cur.execute(query, (image_id, detected_craters, crater_count, processing_time, detection_timestamp))
     conn.commit()
+    cur.close()
+
+##############################################
+#### Bulk Load: staged file + COPY INTO ######
+##############################################
+def bulk_insert_crater_results(conn, results_list):
+    """
+    Load many detection results in one round-trip: write them to a newline-delimited JSON file,
+    PUT it on the table stage and COPY INTO crater_detection_results (instead of one INSERT + commit per row).
+    Returns the number of rows loaded.
+    """
+    results_list = list(results_list)
+    if not results_list:
+        return 0
+
+    cur = conn.cursor()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_name = f"crater_results_{datetime.now().strftime('%Y%m%d%H%M%S%f')}.json"
+        file_path = Path(tmp_dir) / file_name
+        with open(file_path, "w") as f:
+            for results in results_list:
+                record = {column: results.get(column) for column in RESULT_COLUMNS}
+                if record["crater_count"] is None:
+                    record["crater_count"] = len(record["detected_craters"] or [])
+                f.write(json.dumps(record, default=str) + "\n")
+
+        cur.execute(f"PUT file://{file_path.as_posix()} @%crater_detection_results AUTO_COMPRESS=TRUE OVERWRITE=TRUE")
+        cur.execute(f"""
+        COPY INTO crater_detection_results
+        FROM @%crater_detection_results
+        FILES = ('{file_name}.gz')
+        FILE_FORMAT = (TYPE = 'JSON')
+        MATCH_BY_COLUMN_NAME = 'CASE_INSENSITIVE'
+        PURGE = TRUE
+        """)
+        loaded = sum(row[3] for row in cur.fetchall() if row[3] is not None)  # rows_loaded per file
+
+    conn.commit()
+    cur.close()
+    return loaded
+
+def iter_detection_results(directory):
+    """
+    Yield detection results from every *.json file under `directory`.
+    Each file holds one result or a list of results in the crater_detection_results format.
+    """
+    for path in sorted(Path(directory).rglob("*.json")):
+        with open(path) as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            yield data
+        else:
+            yield from data
+
+if __name__ == "__main__":
+    conn = get_snowflake_connection()
 
-# Example Insertion
-sample_results = {
-    "image_id": "001/image_0.png",
-    "detected_craters": [{"center": (150, 200), "radius": 30, "confidence": 0.9}],
-    "crater_count": 1,
-    "processing_time": 0.8,
-    "detection_timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-}
+    # Example Insertion
+    sample_results = {
+        "image_id": "001/image_0.png",
+        "detected_craters": [{"center": (150, 200), "radius": 30, "confidence": 0.9}],
+        "crater_count": 1,
+        "processing_time": 0.8,
+        "detection_timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    }
 
-insert_crater_results(sample_results)
+    insert_crater_results(conn, sample_results)
+    conn.close()
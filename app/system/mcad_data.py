@@ -5,52 +5,28 @@
 ##########################################################
 ######### ✅Upload PNG files to the Internal Stage #######
 ##########################################################
-import snowflake.connector
 import os
 
-# Establish the connection to Snowflake
-conn = snowflake.connector.connect(
-    user=os.getenv("SNOWFLAKE_USER"),
-    password=os.getenv("SNOWFLAKE_PASSWORD"),
-    account=os.getenv("SNOWFLAKE_ACCOUNT"),
-    warehouse="JAMS_WH",
-    database="JAMS_DB",
-    schema="JAMS"
-)
-cur = conn.cursor()
-
-# Set database and schema
-# cur.execute("USE DATABASE JAMS_DB;") # Old DB
-# cur.execute("USE SCHEMA JAMS;") # Old Schema
+from mcad_upload import SnowflakeStage, UploadManifest, find_png_files, upload_files
 
 # Path where PNG files are stored
 data_folder = "/Users/joshuajackson/Downloads/mcad_moon_data"
 
-# Upload PNG files to Snowflake with unique subfolder paths
-for root, _, files in os.walk(data_folder):
-    subfolder_name = os.path.basename(root)  # Extract folder name (000, 001, ..., 275)
-
-    for file in files:
-        if file.endswith(".png"):  # Upload only PNG files
-            file_path = os.path.join(root, file)
-            stage_file_path = f"@original_png_internal_stage/{subfolder_name}"  # Unique path
-
-            # Debugging prints
-            print(f"Uploading: {file_path} --> {stage_file_path}")
-
-            stage_command = f"PUT file://{file_path} {stage_file_path} AUTO_COMPRESS=FALSE"
-
-            try:
-                cur.execute(stage_command)
-                print(f"Uploaded: {file} to {stage_file_path}")
-            except snowflake.connector.errors.ProgrammingError as e:
-                print(f"Error uploading {file}: {e}")
-
-print("✅ All PNG files uploaded to Snowflake Internal Stage!")
+# Upload PNG files to Snowflake with unique subfolder paths (@original_png_internal_stage/000, ..., /275).
+# Files are sent in batches (one PUT ... PARALLEL=8 per batch) by 4 concurrent connections, verified after
+# upload, and skipped on re-runs once staged (see mcad_upload.py)
+stage = SnowflakeStage("@original_png_internal_stage")  # JAMS_WH / JAMS_DB.JAMS, credentials from SNOWFLAKE_*
+manifest = UploadManifest(os.path.join(data_folder, "..", "mcad_upload_manifest.db"))
+try:
+    stats = upload_files(find_png_files(data_folder), stage, workers=4, parallel=8, batch_size=32, manifest=manifest)
+finally:
+    stage.close()
+    manifest.close()
 
-conn.commit()
-cur.close()
-conn.close()
+if stats["failed"]:
+    print(f"Error uploading {stats['failed']} file(s), run again to retry: {', '.join(stats['failed_files'])}")
+else:
+    print(f"✅ All PNG files uploaded to Snowflake Internal Stage! ({stats['mb_per_s']:.1f} MB/s)")
 
 
 ##############################################################################
@@ -1,49 +1,22 @@
 import os
-import snowflake.connector
 
-# Connect to Snowflake using environment variables
-conn = snowflake.connector.connect(
-    user=os.getenv("SNOWFLAKE_USER"),
-    password=os.getenv("SNOWFLAKE_PASSWORD"),
-    account=os.getenv("SNOWFLAKE_ACCOUNT"),
-    warehouse="JAMS_WH",
-    database="JAMS_DB",
-    schema="JAMS"
-)
-cur = conn.cursor()
+from mcad_upload import SnowflakeTable, UploadManifest, find_png_files, upload_files
 
 # Define the path where PNG images are stored
 data_folder = "/Users/joshuajackson/Downloads/mcad_moon_data"
 
-# Iterate through all folders and insert PNG images
-for root, _, files in os.walk(data_folder):
-    subfolder_name = os.path.basename(root)  # Extract folder name (e.g., "001")
-
-    for file in files:
-        if file.lower().endswith(".png"):
-            png_path = os.path.join(root, file)
-            png_file_name = f"{subfolder_name}/{file}"  # Match format in `moon_crater_data`
-
-            try:
-                # Read PNG as binary data
-                with open(png_path, "rb") as f:
-                    png_binary = f.read()
-
-                # SQL Insert Statement
-                sql_query = """
-                    INSERT INTO JAMS_DB.JAMS.MOON_CRATER_IMAGES ("PNG File", "Image_Data")
-                    VALUES (%s, %s)
-                """
-
-                # Execute Insert
-                cur.execute(sql_query, (png_file_name, png_binary))
-
-            except Exception as e:
-                print(f"Error inserting {png_file_name}: {e}")
-
-# Commit and Close Connection
-conn.commit()
-cur.close()
-conn.close()
-
-print("🫵🏾👍🏾 PNG images successfully uploaded to Snowflake! 🚀")
+# Insert every PNG into MOON_CRATER_IMAGES ("PNG File" matches the format in `moon_crater_data`, e.g. "001/image_0.png").
+# Rows are inserted in batches (one executemany + commit each) by 4 concurrent connections, checked with
+# MD5("Image_Data"), and images already in the table are skipped on re-runs (see mcad_upload.py)
+table = SnowflakeTable("JAMS_DB.JAMS.MOON_CRATER_IMAGES")  # JAMS_WH / JAMS_DB.JAMS, credentials from SNOWFLAKE_*
+manifest = UploadManifest(os.path.join(data_folder, "..", "mcad_upload_manifest.db"))
+try:
+    stats = upload_files(find_png_files(data_folder), table, workers=4, batch_size=16, manifest=manifest)
+finally:
+    table.close()
+    manifest.close()
+
+if stats["failed"]:
+    print(f"Error inserting {stats['failed']} image(s), run again to retry: {', '.join(stats['failed_files'])}")
+else:
+    print(f"🫵🏾👍🏾 PNG images successfully uploaded to Snowflake! 🚀 ({stats['mb_per_s']:.1f} MB/s)")
@@ -0,0 +1,425 @@
+# Parallel, resumable PNG upload for the MCAD dataset
+"""
+Upload the {folder}/image_N.png files under a data folder to one of three targets:
+
+    stage   Snowflake internal stage (@original_png_internal_stage/{folder}/...), mcad_data.py.
+            Each batch of files is symlinked into a temporary directory and sent with a single
+            PUT 'file://<dir>/*.png' ... PARALLEL=N, instead of one PUT per file.
+    table   MOON_CRATER_IMAGES ("PNG File", "Image_Data") BLOB rows, mcad_images.py.
+            Each batch is one executemany() INSERT plus one commit.
+    local   a plain directory laid out like the stage (for testing without Snowflake)
+
+Batches run on several worker threads, each with its own connection. Every batch is verified after
+upload: the stage listing must show the local size (and, where the target reports one, the same MD5)
+and table rows must have the same MD5(Image_Data). Failed batches are retried and then left for the
+next run.
+
+Re-runs only upload what is missing. Files already on the target with the same size (and MD5, where
+available) are skipped. A manifest (SQLite) remembers each verified file's size, mtime and MD5, so
+unchanged files are not hashed again.
+
+Usage:
+    python mcad_upload.py local /path/to/mcad_moon_data --dest /tmp/stage --workers 4
+    python mcad_upload.py stage /path/to/mcad_moon_data --workers 4 --parallel 8 --batch-size 32
+    python mcad_upload.py table /path/to/mcad_moon_data --workers 4 --batch-size 16
+"""
+import argparse
+import hashlib
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+PNG_STAGE = "@original_png_internal_stage"
+IMAGES_TABLE = "JAMS_DB.JAMS.MOON_CRATER_IMAGES"
+DEFAULT_MANIFEST = "mcad_upload_manifest.db"
+
+_PNG_NAME = re.compile(r"^image_\d+\.png$", re.IGNORECASE)
+
+
+class UploadFile:
+    """One local PNG and its name on the target ("001/image_0.png")."""
+
+    __slots__ = ("path", "name", "folder", "size", "mtime_ns", "md5")
+
+    def __init__(self, path, name, folder, size, mtime_ns):
+        self.path = path
+        self.name = name
+        self.folder = folder
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.md5 = None
+
+
+def find_png_files(data_folder):
+    """All {folder}/image_N.png files under data_folder, sorted by name."""
+    files = []
+    for root, _, names in os.walk(data_folder):
+        folder = os.path.basename(root)  # Extract folder name (000, 001, ..., 275)
+        for file in names:
+            if _PNG_NAME.match(file):
+                path = os.path.join(root, file)
+                stat = os.stat(path)
+                files.append(UploadFile(path, f"{folder}/{file}", folder, stat.st_size, stat.st_mtime_ns))
+    return sorted(files, key=lambda f: f.name)
+
+
+def file_md5(path, chunk_size=1024 * 1024):
+    digest = hashlib.md5()
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def snowflake_connect(**overrides):
+    """Snowflake connection from the SNOWFLAKE_* environment variables (warehouse/database/schema as in mcad_data.py)."""
+    import snowflake.connector
+    params = dict(user=os.getenv("SNOWFLAKE_USER"), password=os.getenv("SNOWFLAKE_PASSWORD"),
+                  account=os.getenv("SNOWFLAKE_ACCOUNT"), warehouse="JAMS_WH", database="JAMS_DB", schema="JAMS")
+    params.update(overrides)
+    return snowflake.connector.connect(**params)
+
+
+################
+### Manifest ###
+################
+
+class UploadManifest:
+    """Verified uploads (name -> size, mtime, MD5) so re-runs neither re-upload nor re-hash unchanged files."""
+
+    def __init__(self, path=DEFAULT_MANIFEST):
+        self.conn = sqlite3.connect(str(path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute('''
+        CREATE TABLE IF NOT EXISTS uploads (
+            target TEXT NOT NULL,
+            name TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            md5 TEXT NOT NULL,
+            uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (target, name)
+        )
+        ''')
+        self._lock = threading.Lock()
+
+    def load(self, target):
+        rows = self.conn.execute("SELECT name, size, mtime_ns, md5 FROM uploads WHERE target = ?", (target,))
+        return {name: (size, mtime_ns, md5) for name, size, mtime_ns, md5 in rows}
+
+    def record(self, target, files):
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO uploads (target, name, size, mtime_ns, md5) VALUES (?, ?, ?, ?, ?)",
+                [(target, f.name, f.size, f.mtime_ns, f.md5) for f in files])
+
+    def close(self):
+        self.conn.close()
+
+
+###############
+### Targets ###
+###############
+
+class LocalStage:
+    """Directory stand-in for a Snowflake stage ({dest}/{folder}/image_N.png)."""
+
+    def __init__(self, dest):
+        self.dest = Path(dest)
+        self.label = f"local:{self.dest.resolve()}"
+
+    def listing(self):
+        """name -> (size, md5 or None) of everything already on the target."""
+        if not self.dest.is_dir():
+            return {}
+        return {path.relative_to(self.dest).as_posix(): (path.stat().st_size, None)
+                for path in self.dest.glob("*/*.png")}
+
+    def upload(self, batch, parallel):
+        for f in batch:
+            target = self.dest / f.name
+            target.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = target.with_name(f"{target.name}.tmp")
+            shutil.copyfile(f.path, tmp_path)
+            os.replace(tmp_path, target)
+
+    def verify(self, batch):
+        """Names in the batch whose uploaded copy does not match the local file."""
+        bad = []
+        for f in batch:
+            target = self.dest / f.name
+            if not target.is_file() or target.stat().st_size != f.size or file_md5(target) != f.md5:
+                bad.append(f.name)
+        return bad
+
+    def close(self):
+        pass
+
+
+class _SnowflakeTarget:
+    """One Snowflake connection per upload thread."""
+
+    def __init__(self, connect=snowflake_connect):
+        self.connect = connect
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+
+    def connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self.connect()
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def close(self):
+        for conn in self._connections:
+            try:
+                conn.close()
+            except Exception as e:
+                print(f"Error closing Snowflake connection: {e}")
+        self._connections = []
+
+
+class SnowflakeStage(_SnowflakeTarget):
+    """
+    Internal stage. LIST reports the plain MD5 of a file only on stages with SNOWFLAKE_SSE encryption;
+    on client-side encrypted stages pass sse=False and batches are verified by PUT status and size.
+    """
+
+    def __init__(self, stage=PNG_STAGE, connect=snowflake_connect, sse=False):
+        super().__init__(connect)
+        self.stage = stage
+        self.reports_md5 = sse
+        self.label = f"stage:{stage}"
+
+    def _list(self, path):
+        cur = self.connection().cursor()
+        try:
+            cur.execute(f"LIST {path}")
+            # name is "<stage name>/001/image_0.png"; columns are name, size, md5, last_modified
+            return {name.split("/", 1)[1]: (size, md5 if self.reports_md5 else None)
+                    for name, size, md5, _ in cur.fetchall()}
+        finally:
+            cur.close()
+
+    def listing(self):
+        return self._list(self.stage)
+
+    def upload(self, batch, parallel):
+        folder = batch[0].folder
+        # PUT takes a path pattern, so the batch is gathered into its own directory first
+        with tempfile.TemporaryDirectory(prefix="mcad_put_") as batch_dir:
+            for f in batch:
+                link = os.path.join(batch_dir, os.path.basename(f.path))
+                try:
+                    os.symlink(os.path.abspath(f.path), link)
+                except OSError:
+                    shutil.copyfile(f.path, link)
+            cur = self.connection().cursor()
+            try:
+                cur.execute(f"PUT 'file://{Path(batch_dir).as_posix()}/*.png' {self.stage}/{folder} "
+                            f"PARALLEL={parallel} AUTO_COMPRESS=FALSE OVERWRITE=TRUE")
+                # source, target, source_size, target_size, source_compression, target_compression, status, message
+                failed = [row[0] for row in cur.fetchall() if row[6] not in ("UPLOADED", "SKIPPED")]
+            finally:
+                cur.close()
+        if failed:
+            raise RuntimeError(f"PUT failed for {', '.join(failed)}")
+
+    def verify(self, batch):
+        staged = self._list(f"{self.stage}/{batch[0].folder}/")
+        bad = []
+        for f in batch:
+            size, md5 = staged.get(f.name, (None, None))
+            if size != f.size or (md5 is not None and md5 != f.md5):
+                bad.append(f.name)
+        return bad
+
+
+class SnowflakeTable(_SnowflakeTarget):
+    """MOON_CRATER_IMAGES BLOB table; uploads are checked with MD5("Image_Data") on the server."""
+
+    def __init__(self, table=IMAGES_TABLE, connect=snowflake_connect):
+        super().__init__(connect)
+        self.table = table
+        self.label = f"table:{table}"
+
+    def listing(self):
+        cur = self.connection().cursor()
+        try:
+            cur.execute(f'SELECT "PNG File", LENGTH("Image_Data"), MD5("Image_Data") FROM {self.table}')
+            return {name: (size, md5) for name, size, md5 in cur.fetchall()}
+        finally:
+            cur.close()
+
+    def upload(self, batch, parallel):
+        rows = []
+        for f in batch:
+            with open(f.path, "rb") as fh:
+                rows.append((f.name, fh.read()))
+        conn = self.connection()
+        cur = conn.cursor()
+        try:
+            # Replace rows left by an earlier, unverified attempt
+            cur.execute(f'DELETE FROM {self.table} WHERE "PNG File" IN ({", ".join(["%s"] * len(batch))})',
+                        [f.name for f in batch])
+            cur.executemany(f'INSERT INTO {self.table} ("PNG File", "Image_Data") VALUES (%s, %s)', rows)
+            conn.commit()
+        finally:
+            cur.close()
+
+    def verify(self, batch):
+        cur = self.connection().cursor()
+        try:
+            cur.execute(f'SELECT "PNG File", MD5("Image_Data") FROM {self.table} '
+                        f'WHERE "PNG File" IN ({", ".join(["%s"] * len(batch))})', [f.name for f in batch])
+            stored = dict(cur.fetchall())
+        finally:
+            cur.close()
+        return [f.name for f in batch if stored.get(f.name) != f.md5]
+
+
+##############
+### Upload ###
+##############
+
+def _batches(files, batch_size, batch_bytes):
+    """Consecutive files of the same folder, at most batch_size files / batch_bytes bytes per batch."""
+    batch, size = [], 0
+    for f in files:
+        if batch and (f.folder != batch[0].folder or len(batch) >= batch_size or size + f.size > batch_bytes):
+            yield batch
+            batch, size = [], 0
+        batch.append(f)
+        size += f.size
+    if batch:
+        yield batch
+
+
+def plan_upload(files, target, manifest):
+    """
+    Split files into (to_upload, skipped). MD5s come from the manifest for unchanged files; other files
+    are hashed here only if the target already has a copy to compare against (otherwise by the workers).
+    """
+    known = manifest.load(target.label) if manifest else {}
+    listing = target.listing()
+    to_upload, skipped = [], []
+    for f in files:
+        entry = known.get(f.name)
+        if entry and entry[:2] == (f.size, f.mtime_ns):
+            f.md5 = entry[2]
+        staged = listing.get(f.name)
+        if staged and staged[0] == f.size:
+            if f.md5 is None:
+                f.md5 = file_md5(f.path)
+            # Without a checksum from the target, a copy verified earlier must still match the local file
+            if staged[1] == f.md5 or (staged[1] is None and (entry is None or entry[2] == f.md5)):
+                skipped.append(f)
+                continue
+        to_upload.append(f)
+    if manifest:
+        manifest.record(target.label, [f for f in skipped if known.get(f.name) != (f.size, f.mtime_ns, f.md5)])
+    return to_upload, skipped
+
+
+def upload_files(files, target, workers=4, parallel=4, batch_size=32, batch_bytes=256 * 1024 * 1024,
+                 retries=2, manifest=None):
+    """
+    Upload files to target on `workers` threads and return a stats dict
+    (uploaded / skipped / failed file counts, bytes, seconds, mb_per_s, failed_files).
+    """
+    to_upload, skipped = plan_upload(files, target, manifest)
+    stats = {"uploaded": 0, "skipped": len(skipped), "failed": 0, "bytes": 0, "failed_files": []}
+    total_bytes = sum(f.size for f in to_upload)
+    print(f"{len(to_upload)} file(s) to upload ({total_bytes / 1e6:.1f} MB), {len(skipped)} already on {target.label}")
+
+    start = time.perf_counter()
+
+    def run_batch(batch):
+        for f in batch:
+            if f.md5 is None:
+                f.md5 = file_md5(f.path)
+        error = None
+        for _ in range(retries + 1):
+            try:
+                target.upload(batch, parallel)
+                bad = target.verify(batch)
+                if not bad:
+                    return batch, None
+                error = f"checksum/size mismatch for {', '.join(bad)}"
+            except Exception as e:
+                error = str(e)
+        return batch, error
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="mcad-upload") as pool:
+        futures = [pool.submit(run_batch, batch) for batch in _batches(to_upload, batch_size, batch_bytes)]
+        for future in as_completed(futures):
+            batch, error = future.result()
+            if error:
+                stats["failed"] += len(batch)
+                stats["failed_files"].extend(f.name for f in batch)
+                print(f"Error uploading {batch[0].name} .. {batch[-1].name}: {error}")
+                continue
+            if manifest:
+                manifest.record(target.label, batch)
+            stats["uploaded"] += len(batch)
+            stats["bytes"] += sum(f.size for f in batch)
+            elapsed = time.perf_counter() - start
+            print(f"Uploaded {stats['uploaded']}/{len(to_upload)} files "
+                  f"({stats['bytes'] / 1e6:.1f}/{total_bytes / 1e6:.1f} MB, {stats['bytes'] / 1e6 / elapsed:.1f} MB/s)")
+
+    stats["seconds"] = time.perf_counter() - start
+    stats["mb_per_s"] = stats["bytes"] / 1e6 / stats["seconds"] if stats["seconds"] > 0 else 0.0
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Parallel, resumable upload of the MCAD PNG files.")
+    parser.add_argument("target", choices=("stage", "table", "local"))
+    parser.add_argument("data_folder", help="folder holding 000/, 001/, ... with image_N.png files")
+    parser.add_argument("--dest", help="destination directory for the local target")
+    parser.add_argument("--stage", default=PNG_STAGE)
+    parser.add_argument("--table", default=IMAGES_TABLE)
+    parser.add_argument("--sse", action="store_true", help="stage uses SNOWFLAKE_SSE, so LIST md5 can be checked")
+    parser.add_argument("--workers", type=int, default=4, help="concurrent upload threads/connections")
+    parser.add_argument("--parallel", type=int, default=4, help="PARALLEL=N for each PUT")
+    parser.add_argument("--batch-size", type=int, default=32, help="files per PUT/INSERT batch")
+    parser.add_argument("--batch-mb", type=float, default=256, help="maximum MB per batch")
+    parser.add_argument("--retries", type=int, default=2)
+    parser.add_argument("--manifest", default=DEFAULT_MANIFEST, help="resume manifest (SQLite)")
+    args = parser.parse_args(argv)
+
+    if args.target == "local":
+        if not args.dest:
+            parser.error("--dest is required for the local target")
+        target = LocalStage(args.dest)
+    elif args.target == "stage":
+        target = SnowflakeStage(args.stage, sse=args.sse)
+    else:
+        target = SnowflakeTable(args.table)
+
+    files = find_png_files(args.data_folder)
+    manifest = UploadManifest(args.manifest)
+    try:
+        stats = upload_files(files, target, workers=args.workers, parallel=args.parallel,
+                             batch_size=args.batch_size, batch_bytes=int(args.batch_mb * 1024 * 1024),
+                             retries=args.retries, manifest=manifest)
+    finally:
+        target.close()
+        manifest.close()
+
+    print(f"Done: {stats['uploaded']} uploaded, {stats['skipped']} skipped, {stats['failed']} failed, "
+          f"{stats['bytes'] / 1e6:.1f} MB in {stats['seconds']:.1f} s ({stats['mb_per_s']:.1f} MB/s)")
+    return 1 if stats["failed"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,6 @@
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+# The backend and CLI modules are imported as flat modules, the way their scripts run them
+sys.path[:0] = [str(REPO_ROOT / "app" / "backend"), str(REPO_ROOT / "CLI")]
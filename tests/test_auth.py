@@ -0,0 +1,45 @@
+import time
+
+import pytest
+from fastapi import HTTPException
+
+import auth
+from auth import TTLCache, create_access_token, revoke_token, verify_token
+
+
+@pytest.fixture(autouse=True)
+def small_caches(monkeypatch):
+    monkeypatch.setattr(auth, "SECRET_KEY", "test-secret-key-of-at-least-32-bytes")
+    monkeypatch.setattr(auth, "token_cache", TTLCache(2))
+    auth.revoked_tokens.clear()
+    yield
+    auth.revoked_tokens.clear()
+
+
+def assert_revoked(token):
+    with pytest.raises(HTTPException) as e:
+        verify_token(token)
+    assert e.value.status_code == 401 and e.value.detail == "Token has been revoked"
+
+
+def test_revocations_are_never_evicted():
+    tokens = [create_access_token({"sub": f"user{i}"}) for i in range(auth.TOKEN_CACHE_SIZE + 1)]
+    verify_token(tokens[0])
+    for token in tokens:
+        revoke_token(token)
+    assert_revoked(tokens[0])
+
+
+def test_revoked_token_put_back_in_the_cache_is_still_denied():
+    token = create_access_token({"sub": "user"})
+    payload = verify_token(token)
+    revoke_token(token)
+    auth.token_cache.put(token, payload, expires_at=payload["exp"])  # A verification that raced the logout
+    assert_revoked(token)
+
+
+def test_expired_revocations_are_pruned(monkeypatch):
+    monkeypatch.setattr(auth.RevokedTokens, "PRUNE_INTERVAL", 0)
+    auth.revoked_tokens.add("old", time.time() - 1)
+    auth.revoked_tokens.add("new", time.time() + 60)
+    assert "old" not in auth.revoked_tokens and "new" in auth.revoked_tokens
@@ -0,0 +1,44 @@
+import numpy as np
+from PIL import Image
+
+from crater_detection import run_detection
+from mcad_database_setup import MCADDatabase
+
+
+def detect_stub(task):
+    """Worker step with the detect_image contract: nothing on image 0, one crater elsewhere."""
+    image_id, png_path, _ = task
+    craters = np.empty((0, 4), dtype=np.float32) if png_path.endswith("image_0.png") else \
+        np.array([[10, 10, 5, 0.9]], dtype=np.float32)
+    return image_id, craters, 32, 0.0, None
+
+
+def make_db(root):
+    """Two images without camera geometry, so no crater can be sized."""
+    db = MCADDatabase(root / "test.db")
+    for image_num in range(2):
+        png_path = root / f"image_{image_num}.png"
+        Image.fromarray(np.zeros((32, 32), dtype=np.uint8)).save(png_path)
+        db.cursor.execute("INSERT INTO lunar_images (folder_num, image_num, png_path, json_path) VALUES (1, ?, ?, '')",
+                          (image_num, str(png_path)))
+    db.connection.commit()
+    db.connection.close()
+    return root / "test.db"
+
+
+def test_resume_skips_images_without_written_craters(tmp_path):
+    db_path = make_db(tmp_path)
+
+    first = run_detection(db_path, workers=1, detect=detect_stub)
+    assert (first["processed"], first["craters"], first["unsized"]) == (2, 0, 1)
+
+    resumed = run_detection(db_path, workers=1, detect=detect_stub)
+    assert (resumed["scanned"], resumed["processed"]) == (0, 0)
+
+    db = MCADDatabase(db_path)
+    assert db.cursor.execute("SELECT image_id, crater_count FROM detection_runs ORDER BY image_id").fetchall() \
+        == [(1, 0), (2, 0)]
+    db.connection.close()
+
+    replaced = run_detection(db_path, workers=1, replace=True, detect=detect_stub)
+    assert replaced["processed"] == 2
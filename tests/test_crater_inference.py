@@ -0,0 +1,42 @@
+from types import SimpleNamespace
+
+import numpy as np
+from PIL import Image
+
+import crater_inference
+from crater_detection import to_full_resolution
+from crater_inference import DEFAULT_SETTINGS, infer_image
+
+
+class FakeSession:
+    """One crater per tile at a fixed tile position, with the crater model's input/output contract."""
+
+    def __init__(self, crater):
+        self.crater = np.array(crater, dtype=np.float32)
+
+    def get_inputs(self):
+        return [SimpleNamespace(name="tiles", shape=["batch", 1, "tile", "tile"])]
+
+    def run(self, _, feeds):
+        return [np.tile(self.crater, (len(feeds["tiles"]), 1, 1))]
+
+
+def test_to_full_resolution_maps_to_reduced_pixel_centers():
+    craters = np.array([[0, 0, 5, 0.9], [10, 20, 3, 0.8]], dtype=np.float32)
+    to_full_resolution(craters, 4)
+    np.testing.assert_allclose(craters, [[1.5, 1.5, 20, 0.9], [41.5, 81.5, 12, 0.8]])
+    # Downscale 1 leaves the coordinates alone
+    np.testing.assert_allclose(to_full_resolution(craters.copy(), 1), craters)
+
+
+def test_infer_image_uses_the_detector_coordinate_mapping(tmp_path, monkeypatch):
+    png_path = tmp_path / "image.png"
+    Image.fromarray(np.zeros((64, 96), dtype=np.uint8)).save(png_path)
+    monkeypatch.setattr(crater_inference, "_session", FakeSession([[10, 12, 3, 0.9]]))
+
+    settings = {**DEFAULT_SETTINGS, "downscale": 4, "tile_size": 32}
+    image_id, craters, width, _, error = infer_image((7, str(png_path), settings))
+
+    assert (image_id, width, error) == (7, 96, None)
+    expected = to_full_resolution(np.array([[10, 12, 3, 0.9]], dtype=np.float32), 4)
+    np.testing.assert_allclose(craters, expected)
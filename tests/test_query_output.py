@@ -0,0 +1,49 @@
+import io
+import sqlite3
+
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+from query_output import ParquetWriter, stream_query
+
+
+def write_parquet(rows, columns="a", batch_size=5):
+    conn = sqlite3.connect(":memory:")
+    names = columns.split(",")
+    conn.execute(f"CREATE TABLE t (id INTEGER PRIMARY KEY, {', '.join(names)})")
+    conn.executemany(f"INSERT INTO t ({columns}) VALUES ({', '.join('?' * len(names))})", rows)
+    cursor = conn.execute(f"SELECT {columns} FROM t ORDER BY id")
+    stream = io.BytesIO()
+    written, _ = stream_query(cursor, ParquetWriter, stream, batch_size=batch_size)
+    stream.seek(0)
+    return written, pq.read_table(stream)
+
+
+def test_null_first_batch_then_floats():
+    # Regression: the schema was fixed from the first batch, so an all-NULL batch made the column a string
+    written, table = write_parquet([(None,)] * 5 + [(0.5 * i,) for i in range(5)])
+    assert written == 10
+    assert table.schema.field("a").type == pa.float64()
+    assert table.column("a").to_pylist() == [None] * 5 + [0.0, 0.5, 1.0, 1.5, 2.0]
+
+
+def test_ints_widen_to_double():
+    _, table = write_parquet([(1,), (2,), (3,), (4,), (5,), (1.5,), (None,)])
+    assert table.schema.field("a").type == pa.float64()
+    assert table.column("a").to_pylist() == [1.0, 2.0, 3.0, 4.0, 5.0, 1.5, None]
+
+
+def test_conflicting_and_all_null_columns_become_strings():
+    rows = [(1, None)] * 5 + [("x", None)] * 2
+    _, table = write_parquet(rows, columns="a,b")
+    assert table.schema.field("a").type == pa.string()
+    assert table.schema.field("b").type == pa.string()
+    assert table.column("a").to_pylist() == ["1"] * 5 + ["x"] * 2
+
+
+def test_empty_result_keeps_columns():
+    written, table = write_parquet([], columns="a,b")
+    assert written == 0
+    assert table.column_names == ["a", "b"]
@@ -0,0 +1,41 @@
+import pytest
+
+import mcad_database_setup
+from mcad_database_setup import MCADDatabase
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = MCADDatabase(tmp_path / "plans.db")
+    with db.connection:
+        db.cursor.executemany(
+            "INSERT INTO lunar_images (folder_num, image_num, png_path, json_path, fov_x_rad, fov_y_rad) "
+            "VALUES (?, ?, '', '', ?, 0.2758)",
+            [(i // 10, i % 10, 0.30 + i / 1000) for i in range(50)])
+        db.cursor.executemany(
+            "INSERT INTO detected_craters (image_id, center_x, center_y, diameter_pixels, diameter_meters, "
+            "diameter_miles, confidence_score) VALUES (?, 10, 10, ?, ?, ?, ?)",
+            [(i % 50 + 1, i, i * 220.0, i * 0.13, (i % 100) / 100) for i in range(500)])
+    db.cursor.execute("ANALYZE")
+    yield db
+    db.connection.close()
+
+
+def test_hot_queries_use_indexes(db):
+    assert db.check_query_plans() == []
+
+
+def test_missing_index_is_reported(db):
+    db.cursor.execute("DROP INDEX idx_detected_craters_confidence")
+    assert [name for name, _ in db.check_query_plans()] == ["craters_by_confidence"]
+
+
+def test_covering_index_scan_is_reported(db, monkeypatch):
+    # A full scan of an index is still a scan of the hot table
+    query = "SELECT confidence_score FROM detected_craters WHERE confidence_score + 0 > ?"
+    monkeypatch.setattr(mcad_database_setup, "HOT_QUERIES", {"full_index_scan": (query, (0.5,))})
+    problems = db.check_query_plans()
+    assert len(problems) == 1 and problems[0][1].startswith("SCAN detected_craters USING COVERING INDEX")
+
+    monkeypatch.setattr(mcad_database_setup, "ALLOWED_PLAN_SCANS", {problems[0]})
+    assert db.check_query_plans() == []